@@ -7,10 +7,10 @@ from django.contrib.sites.shortcuts import get_current_site
 from django.template.loader import render_to_string
 from django.utils.encoding import force_bytes, force_str
 from django.utils.http import urlsafe_base64_encode
-from django.core.mail import EmailMessage
-from django.conf import settings
+from django.db import transaction
 from django.middleware.csrf import get_token
 from payment.models import Order, OrderItem, ShippingAddress
+from outbox.services import queue_email
 from .token import user_tokenizer_generate
 from .forms import CreateUserForm, UpdateUserForm
 from payment.forms import ShippingForm
@@ -60,30 +60,31 @@ def api_register(request):
     form = CreateUserForm(request.data)
     
     if form.is_valid():
-        user = form.save()
-        user.is_active = False
-        user.save()
-        
-        # Email verification setup
-        current_site = get_current_site(request)
-        
-        subject = 'Account verification email'
-        
-        message = render_to_string('account/registration/email-verification.html', { 
-            'user': user,
-            'domain': current_site.domain,
-            'uid': urlsafe_base64_encode(force_bytes(user.pk)),
-            'token': user_tokenizer_generate.make_token(user),
-        })
-        
-        email_message = EmailMessage(
-            subject=subject,
-            body=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[user.email],
-            reply_to=['support@pokebin.app'],
-        )
-        email_message.send(fail_silently=False)
+        # The verification email is queued in the same transaction as the
+        # user, and delivered by the `send_outbox` worker.
+        with transaction.atomic():
+            user = form.save()
+            user.is_active = False
+            user.save()
+            
+            # Email verification setup
+            current_site = get_current_site(request)
+            
+            subject = 'Account verification email'
+            
+            message = render_to_string('account/registration/email-verification.html', { 
+                'user': user,
+                'domain': current_site.domain,
+                'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+                'token': user_tokenizer_generate.make_token(user),
+            })
+            
+            queue_email(
+                subject=subject,
+                body=message,
+                to=[user.email],
+                reply_to=['support@pokebin.app'],
+            )
         
         return Response({
             'success': True,
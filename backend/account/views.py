@@ -22,8 +22,9 @@ from django.contrib.auth import authenticate, login, logout
 
 from django.contrib.auth.decorators import login_required
 
-from django.core.mail import EmailMessage
-from django.conf import settings
+from django.db import transaction
+
+from outbox.services import queue_email
 
 @login_required(login_url='my-login')
 def check_order(request):
@@ -52,33 +53,35 @@ def register(request):
         
         if form.is_valid():
             
-            user = form.save()
+            # The verification email is queued in the same transaction as the
+            # user, and delivered by the `send_outbox` worker.
+            with transaction.atomic():
+                
+                user = form.save()
             
-            user.is_active = False
+                user.is_active = False
         
-            user.save()
+                user.save()
             
-            # email verification setup
+                # email verification setup
             
-            current_site = get_current_site(request)
+                current_site = get_current_site(request)
             
-            subject = 'Account verification email'
+                subject = 'Account verification email'
             
-            message = render_to_string('account/registration/email-verification.html', { 
-                'user': user,
-                'domain': current_site.domain,
-                'uid': urlsafe_base64_encode(force_bytes(user.pk)),
-                'token': user_tokenizer_generate.make_token(user),
-            })
+                message = render_to_string('account/registration/email-verification.html', { 
+                    'user': user,
+                    'domain': current_site.domain,
+                    'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+                    'token': user_tokenizer_generate.make_token(user),
+                })
             
-            email_message = EmailMessage(
-                subject=subject,
-                body=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[user.email],
-                reply_to=['support@pokebin.app'],
-            )
-            email_message.send(fail_silently=False)
+                queue_email(
+                    subject=subject,
+                    body=message,
+                    to=[user.email],
+                    reply_to=['support@pokebin.app'],
+                )
             
             
             return redirect('email-verification-sent')
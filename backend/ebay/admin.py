@@ -2,9 +2,10 @@ from django.contrib import admin, messages
 from django.core.exceptions import PermissionDenied
 from django.http import HttpResponseRedirect
 from django.urls import path, reverse
+from django.utils.html import format_html
 
-from .models import EbayAuthToken, EbayCategoryMapping, EbayListing
-from .services import EbayApiError, EbayAuthError, SyncService
+from .models import EbayAuthToken, EbayCategoryMapping, EbayListing, EbaySyncJob
+from .services import SyncReport, enqueue_sync
 
 
 @admin.register(EbayCategoryMapping)
@@ -33,11 +34,13 @@ class EbayListingAdmin(admin.ModelAdmin):
     )
     list_filter = ('sync_state',)
     search_fields = ('ebay_item_id', 'product__title')
+    actions = ['resync_selected']
     readonly_fields = (
         'ebay_item_id',
         'product',
         'ebay_store_category_id',
         'ebay_last_modified',
+        'content_fingerprint',
         'last_synced_at',
         'sync_state',
         'sync_error',
@@ -59,30 +62,94 @@ class EbayListingAdmin(admin.ModelAdmin):
             ),
         ] + super().get_urls()
 
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {'latest_sync_job': EbaySyncJob.objects.first(), **(extra_context or {})}
+        return super().changelist_view(request, extra_context)
+
     def sync_now_view(self, request):
+        """Queue a sweep for the `run_sync_jobs` worker and return at once."""
         redirect = HttpResponseRedirect(reverse('admin:ebay_ebaylisting_changelist'))
         if request.method != 'POST':
             return redirect
         if not self.has_change_permission(request):
             raise PermissionDenied
-        try:
-            report = SyncService().sync_all()
-        except (EbayAuthError, EbayApiError) as exc:
-            messages.error(request, f'eBay sync failed: {exc}')
-            return redirect
 
-        level = messages.SUCCESS if report.errors == 0 else messages.WARNING
-        messages.add_message(
-            request,
-            level,
-            f'eBay sync done — created={report.created}, updated={report.updated}, '
-            f'skipped={report.skipped}, deactivated={report.deactivated}, '
-            f'errors={report.errors}.',
-        )
-        for detail in report.error_details[:5]:
-            messages.error(request, detail)
+        job, created = enqueue_sync(requested_by=request.user)
+        if created:
+            messages.success(request, f'eBay sync #{job.pk} queued; progress is shown below.')
+        else:
+            messages.warning(request, f'eBay sync #{job.pk} is already {job.status}; not starting another.')
         return redirect
 
+    @admin.action(description='Re-sync selected listings from eBay', permissions=['change'])
+    def resync_selected(self, request, queryset):
+        skus = list(queryset.values_list('ebay_item_id', flat=True))
+        job, created = enqueue_sync(requested_by=request.user, skus=skus)
+        if created:
+            messages.success(request, f'eBay sync #{job.pk} queued for {len(skus)} SKUs.')
+        elif job.is_targeted or job.status == EbaySyncJob.QUEUED:
+            messages.success(request, f'Added {len(skus)} SKUs to eBay sync #{job.pk}, already queued.')
+        else:
+            messages.warning(request, f'eBay sync #{job.pk} is already {job.status}; not starting another.')
+
+
+@admin.register(EbaySyncJob)
+class EbaySyncJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'status',
+        'scope',
+        'dry_run',
+        'pages_fetched',
+        'skus_processed',
+        'counts',
+        'requested_by',
+        'created_at',
+        'finished_at',
+    )
+    list_filter = ('status', 'dry_run')
+    readonly_fields = (
+        'status',
+        'dry_run',
+        'skus',
+        'requested_by',
+        'pages_fetched',
+        'skus_processed',
+        'report_text',
+        'resumed_from',
+        'error',
+        'created_at',
+        'started_at',
+        'heartbeat_at',
+        'finished_at',
+    )
+    exclude = ('report', 'checkpoint')
+
+    def has_add_permission(self, request):
+        # Queued from Ebay → eBay listings → "Sync now".
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='scope')
+    def scope(self, obj):
+        return f'{len(obj.skus)} SKUs' if obj.is_targeted else 'full sweep'
+
+    @admin.display(description='counts')
+    def counts(self, obj):
+        report = SyncReport(**obj.report) if obj.report else SyncReport()
+        return (
+            f'created={report.created} updated={report.updated} unchanged={report.unchanged} '
+            f'skipped={report.skipped} deactivated={report.deactivated} errors={report.errors}'
+        )
+
+    @admin.display(description='report')
+    def report_text(self, obj):
+        if not obj.report:
+            return '-'
+        return format_html('<pre>{}</pre>', SyncReport(**obj.report).as_text())
+
 
 @admin.register(EbayAuthToken)
 class EbayAuthTokenAdmin(admin.ModelAdmin):
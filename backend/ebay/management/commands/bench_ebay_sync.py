@@ -0,0 +1,136 @@
+"""Measure eBay sweep throughput against a local fake eBay.
+
+For each catalog size — 1k, 10k and 50k SKUs by default — starts a fake
+eBay in a child process (`FakeEbayProcess`, see `ebay/services/fake_ebay.py`)
+and runs `SyncService.sync_all()` against it into an empty catalog, then rolls
+everything back.
+Reports SKUs/sec, HTTP calls (with retries and 429s), DB queries and the
+slowest phases of each run. Images are stored in a temporary directory, not
+the configured storage. Run it against a scratch database, or at least not
+against production: each sweep holds its locks until rollback.
+
+    python manage.py bench_ebay_sync
+    python manage.py bench_ebay_sync --skus 2000 --latency 0.05 --jitter 0.05
+    python manage.py bench_ebay_sync --skus 5000 --throttle-rate 0.02 --retry-after 0.2
+    python manage.py bench_ebay_sync --page-cap 150 --trailing-empty-page --offers-per-sku 3
+"""
+
+import dataclasses
+import datetime as dt
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ebay.models import EbayCategoryMapping
+from ebay.services import EbayClient, SyncService
+from ebay.services.fake_ebay import FakeEbayConfig, FakeEbayProcess
+from ebay.services.images import ImageFetcher
+from ebay.services.ratelimit import RateLimiter
+from ebay.services.timing import phase_lines
+from store.models import Category
+
+DEFAULT_SIZES = (1_000, 10_000, 50_000)
+
+
+class Command(BaseCommand):
+    help = 'Time full eBay sweeps against a local fake eBay at several catalog sizes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--skus', type=int, action='append', default=[],
+            help='Catalog size to sweep (repeatable; default: 1000, 10000 and 50000).',
+        )
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help='Offer/image fetches in flight (default: EBAY_SYNC_CONCURRENCY).')
+        parser.add_argument('--rate', type=float, default=1000.0,
+                            help='Client rate limit in calls/second.')
+        parser.add_argument('--two-phase', action='store_true', help='Plan the sweep, then apply it.')
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every API call.')
+        parser.add_argument('--jitter', type=float, default=0.0, help='Up to this many more seconds, at random.')
+        parser.add_argument('--throttle-rate', type=float, default=0.0, help='Share of API calls answered 429.')
+        parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After on those 429s.')
+        parser.add_argument('--page-cap', type=int, default=None,
+                            help='Serve at most this many items per inventory page.')
+        parser.add_argument('--trailing-empty-page', action='store_true',
+                            help='Link the last inventory page to an empty one.')
+        parser.add_argument('--offers-per-sku', type=int, default=1)
+        parser.add_argument('--unpublished-rate', type=float, default=0.0,
+                            help='Share of SKUs with no published offer.')
+        parser.add_argument('--images-per-sku', type=int, default=2)
+
+    def handle(self, *args, **options):
+        config = FakeEbayConfig(
+            latency=options['latency'],
+            jitter=options['jitter'],
+            throttle_rate=options['throttle_rate'],
+            retry_after=options['retry_after'],
+            page_cap=options['page_cap'],
+            trailing_empty_page=options['trailing_empty_page'],
+            offers_per_sku=options['offers_per_sku'],
+            unpublished_rate=options['unpublished_rate'],
+            images_per_sku=options['images_per_sku'],
+        )
+        self.stdout.write(f'Sweeping into the {connection.vendor} database...')
+        for count in options['skus'] or DEFAULT_SIZES:
+            with FakeEbayProcess(dataclasses.replace(config, skus=count)) as server:
+                self._run(server, count, options)
+
+    def _run(self, server, count, options):
+        queries = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with transaction.atomic(), tempfile.TemporaryDirectory() as media:
+            self._map_categories(server.config)
+            service = self._service(server, options, media)
+            with connection.execute_wrapper(count_query):
+                start = time.perf_counter()
+                report = service.sync_all()
+                elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+
+        stats = service.client.stats
+        downloads = report.phases.get('image.download', {}).get('calls', 0)
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n{count} SKUs: {elapsed:.1f}s, {count / elapsed:.0f} SKUs/sec'))
+        self.stdout.write(
+            f'  created={report.created} skipped={report.skipped} errors={report.errors} '
+            f'deactivated={report.deactivated}'
+        )
+        self.stdout.write(
+            f'  HTTP: {stats.calls} API calls (retries={stats.retries}, throttled={stats.throttled}, '
+            f'waited={stats.wait_seconds:.1f}s), {downloads} image downloads'
+        )
+        self.stdout.write(f'  DB: {queries} queries ({queries / count:.2f} per SKU)')
+        for line in phase_lines(report.phases)[:6]:
+            self.stdout.write(f'  {line}')
+
+    @staticmethod
+    def _map_categories(config):
+        for n in range(config.categories):
+            category = Category.objects.create(name=f'Bench eBay {n}', slug=f'bench-ebay-{n}')
+            EbayCategoryMapping.objects.update_or_create(
+                ebay_store_category_id=config.store_category(n),
+                defaults={'pokebin_category': category, 'active': True},
+            )
+
+    @staticmethod
+    def _service(server, options, media):
+        concurrency = max(1, options['concurrency'] or getattr(settings, 'EBAY_SYNC_CONCURRENCY', 8))
+        client = EbayClient(
+            hosts=server.hosts,
+            pool_size=concurrency,
+            rate_limiter=RateLimiter(rate=options['rate'], burst=concurrency),
+        )
+        # The fake accepts any token; don't read (or refresh) the real one.
+        client._cache_access_token('fake-ebay-token', timezone.now() + dt.timedelta(hours=2))
+        service = SyncService(client, concurrency=concurrency, two_phase=options['two_phase'])
+        service.images = ImageFetcher(pool_size=concurrency, storage=FileSystemStorage(location=media))
+        return service
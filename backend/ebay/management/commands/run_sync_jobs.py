@@ -0,0 +1,49 @@
+"""Run eBay sweeps queued from the admin "Sync now" button.
+
+Long-running worker: claims the oldest queued `EbaySyncJob`, runs the sync
+(writing progress to the job row after every page), records the report or the
+error, then sleeps while nothing is queued. One sweep runs at a time however
+many workers are started.
+
+    python manage.py run_sync_jobs
+    python manage.py run_sync_jobs --once        # run what's queued, then exit
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from ebay.services import run_next_job
+
+
+class Command(BaseCommand):
+    help = 'Run queued eBay sync jobs one at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once nothing is queued instead of polling forever.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds to sleep when no job is queued (default 5).',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                job = run_next_job()
+                if job is not None:
+                    self.stdout.write(
+                        f'ebay: sync #{job.pk} {job.status} — '
+                        f'{job.skus_processed} SKUs over {job.pages_fetched} pages'
+                    )
+                    continue
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('ebay: stopped.')
@@ -1,16 +1,34 @@
 """Sync the seller's eBay inventory into the Pokebin catalog.
 
-The CLI entry point for the sync — mainly for the large initial bulk import
-(no web-request timeout). Day-to-day syncing runs from the admin "Sync now"
-button. Same engine either way.
+Runs a sweep in the foreground — handy for the initial bulk import or a shell
+session. Day-to-day syncing is queued from the admin "Sync now" button and
+run by the `run_sync_jobs` worker. Same engine either way, and the run is
+recorded as an `EbaySyncJob`, so it refuses to start while another sweep is
+running.
+
+`--stock-only` refreshes just stock and price of products already in the
+catalog. It is meant for a cron every few minutes, so it is not recorded as a
+job and may run alongside a sweep. `--plan` only reads, so it isn't either.
+A `--replay` sweep isn't a job either: its snapshot must not be resumed by,
+or resume from, a live sweep. A `--record` sweep is a job but always starts
+at the top of the feed, so the recording is complete.
 
     python manage.py sync_ebay
     python manage.py sync_ebay --dry-run
+    python manage.py sync_ebay --concurrency 16
+    python manage.py sync_ebay --sku PSA-1 --sku PSA-2   # just these SKUs
+    python manage.py sync_ebay --stock-only
+    python manage.py sync_ebay --plan        # show what a sweep would change
+    python manage.py sync_ebay --two-phase   # plan everything, then write in bulk
+    python manage.py sync_ebay --record /tmp/snap   # also save eBay's responses
+    python manage.py sync_ebay --replay /tmp/snap   # sweep from them, offline
 """
 
 from django.core.management.base import BaseCommand, CommandError
 
-from ebay.services import EbayAuthError, SyncService
+from ebay.services import (
+    EbayAuthError, RecordingClient, ReplayClient, SyncJobBusy, SyncService, run_job, start_sync,
+)
 
 
 class Command(BaseCommand):
@@ -22,13 +40,94 @@ class Command(BaseCommand):
             action='store_true',
             help='Walk eBay items and report counts without writing to the DB.',
         )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=None,
+            help='Offer lookups in flight at once (default: EBAY_SYNC_CONCURRENCY).',
+        )
+        parser.add_argument(
+            '--sku',
+            action='append',
+            dest='skus',
+            default=[],
+            help='Re-sync only this SKU (repeatable) instead of the whole inventory.',
+        )
+        parser.add_argument(
+            '--stock-only',
+            action='store_true',
+            help='Only refresh stock and price of products already in the catalog.',
+        )
+        parser.add_argument(
+            '--plan',
+            action='store_true',
+            help='Print the exact changes a sweep would make, then exit without writing.',
+        )
+        parser.add_argument(
+            '--two-phase',
+            action='store_true',
+            help='Fetch and decide the whole sweep first, then write it page by page.',
+        )
+        source = parser.add_mutually_exclusive_group()
+        source.add_argument(
+            '--record',
+            metavar='DIR',
+            help='Also write every eBay response to DIR as gzipped NDJSON.',
+        )
+        source.add_argument(
+            '--replay',
+            metavar='DIR',
+            help='Read eBay responses from a --record directory instead of the network.',
+        )
 
     def handle(self, *args, **options):
-        service = SyncService(dry_run=options['dry_run'])
+        client = self._client(options)
+        service = SyncService(
+            client, dry_run=options['dry_run'], concurrency=options['concurrency'],
+            two_phase=options['two_phase'],
+        )
         try:
-            report = service.sync_all()
+            if options['plan']:
+                self.stdout.write(service.plan().as_text())
+                return
+            if options['stock_only']:
+                report = service.sync_stock(options['skus'] or None)
+            else:
+                report = self._run_sweep(service, options)
         except EbayAuthError as exc:
             raise CommandError(str(exc)) from exc
+        finally:
+            if isinstance(client, RecordingClient):
+                client.close()
+                self.stdout.write(f'Recorded eBay responses to {client.path}')
 
         styler = self.style.SUCCESS if report.errors == 0 else self.style.WARNING
         self.stdout.write(styler(report.as_text()))
+        if options['replay'] and service.images.stand_ins:
+            self.stdout.write(
+                f'{service.images.stand_ins} images were not in the recording; stored stand-ins for them.'
+            )
+        stats = getattr(service.client, 'stats', None)
+        if stats is not None:
+            self.stdout.write(stats.as_text())
+
+    def _client(self, options):
+        if options['record']:
+            return RecordingClient(options['record'], pool_size=options['concurrency'])
+        if options['replay']:
+            try:
+                return ReplayClient(options['replay'])
+            except OSError as exc:
+                raise CommandError(f'Cannot read recording: {exc}') from exc
+        return None
+
+    def _run_sweep(self, service, options):
+        if options['replay']:
+            return service.sync_skus(options['skus']) if options['skus'] else service.sync_all()
+        try:
+            job = start_sync(
+                dry_run=options['dry_run'], skus=options['skus'], resume=not options['record'],
+            )
+        except SyncJobBusy as exc:
+            raise CommandError(str(exc)) from exc
+        return run_job(job, service)
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ebay', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ebaylisting',
+            name='content_fingerprint',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ebay', '0003_ebaysyncjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ebaysyncjob',
+            name='checkpoint',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='ebaysyncjob',
+            name='resumed_from',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='ebay.ebaysyncjob'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ebay', '0004_ebaysyncjob_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ebaysyncjob',
+            name='skus',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
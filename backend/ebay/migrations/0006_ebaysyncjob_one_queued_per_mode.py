@@ -0,0 +1,25 @@
+# Generated by Django 5.1.3 on 2026-10-18 21:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ebay', '0005_ebaysyncjob_skus'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='ebaysyncjob',
+            name='ebay_sync_job_one_per_active_status',
+        ),
+        migrations.AddConstraint(
+            model_name='ebaysyncjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'running')), fields=('status',), name='ebay_sync_job_one_running'),
+        ),
+        migrations.AddConstraint(
+            model_name='ebaysyncjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'queued')), fields=('dry_run',), name='ebay_sync_job_one_queued_per_mode'),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 
 
@@ -80,7 +81,11 @@ class EbayListing(models.Model):
         related_name='ebay_listing',
     )
     ebay_store_category_id = models.CharField(max_length=64, blank=True, db_index=True)
+    # When the sync last saw this SKU's content change (see content_fingerprint).
     ebay_last_modified = models.DateTimeField(null=True, blank=True)
+    # SHA-256 of the item/offer fields the sync consumes; a sweep that computes
+    # the same value for a synced SKU skips its writes entirely.
+    content_fingerprint = models.CharField(max_length=64, blank=True)
     last_synced_at = models.DateTimeField(null=True, blank=True)
     sync_state = models.CharField(max_length=32, choices=SYNC_STATES, default='pending')
     sync_error = models.TextField(blank=True)
@@ -94,3 +99,107 @@ class EbayListing(models.Model):
 
     def __str__(self):
         return f'eBay {self.ebay_item_id} ({self.sync_state})'
+
+
+class EbaySyncJob(models.Model):
+    """One requested sweep of the seller's eBay inventory.
+
+    The admin "Sync now" button only inserts a `queued` row; the
+    `run_sync_jobs` worker claims it, runs the sync and writes progress back
+    as it goes. Finished rows are the sync history, each with the final
+    `SyncReport` in `report`.
+
+    At most one job runs at any time, so two sweeps never overlap, and at
+    most one live and one dry-run job wait in the queue (both enforced by the
+    partial unique constraints below).
+
+    `checkpoint` holds the sweep's `SyncCheckpoint` as of its last page. A
+    job that dies keeps it, and the next sweep resumes from there
+    (`resumed_from`) instead of starting the feed over.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUSES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+    status = models.CharField(max_length=16, choices=STATUSES, default=QUEUED)
+    dry_run = models.BooleanField(default=False)
+    # Empty for a full sweep; otherwise the only SKUs this job re-syncs.
+    skus = models.JSONField(default=list, blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    pages_fetched = models.PositiveIntegerField(default=0)
+    skus_processed = models.PositiveIntegerField(default=0)
+    # `SyncReport` fields as a dict: running counts while the job runs, the
+    # final report once it's done.
+    report = models.JSONField(default=dict, blank=True)
+    # Cleared once the sweep completes.
+    checkpoint = models.JSONField(default=dict, blank=True)
+    resumed_from = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Bumped on every page; a running job whose heartbeat goes quiet belongs
+    # to a dead worker and is put back in the queue (or failed).
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'eBay sync job'
+        verbose_name_plural = 'eBay sync jobs'
+        ordering = ['-created_at', '-pk']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['status'],
+                condition=models.Q(status='running'),
+                name='ebay_sync_job_one_running',
+            ),
+            # A dry run can't stand in for a live job (or the other way round),
+            # so each waits in its own slot.
+            models.UniqueConstraint(
+                fields=['dry_run'],
+                condition=models.Q(status='queued'),
+                name='ebay_sync_job_one_queued_per_mode',
+            ),
+        ]
+
+    def __str__(self):
+        return f'eBay sync #{self.pk} ({self.status})'
+
+    @property
+    def is_targeted(self) -> bool:
+        return bool(self.skus)
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in self.ACTIVE_STATUSES
+
+    @property
+    def slowest_phases(self) -> str:
+        """The report's three costliest phases, e.g. 'http.offers 41.2s, images 9.8s, db.write 3.1s'."""
+        phases = (self.report or {}).get('phases') or {}
+        # `sweep`, `plan` and `page` are totals that contain the other phases.
+        top = sorted(
+            ((name, stats['seconds']) for name, stats in phases.items() if name not in ('sweep', 'plan', 'page')),
+            key=lambda kv: -kv[1],
+        )[:3]
+        return ', '.join(f'{name} {seconds:.1f}s' for name, seconds in top)
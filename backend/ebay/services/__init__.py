@@ -1,10 +1,21 @@
 from .client import EbayClient, EbayAuthError, EbayApiError
-from .sync import SyncReport, SyncService
+from .jobs import SyncJobBusy, enqueue_sync, run_job, run_next_job, start_sync
+from .recording import RecordingClient, ReplayClient
+from .sync import SyncCheckpoint, SyncPlan, SyncReport, SyncService
 
 __all__ = [
     'EbayClient',
     'EbayAuthError',
     'EbayApiError',
+    'RecordingClient',
+    'ReplayClient',
+    'SyncCheckpoint',
+    'SyncJobBusy',
+    'SyncPlan',
     'SyncService',
     'SyncReport',
+    'enqueue_sync',
+    'run_job',
+    'run_next_job',
+    'start_sync',
 ]
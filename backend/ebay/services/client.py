@@ -2,24 +2,41 @@
 
 Scope of this module: OAuth (authorization-code grant + refresh) for the
 seller's own account, plus the Sell Inventory API reads that `SyncService`
-builds on (`iter_inventory_items`, `get_offers_for_sku`).
+builds on (`iter_inventory_items`, `bulk_get_inventory_item`,
+`get_offers_for_sku`).
 
 eBay's OAuth endpoints differ between sandbox and production but share the
 same path; we pick the host based on `settings.EBAY_ENV`.
+
+Every REST call goes through a shared `RateLimiter` (see `ratelimit.py`). A
+429 slows the limiter down and is retried after eBay's `Retry-After`;
+idempotent calls are also retried on transient 5xx and connection errors,
+with jittered exponential backoff. `client.stats` counts calls, retries,
+429s and time spent waiting; `client.timings` times each call by endpoint
+(see `timing.py`).
 """
 
 from __future__ import annotations
 
 import base64
 import datetime as dt
+import queue
+import random
+import threading
 from dataclasses import dataclass
-from typing import Optional
+from email.utils import parsedate_to_datetime
+from typing import Iterable, Iterator, Optional, TypeVar
 from urllib.parse import urlencode
 
 import requests
 from django.conf import settings
+from django.db import connections
+from requests.adapters import HTTPAdapter
 from django.utils import timezone
 
+from .ratelimit import ApiStats, RateLimiter
+from .timing import PhaseTimer
+
 
 class EbayAuthError(RuntimeError):
     """Raised when an OAuth exchange or refresh fails."""
@@ -41,6 +58,21 @@ DEFAULT_SCOPES = [
     'https://api.ebay.com/oauth/api_scope/sell.account.readonly',
 ]
 
+# eBay's caps: inventory items per getInventoryItems page / per
+# bulkGetInventoryItem call, and offers per getOffers page.
+INVENTORY_PAGE_SIZE = 200
+BULK_GET_MAX = 25
+OFFER_PAGE_SIZE = 100
+
+# Transient statuses worth retrying for an idempotent call.
+RETRY_STATUSES = frozenset({500, 502, 503, 504})
+# Backoff before retry n is uniform in [0, min(BACKOFF_MAX, BACKOFF_BASE * 2**n)].
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+# A Retry-After longer than this (a spent daily quota, say) fails the call
+# instead of parking the sweep.
+MAX_RETRY_AFTER = 300.0
+
 
 @dataclass(frozen=True)
 class EbayHosts:
@@ -55,6 +87,67 @@ class EbayHosts:
         return cls(api='https://api.sandbox.ebay.com', auth='https://auth.sandbox.ebay.com')
 
 
+T = TypeVar('T')
+_DONE = object()
+
+
+def prefetched(iterable: Iterable[T], depth: int, *, name: str = 'prefetch') -> Iterator[T]:
+    """Iterate `iterable` on a background thread, at most `depth` values ahead.
+
+    Values are handed over through a bounded queue, so the producer blocks
+    once it is `depth` ahead. An exception in the producer is re-raised to
+    the consumer at the point it would have occurred. Closing the iterator
+    early (or an exception in the consumer) stops the producer after the
+    value it is currently fetching.
+    """
+    handoff: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(entry) -> bool:
+        while not stop.is_set():
+            try:
+                handoff.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for value in iterable:
+                if not put((value, None)):
+                    return
+            put((_DONE, None))
+        except BaseException as exc:  # noqa: BLE001 — handed to the consumer
+            put((_DONE, exc))
+        finally:
+            # A token refresh may have opened a DB connection on this thread.
+            connections.close_all()
+
+    thread = threading.Thread(target=produce, name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            value, exc = handoff.get()
+            if value is _DONE:
+                if exc is not None:
+                    raise exc
+                return
+            yield value
+    finally:
+        stop.set()
+
+
+def _http_phase(path: str) -> str:
+    if path.endswith('/bulk_get_inventory_item'):
+        return 'http.bulk_get'
+    if path.endswith('/inventory_item'):
+        return 'http.inventory'
+    if path.endswith('/offer'):
+        return 'http.offers'
+    return 'http.other'
+
+
 class EbayClient:
     """Thin OAuth-aware client.
 
@@ -66,17 +159,41 @@ class EbayClient:
     # avoid a 401 from clock skew between us and eBay.
     _ACCESS_TOKEN_REFRESH_LEEWAY = dt.timedelta(seconds=60)
 
-    def __init__(self, env: Optional[str] = None):
+    def __init__(
+        self,
+        env: Optional[str] = None,
+        *,
+        pool_size: Optional[int] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        hosts: Optional[EbayHosts] = None,
+    ):
         self.env = env or settings.EBAY_ENV
-        self.hosts = EbayHosts.for_env(self.env)
+        # `hosts` overrides the env's, e.g. to point at a local `FakeEbayServer`.
+        self.hosts = hosts or EbayHosts.for_env(self.env)
         self.app_id = settings.EBAY_APP_ID
         self.cert_id = settings.EBAY_CERT_ID
         self.ru_name = settings.EBAY_RU_NAME
-        # One pooled connection reused across every inventory page and per-SKU
+        # Pooled connections reused across every inventory page and per-SKU
         # offer call (all hit the same host) instead of a fresh TLS handshake.
+        # The pool is as wide as the sync's offer-fetch concurrency so
+        # parallel calls never queue for, or discard, a connection.
+        pool_size = pool_size or getattr(settings, 'EBAY_SYNC_CONCURRENCY', 8)
         self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
         self._access_token: Optional[str] = None
         self._access_token_expires_at: Optional[dt.datetime] = None
+        # Serializes token refreshes when several threads share the client.
+        self._token_lock = threading.Lock()
+        self.rate_limiter = rate_limiter or RateLimiter(
+            rate=getattr(settings, 'EBAY_API_CALLS_PER_SECOND', 20.0),
+            burst=pool_size,
+        )
+        self.max_retries = getattr(settings, 'EBAY_API_MAX_RETRIES', 4)
+        self.stats = ApiStats()
+        self._stats_lock = threading.Lock()
+        self.timings = PhaseTimer()
 
     # -- OAuth: authorization code grant ---------------------------------
 
@@ -137,11 +254,18 @@ class EbayClient:
         Caches the token on the instance so a multi-call sweep doesn't re-read
         the `EbayAuthToken` singleton on every request. Raises `EbayAuthError`
         if no refresh token has been minted yet (run `manage.py ebay_oauth`).
+        Safe to call from several threads: only one of them refreshes.
         """
-        now = timezone.now()
-        if self._cached_token_valid(now):
+        if self._cached_token_valid(timezone.now()):
             return self._access_token
-
+        with self._token_lock:
+            # Another thread may have refreshed while we waited for the lock.
+            now = timezone.now()
+            if self._cached_token_valid(now):
+                return self._access_token
+            return self._load_access_token(now)
+
+    def _load_access_token(self, now: dt.datetime) -> str:
         from ebay.models import EbayAuthToken
 
         token = EbayAuthToken.objects.first()
@@ -185,7 +309,7 @@ class EbayClient:
 
     # -- Sell Inventory API ---------------------------------------------
 
-    def list_inventory_items(self, limit: int = 100, offset: int = 0) -> dict:
+    def list_inventory_items(self, limit: int = INVENTORY_PAGE_SIZE, offset: int = 0) -> dict:
         """One page of the seller's Inventory API items.
 
         Returns the raw response dict — `inventoryItems`, `total`, `next` etc.
@@ -195,19 +319,33 @@ class EbayClient:
             params={'limit': limit, 'offset': offset},
         )
 
-    def iter_inventory_items(self, page_size: int = 100):
-        """Yield every inventory item across all pages.
+    def iter_inventory_items(
+        self, page_size: int = INVENTORY_PAGE_SIZE, offset: int = 0, prefetch: int = 0,
+    ):
+        """Yield every inventory item across all pages, starting at `offset`.
 
         Pagination follows the `next` link when present, otherwise advances
-        by `offset += size` until the API stops returning items. eBay caps
-        `limit` at 200; 100 is a safe default.
+        by `offset += size` until the API stops returning items. Pages are
+        eBay's maximum of 200 items by default.
+
+        With `prefetch=N`, pages are fetched on a background thread up to N
+        pages ahead of the consumer, so the next page downloads while the
+        current one is processed; at most N + 1 pages are held in memory.
         """
-        offset = 0
+        pages = self._iter_inventory_pages(page_size, offset)
+        if prefetch > 0:
+            pages = prefetched(pages, prefetch, name='ebay-inventory-prefetch')
+        try:
+            for items in pages:
+                yield from items
+        finally:
+            pages.close()
+
+    def _iter_inventory_pages(self, page_size: int, offset: int):
         while True:
             page = self.list_inventory_items(limit=page_size, offset=offset)
             items = page.get('inventoryItems') or []
-            for item in items:
-                yield item
+            yield items
             # Prefer the explicit pagination signal eBay provides.
             if not page.get('next'):
                 return
@@ -215,10 +353,56 @@ class EbayClient:
             if not items:
                 return
 
+    def bulk_get_inventory_item(self, skus: list[str]) -> list[dict]:
+        """Inventory items for up to 25 SKUs in one call.
+
+        SKUs eBay doesn't know (per-SKU 404) are left out of the result; any
+        other per-SKU failure raises. The call is a POST but only reads, so it
+        is retried like a GET.
+        """
+        if not skus:
+            return []
+        if len(skus) > BULK_GET_MAX:
+            raise ValueError(f'bulk_get_inventory_item accepts at most {BULK_GET_MAX} SKUs per call.')
+        payload = self._request(
+            'POST',
+            '/sell/inventory/v1/bulk_get_inventory_item',
+            json_body={'requests': [{'sku': sku} for sku in skus]},
+            ok_statuses=(200, 207),
+            idempotent=True,
+        )
+        items = []
+        for response in payload.get('responses') or []:
+            status = response.get('statusCode')
+            if status == 404:
+                continue
+            if status != 200:
+                raise EbayApiError(
+                    f'bulk_get_inventory_item failed for sku={response.get("sku")}: '
+                    f'{response.get("errors")}'
+                )
+            item = dict(response.get('inventoryItem') or {})
+            item.setdefault('sku', response.get('sku'))
+            items.append(item)
+        return items
+
+    def list_offers(self, sku: str, limit: int = OFFER_PAGE_SIZE, offset: int = 0) -> dict:
+        """One page of a SKU's offers (getOffers always filters by SKU)."""
+        return self._get(
+            '/sell/inventory/v1/offer',
+            params={'sku': sku, 'limit': limit, 'offset': offset},
+        )
+
     def get_offers_for_sku(self, sku: str) -> list[dict]:
-        """All offers tied to a SKU. Empty list if the SKU has none."""
-        payload = self._get('/sell/inventory/v1/offer', params={'sku': sku})
-        return payload.get('offers') or []
+        """All offers tied to a SKU, across pages. Empty list if it has none."""
+        offers, offset = [], 0
+        while True:
+            payload = self.list_offers(sku, offset=offset)
+            page = payload.get('offers') or []
+            offers.extend(page)
+            if not payload.get('next') or not page:
+                return offers
+            offset += len(page)
 
     _BULK_MIGRATE_MAX = 5  # eBay's hard cap on listings per bulk_migrate_listing call.
 
@@ -281,7 +465,68 @@ class EbayClient:
         params: Optional[dict] = None,
         json_body: Optional[dict] = None,
         ok_statuses: tuple[int, ...] = (200,),
+        idempotent: Optional[bool] = None,
     ) -> dict:
+        """Rate-limited call with retries.
+
+        A 429 is always retried (eBay didn't process the call). Transient 5xx
+        and connection errors are retried only when the call is idempotent —
+        GETs by default. Timed (waits and retries included) under the
+        endpoint's `http.*` phase.
+        """
+        with self.timings.phase(_http_phase(path)):
+            return self._request_with_retries(method, path, params, json_body, ok_statuses, idempotent)
+
+    def _request_with_retries(
+        self,
+        method: str,
+        path: str,
+        params: Optional[dict],
+        json_body: Optional[dict],
+        ok_statuses: tuple[int, ...],
+        idempotent: Optional[bool],
+    ) -> dict:
+        if idempotent is None:
+            idempotent = method == 'GET'
+        attempt = 0
+        while True:
+            self._count(wait_seconds=self.rate_limiter.acquire(), calls=1)
+            try:
+                resp = self._send(method, path, params, json_body)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                if not idempotent or attempt >= self.max_retries:
+                    raise EbayApiError(f'eBay {path} request failed: {exc}') from exc
+                self._backoff(attempt)
+                attempt += 1
+                self._count(retries=1)
+                continue
+
+            if resp.status_code == 429:
+                retry_after = self._retry_after(resp)
+                self._count(throttled=1)
+                self.rate_limiter.throttled(retry_after or 0.0)
+                if attempt >= self.max_retries or (retry_after or 0.0) > MAX_RETRY_AFTER:
+                    return self._handle_response(resp, path, ok_statuses)
+                # With a Retry-After the limiter holds the next acquire() for us.
+                if retry_after is None:
+                    self._backoff(attempt)
+                attempt += 1
+                self._count(retries=1)
+                continue
+            if resp.status_code in RETRY_STATUSES and idempotent and attempt < self.max_retries:
+                retry_after = self._retry_after(resp)
+                if retry_after is not None and retry_after <= MAX_RETRY_AFTER:
+                    self._sleep(retry_after)
+                else:
+                    self._backoff(attempt)
+                attempt += 1
+                self._count(retries=1)
+                continue
+
+            self.rate_limiter.succeeded()
+            return self._handle_response(resp, path, ok_statuses)
+
+    def _send(self, method: str, path: str, params: Optional[dict], json_body: Optional[dict]):
         token = self.ensure_access_token()
         headers = {
             'Authorization': f'Bearer {token}',
@@ -291,7 +536,7 @@ class EbayClient:
         }
         if json_body is not None:
             headers['Content-Type'] = 'application/json'
-        resp = self._session.request(
+        return self._session.request(
             method,
             f'{self.hosts.api}{path}',
             headers=headers,
@@ -299,7 +544,39 @@ class EbayClient:
             json=json_body,
             timeout=30,
         )
-        return self._handle_response(resp, path, ok_statuses)
+
+    def _backoff(self, attempt: int) -> None:
+        """Full-jitter exponential backoff before retry `attempt + 1`."""
+        self._sleep(random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)))
+
+    def _sleep(self, seconds: float) -> None:
+        self._count(wait_seconds=seconds)
+        self.rate_limiter.sleep(seconds)
+
+    def _count(self, *, calls: int = 0, retries: int = 0, throttled: int = 0, wait_seconds: float = 0.0) -> None:
+        with self._stats_lock:
+            self.stats.calls += calls
+            self.stats.retries += retries
+            self.stats.throttled += throttled
+            self.stats.wait_seconds += wait_seconds
+
+    @staticmethod
+    def _retry_after(resp) -> Optional[float]:
+        """Seconds from a `Retry-After` header (delta or HTTP date), if any."""
+        value = (resp.headers or {}).get('Retry-After')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            pass
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if timezone.is_naive(when):
+            when = timezone.make_aware(when, dt.timezone.utc)
+        return max(0.0, (when - timezone.now()).total_seconds())
 
     @staticmethod
     def _handle_response(resp, path: str, ok_statuses: tuple[int, ...]) -> dict:
@@ -322,15 +599,16 @@ class EbayClient:
             raise EbayAuthError('EBAY_APP_ID and EBAY_CERT_ID must be set.')
 
         basic = base64.b64encode(f'{self.app_id}:{self.cert_id}'.encode()).decode()
-        resp = requests.post(
-            f'{self.hosts.api}/identity/v1/oauth2/token',
-            headers={
-                'Authorization': f'Basic {basic}',
-                'Content-Type': 'application/x-www-form-urlencoded',
-            },
-            data=data,
-            timeout=15,
-        )
+        with self.timings.phase('http.token'):
+            resp = requests.post(
+                f'{self.hosts.api}/identity/v1/oauth2/token',
+                headers={
+                    'Authorization': f'Basic {basic}',
+                    'Content-Type': 'application/x-www-form-urlencoded',
+                },
+                data=data,
+                timeout=15,
+            )
         if resp.status_code != 200:
             raise EbayAuthError(
                 f'eBay token endpoint returned {resp.status_code}: {resp.text[:500]}'
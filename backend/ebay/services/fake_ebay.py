@@ -0,0 +1,327 @@
+"""A local stand-in for the eBay Sell Inventory API, for benchmarks.
+
+`FakeEbayServer` is a small threaded HTTP server that serves a synthetic
+seller inventory of `skus` items: inventory pages, bulk reads, offers, an
+OAuth token endpoint and the items' images. Every SKU, offer and image is
+derived from its index, so the same config always serves the same catalog.
+It can also misbehave the way eBay does:
+
+- `latency` (plus up to `jitter`) seconds added to every API response;
+- `throttle_rate`, the share of API calls answered `429` with `Retry-After`;
+- `page_cap`, serving fewer inventory items per page than asked for;
+- `trailing_empty_page`, a `next` link on the last page that leads nowhere;
+- `offers_per_sku` offers per SKU, only one published, and
+  `unpublished_rate`, the share of SKUs with no published offer at all.
+
+Point an `EbayClient` at it with `EbayClient(hosts=server.hosts)`:
+
+    with FakeEbayServer(FakeEbayConfig(skus=1000, latency=0.05)) as server:
+        client = EbayClient(hosts=server.hosts)
+
+`FakeEbayServer` serves from a thread of the calling process, which is
+enough for tests. `FakeEbayProcess` serves the same catalog from a forked
+child process, so that building responses doesn't compete with the sync for
+the GIL; `manage.py bench_ebay_sync` uses it to time full sweeps.
+"""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+from .client import INVENTORY_PAGE_SIZE, OFFER_PAGE_SIZE, EbayHosts
+
+INVENTORY_PATH = '/sell/inventory/v1/inventory_item'
+BULK_GET_PATH = '/sell/inventory/v1/bulk_get_inventory_item'
+OFFER_PATH = '/sell/inventory/v1/offer'
+TOKEN_PATH = '/identity/v1/oauth2/token'
+IMAGE_PREFIX = '/images/'
+
+
+@dataclass
+class FakeEbayConfig:
+    skus: int = 1000
+    latency: float = 0.0
+    jitter: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: float = 1.0
+    page_cap: Optional[int] = None
+    trailing_empty_page: bool = False
+    offers_per_sku: int = 1
+    unpublished_rate: float = 0.0
+    images_per_sku: int = 2
+    # Sellers reuse photos: SKUs share this many distinct images.
+    distinct_images: int = 500
+    categories: int = 8
+    seed: int = 0
+
+    @staticmethod
+    def store_category(n: int) -> str:
+        return f'/Bench/Category-{n}'
+
+
+def sku_for(n: int) -> str:
+    return f'BENCH-{n:06d}'
+
+
+@lru_cache(maxsize=None)
+def _png(image_id: int) -> bytes:
+    from PIL import Image
+
+    buf = BytesIO()
+    Image.new('RGB', (8, 8), color=(image_id % 256, image_id // 256 % 256, 128)).save(buf, format='PNG')
+    return buf.getvalue()
+
+
+class FakeEbayServer:
+    """Serves a `FakeEbayConfig` catalog on 127.0.0.1 from a background thread."""
+
+    def __init__(self, config: Optional[FakeEbayConfig] = None, port: int = 0):
+        self.config = config or FakeEbayConfig()
+        self.requests: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._random = random.Random(self.config.seed)
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', port), _handler(self))
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def hosts(self) -> EbayHosts:
+        return EbayHosts(api=self.url, auth=self.url)
+
+    def start(self) -> 'FakeEbayServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fake-ebay', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> 'FakeEbayServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    # -- Catalog ----------------------------------------------------------
+
+    def _rng(self, n: int) -> random.Random:
+        return random.Random(f'{self.config.seed}:{n}')
+
+    def item(self, n: int) -> dict:
+        config = self.config
+        sku = sku_for(n)
+        first_image = n * config.images_per_sku
+        return {
+            'sku': sku,
+            'product': {
+                'title': f'Bench Card {n:06d}',
+                'description': f'Synthetic listing {sku}.',
+                'brand': 'Pokebin',
+                'imageUrls': [
+                    f'{self.url}{IMAGE_PREFIX}{(first_image + i) % config.distinct_images}.png'
+                    for i in range(config.images_per_sku)
+                ],
+            },
+            'availability': {'shipToLocationAvailability': {'quantity': 1 + n % 5}},
+            'condition': 'NEW',
+        }
+
+    def offers(self, n: int) -> list[dict]:
+        config = self.config
+        sku = sku_for(n)
+        published = self._rng(n).random() >= config.unpublished_rate
+        return [
+            {
+                'offerId': f'OFFER-{sku}-{i}',
+                'sku': sku,
+                'marketplaceId': 'EBAY_US',
+                'format': 'FIXED_PRICE',
+                'status': 'PUBLISHED' if published and i == 0 else 'UNPUBLISHED',
+                'pricingSummary': {'price': {'value': f'{1 + n % 500}.99', 'currency': 'USD'}},
+                'storeCategoryNames': [config.store_category(n % config.categories)],
+                'listingDescription': f'<p>Synthetic listing {sku}.</p>',
+            }
+            for i in range(config.offers_per_sku)
+        ]
+
+    def _index(self, sku: str) -> Optional[int]:
+        prefix, _, digits = sku.partition('-')
+        if prefix != 'BENCH' or not digits.isdigit() or int(digits) >= self.config.skus:
+            return None
+        return int(digits)
+
+    # -- Endpoints --------------------------------------------------------
+
+    def respond(self, method: str, path: str, query: dict, body: Optional[dict]) -> tuple[int, dict, object]:
+        """`(status, headers, payload)` for one request; payload is JSON or bytes."""
+        if path.startswith(IMAGE_PREFIX):
+            self._count('image')
+            image_id = path[len(IMAGE_PREFIX):].split('.', 1)[0]
+            if not image_id.isdigit():
+                return 404, {}, {'errors': [{'message': 'no such image'}]}
+            return 200, {'Content-Type': 'image/png'}, _png(int(image_id))
+        if method == 'POST' and path == TOKEN_PATH:
+            self._count('token')
+            return 200, {}, {'access_token': 'fake-ebay-token', 'expires_in': 7200, 'token_type': 'User Access Token'}
+
+        route = {
+            ('GET', INVENTORY_PATH): 'inventory',
+            ('POST', BULK_GET_PATH): 'bulk_get',
+            ('GET', OFFER_PATH): 'offers',
+        }.get((method, path))
+        if route is None:
+            self._count('not_found')
+            return 404, {}, {'errors': [{'message': f'{method} {path} is not faked'}]}
+        self._count(route)
+        self._delay()
+        if self._throttle():
+            self._count('throttled')
+            headers = {'Retry-After': f'{self.config.retry_after:g}'} if self.config.retry_after else {}
+            return 429, headers, {'errors': [{'errorId': 2001, 'message': 'Too many requests.'}]}
+        return 200, {}, getattr(self, f'_{route}')(query, body or {})
+
+    def _inventory(self, query: dict, body: dict) -> dict:
+        limit = min(int(query.get('limit', INVENTORY_PAGE_SIZE)), INVENTORY_PAGE_SIZE)
+        offset = int(query.get('offset', 0))
+        served = min(limit, self.config.page_cap or limit)
+        items = [self.item(n) for n in range(offset, min(offset + served, self.config.skus))]
+        page = {'total': self.config.skus, 'size': len(items), 'limit': limit, 'inventoryItems': items}
+        following = offset + len(items)
+        if following < self.config.skus or (self.config.trailing_empty_page and items):
+            page['next'] = f'{INVENTORY_PATH}?limit={limit}&offset={following}'
+        return page
+
+    def _bulk_get(self, query: dict, body: dict) -> dict:
+        responses = []
+        for request in body.get('requests') or []:
+            sku = request.get('sku')
+            n = self._index(sku or '')
+            if n is None:
+                responses.append({'statusCode': 404, 'sku': sku, 'errors': [{'errorId': 25702}]})
+            else:
+                responses.append({'statusCode': 200, 'sku': sku, 'inventoryItem': self.item(n)})
+        return {'responses': responses}
+
+    def _offers(self, query: dict, body: dict) -> dict:
+        n = self._index(query.get('sku', ''))
+        offers = [] if n is None else self.offers(n)
+        limit = int(query.get('limit', OFFER_PAGE_SIZE))
+        offset = int(query.get('offset', 0))
+        page = {'total': len(offers), 'size': len(offers[offset:offset + limit]), 'offers': offers[offset:offset + limit]}
+        if offset + limit < len(offers):
+            page['next'] = f'{OFFER_PATH}?sku={query["sku"]}&limit={limit}&offset={offset + limit}'
+        return page
+
+    def _count(self, route: str) -> None:
+        with self._lock:
+            self.requests[route] += 1
+
+    def _delay(self) -> None:
+        if not (self.config.latency or self.config.jitter):
+            return
+        with self._lock:
+            jitter = self._random.uniform(0, self.config.jitter)
+        time.sleep(self.config.latency + jitter)
+
+    def _throttle(self) -> bool:
+        if not self.config.throttle_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.config.throttle_rate
+
+
+class FakeEbayProcess:
+    """A `FakeEbayServer` running in a child process (POSIX only: it forks)."""
+
+    def __init__(self, config: Optional[FakeEbayConfig] = None):
+        self.config = config or FakeEbayConfig()
+        self.url = ''
+        self._process = None
+
+    @property
+    def hosts(self) -> EbayHosts:
+        return EbayHosts(api=self.url, auth=self.url)
+
+    def start(self) -> 'FakeEbayProcess':
+        context = multiprocessing.get_context('fork')
+        receiver, sender = context.Pipe(duplex=False)
+        self._process = context.Process(
+            target=_serve_forever, args=(self.config, sender), name='fake-ebay', daemon=True,
+        )
+        self._process.start()
+        self.url = receiver.recv()
+        return self
+
+    def stop(self) -> None:
+        self._process.terminate()
+        self._process.join()
+
+    def __enter__(self) -> 'FakeEbayProcess':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def _serve_forever(config: FakeEbayConfig, sender) -> None:
+    server = FakeEbayServer(config)
+    sender.send(server.url)
+    server._httpd.serve_forever()
+
+
+def _handler(server: FakeEbayServer) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, so the client's pooled connections are reused as with eBay.
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out in separate writes; with Nagle on, every
+        # response would wait ~40ms for the client's delayed ACK.
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            self._serve('GET')
+
+        def do_POST(self):
+            self._serve('POST')
+
+        def _serve(self, method: str) -> None:
+            parts = urlsplit(self.path)
+            query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+            length = int(self.headers.get('Content-Length') or 0)
+            raw = self.rfile.read(length) if length else b''
+            body = None
+            if raw and 'json' in (self.headers.get('Content-Type') or ''):
+                body = json.loads(raw)
+            status, headers, payload = server.respond(method, parts.path, query, body)
+            if not isinstance(payload, bytes):
+                payload = json.dumps(payload).encode()
+                headers = {'Content-Type': 'application/json', **headers}
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
@@ -0,0 +1,128 @@
+"""Image ingestion for products the eBay sync creates.
+
+A new product needs up to four images from eBay's CDN. `ImageFetcher`
+downloads them over one pooled session, a bounded number at a time (on the
+sync's thread pool), streaming each body to a temporary file while hashing
+it. The file is stored under its SHA-256 (`images/ebay/<sha256><ext>`), so a
+byte-identical image — sellers reuse stock photos across listings — is
+uploaded once and every product that uses it references the same object.
+Downloads and storage writes are timed separately (`image.download`,
+`image.store`) in `timings`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import Executor
+from typing import Iterable, Optional
+from urllib.parse import urlparse
+
+import requests
+from django.core.files import File
+from django.core.files.storage import default_storage
+from requests.adapters import HTTPAdapter
+
+from .timing import PhaseTimer
+
+logger = logging.getLogger(__name__)
+
+IMAGE_DIR = 'images/ebay'
+CHUNK_SIZE = 64 * 1024
+# Bodies up to this size stay in memory; larger ones spill to disk.
+SPOOL_SIZE = 1024 * 1024
+# eBay serves at most a few MB per image; anything bigger isn't a photo.
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+DOWNLOAD_TIMEOUT = 20
+
+
+def storage_name(url: str, sha256: str) -> str:
+    # Keep eBay's extension when it has one.
+    ext = os.path.splitext(urlparse(url).path)[1].lower() or '.jpg'
+    return f'{IMAGE_DIR}/{sha256}{ext}'
+
+
+class ImageFetcher:
+    """Downloads and stores images, each distinct URL and body once per sweep."""
+
+    def __init__(self, pool_size: int = 8, storage=None):
+        self.storage = storage or default_storage
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._stored_by_url: dict[str, Optional[str]] = {}
+        self._stored_names: set[str] = set()
+        self._name_locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.timings = PhaseTimer()
+
+    def fetch_all(self, pool: Executor, urls: Iterable[str]) -> dict[str, Optional[str]]:
+        """Store every URL's image; map each URL to its storage name.
+
+        A URL that can't be fetched maps to None. Runs the downloads on
+        `pool`, so at most its worker count are in flight.
+        """
+        urls = [url for url in urls if url]
+        todo = [url for url in dict.fromkeys(urls) if url not in self._stored_by_url]
+        for url, name in zip(todo, pool.map(self._fetch, todo)):
+            self._stored_by_url[url] = name
+        return {url: self._stored_by_url[url] for url in urls}
+
+    def _fetch(self, url: str) -> Optional[str]:
+        started = self.timings.clock()
+        try:
+            resp = self.session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT)
+        except requests.RequestException as exc:
+            logger.warning('image download failed for %s: %s', url, exc)
+            return None
+        try:
+            if resp.status_code != 200:
+                logger.warning('image %s returned %s', url, resp.status_code)
+                return None
+            with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as body:
+                digest = hashlib.sha256()
+                size = 0
+                for chunk in resp.iter_content(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > MAX_IMAGE_BYTES:
+                        logger.warning('image %s is larger than %d bytes; skipped', url, MAX_IMAGE_BYTES)
+                        return None
+                    digest.update(chunk)
+                    body.write(chunk)
+                if not size:
+                    logger.warning('image %s returned an empty body', url)
+                    return None
+                self.timings.record('image.download', self.timings.clock() - started)
+                self._downloaded(url, digest.hexdigest(), body)
+                return self._store(storage_name(url, digest.hexdigest()), body)
+        except requests.RequestException as exc:
+            logger.warning('image download failed for %s: %s', url, exc)
+            return None
+        finally:
+            resp.close()
+
+    def _downloaded(self, url: str, sha256: str, body) -> None:
+        """Called with each downloaded body before it is stored; a hook for recording."""
+
+    def _store(self, name: str, body) -> str:
+        # One lock per content hash: two threads holding the same bytes must
+        # not both miss `exists` and save (the second would get a renamed copy).
+        with self._lock:
+            if name in self._stored_names:
+                return name
+            name_lock = self._name_locks.setdefault(name, threading.Lock())
+        with name_lock:
+            if name in self._stored_names:
+                return name
+            # Stored by an earlier sweep (or another listing): reference it.
+            with self.timings.phase('image.store'):
+                if not self.storage.exists(name):
+                    body.seek(0)
+                    name = self.storage.save(name, File(body, name=name))
+            with self._lock:
+                self._stored_names.add(name)
+        return name
@@ -0,0 +1,273 @@
+"""Run eBay sweeps as background jobs instead of inside a web request.
+
+`enqueue_sync` is what the admin "Sync now" button calls: it inserts a
+`queued` `EbaySyncJob` (or returns the one already queued or running) and
+returns immediately. `run_next_job` is the worker side, driven by
+`manage.py run_sync_jobs`: it claims the oldest queued job, runs
+`SyncService.sync_all()` with a progress hook that writes pages/SKUs/counts
+back to the row after every page, and records the final `SyncReport` (or the
+error) when the sweep ends.
+
+Only one sweep runs at a time. The `ebay_sync_job_one_running` constraint
+allows a single `running` row, so a second worker (or a CLI run via
+`start_sync`) that tries to start one while another is live gets an
+IntegrityError and backs off. `ebay_sync_job_one_queued_per_mode` keeps one
+live and one dry-run job waiting, so a queued dry run never absorbs live
+work. A running job whose heartbeat stops for
+`STALE_AFTER` is assumed to have lost its worker and goes back in the queue,
+so the lock can't outlive a crash.
+
+Every page's `SyncCheckpoint` is saved on the job. A job that is re-queued
+after a crash resumes from its own checkpoint; a new job started soon after
+a failed one (within `RESUME_WITHIN`) resumes from that one's. Either way a
+failure costs the pages since the last checkpoint, not the whole sweep.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import logging
+from typing import Optional
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from ebay.models import EbaySyncJob
+
+from .sync import SyncCheckpoint, SyncReport, SyncService
+
+logger = logging.getLogger(__name__)
+
+# A page of 100 SKUs (offers + images) takes well under a minute; this much
+# silence means the worker running the job is gone.
+STALE_AFTER = dt.timedelta(minutes=15)
+# How old a failed sweep's checkpoint may be for the next sweep to pick it up.
+# Older than this, the pages it covered are too stale to skip.
+RESUME_WITHIN = dt.timedelta(hours=6)
+
+
+class SyncJobBusy(Exception):
+    """Another sweep is already running."""
+
+    def __init__(self, job: EbaySyncJob):
+        super().__init__(f'eBay sync #{job.pk} is already {job.status}.')
+        self.job = job
+
+
+def active_job() -> Optional[EbaySyncJob]:
+    """The running job if there is one, else the queued one, else None."""
+    recover_stale_jobs()
+    return (
+        EbaySyncJob.objects.filter(status__in=EbaySyncJob.ACTIVE_STATUSES)
+        .order_by('-status', 'pk')  # 'running' sorts after 'queued'
+        .first()
+    )
+
+
+def enqueue_sync(
+    *, requested_by=None, dry_run: bool = False, skus: Optional[list[str]] = None,
+) -> tuple[EbaySyncJob, bool]:
+    """Queue a sweep — or, given `skus`, a targeted re-sync — for the worker.
+
+    Returns `(job, created)`. One live and one dry-run job wait in the
+    queue: a request made while one of its kind is queued gets that job back
+    (`created=False`), widened to cover the request if it was a targeted one.
+    A full sweep is also refused while another full sweep of its kind is
+    running; a targeted re-sync may queue behind it.
+    """
+    skus = sorted(set(skus or ()))
+    recover_stale_jobs()
+    with transaction.atomic():
+        queued = (
+            EbaySyncJob.objects.select_for_update()
+            .filter(status=EbaySyncJob.QUEUED, dry_run=dry_run)
+            .first()
+        )
+        if queued is not None:
+            if queued.is_targeted:
+                queued.skus = sorted(set(queued.skus) | set(skus)) if skus else []
+                queued.save(update_fields=['skus'])
+            return queued, False
+        if not skus:
+            running = EbaySyncJob.objects.filter(status=EbaySyncJob.RUNNING).first()
+            if running is not None and not running.is_targeted and running.dry_run == dry_run:
+                return running, False
+    try:
+        with transaction.atomic():
+            job = EbaySyncJob.objects.create(requested_by=requested_by, dry_run=dry_run, skus=skus)
+    except IntegrityError:
+        # Another request queued one between our check and the insert: merge
+        # into that one instead.
+        return enqueue_sync(requested_by=requested_by, dry_run=dry_run, skus=skus)
+    return job, True
+
+
+def start_sync(
+    *, requested_by=None, dry_run: bool = False, skus: Optional[list[str]] = None, resume: bool = True,
+) -> EbaySyncJob:
+    """Record a sweep that starts right now in this process (the CLI path).
+
+    With `resume=False` the sweep starts at the top of the feed even if a
+    recent one failed part-way (a recording must cover the whole feed).
+    Raises `SyncJobBusy` if another sweep is running.
+    """
+    recover_stale_jobs()
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            job = EbaySyncJob.objects.create(
+                status=EbaySyncJob.RUNNING, requested_by=requested_by, dry_run=dry_run,
+                skus=sorted(set(skus or ())), started_at=now, heartbeat_at=now,
+            )
+            if resume:
+                _resume_previous(job)
+    except IntegrityError:
+        raise SyncJobBusy(EbaySyncJob.objects.get(status=EbaySyncJob.RUNNING)) from None
+    return job
+
+
+def claim_next_job() -> Optional[EbaySyncJob]:
+    """Mark the oldest queued job running and return it.
+
+    Returns None when nothing is queued or a sweep is already running.
+    """
+    recover_stale_jobs()
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            if EbaySyncJob.objects.filter(status=EbaySyncJob.RUNNING).exists():
+                return None
+            job = (
+                EbaySyncJob.objects.select_for_update(skip_locked=True)
+                .filter(status=EbaySyncJob.QUEUED)
+                .order_by('created_at', 'pk')
+                .first()
+            )
+            if job is None:
+                return None
+            job.status = EbaySyncJob.RUNNING
+            # A re-queued job keeps its original start time.
+            job.started_at = job.started_at or now
+            job.heartbeat_at = now
+            job.save(update_fields=['status', 'started_at', 'heartbeat_at'])
+            if not job.checkpoint:
+                _resume_previous(job)
+    except IntegrityError:
+        # Lost the race to another worker starting a sweep.
+        return None
+    return job
+
+
+def run_job(job: EbaySyncJob, service: Optional[SyncService] = None) -> SyncReport:
+    """Run a claimed job's sweep, recording progress and the outcome.
+
+    Re-raises whatever the sweep raised after marking the job failed.
+    """
+    def progress(checkpoint: SyncCheckpoint) -> None:
+        EbaySyncJob.objects.filter(pk=job.pk).update(
+            pages_fetched=checkpoint.pages,
+            skus_processed=checkpoint.report.processed,
+            report=checkpoint.report.as_dict(),
+            checkpoint=checkpoint.as_dict(),
+            heartbeat_at=timezone.now(),
+        )
+
+    if service is None:
+        service = SyncService(dry_run=job.dry_run, progress=progress)
+    else:
+        service.progress = progress
+    checkpoint = None
+    # A two-phase sweep reports progress at offset 0: nothing to skip.
+    if job.checkpoint.get('offset') and not job.is_targeted:
+        checkpoint = SyncCheckpoint.from_dict(job.checkpoint)
+        logger.info('eBay sync #%s resuming at offset %s', job.pk, checkpoint.offset)
+    try:
+        if job.is_targeted:
+            # A SKU list is short; re-running it whole beats resuming.
+            report = service.sync_skus(job.skus)
+        else:
+            report = service.sync_all(checkpoint)
+    except BaseException as exc:
+        _finish(job, EbaySyncJob.FAILED, error=str(exc) or exc.__class__.__name__)
+        raise
+    _finish(job, EbaySyncJob.SUCCEEDED, report=report)
+    return report
+
+
+def run_next_job() -> Optional[EbaySyncJob]:
+    """Claim and run one queued job; the finished job, or None if idle."""
+    job = claim_next_job()
+    if job is None:
+        return None
+    try:
+        run_job(job)
+    except Exception:  # noqa: BLE001 — recorded on the job; keep the worker alive
+        logger.exception('eBay sync #%s failed', job.pk)
+    job.refresh_from_db()
+    return job
+
+
+def recover_stale_jobs() -> int:
+    """Re-queue running jobs whose worker stopped sending heartbeats.
+
+    The job resumes from its checkpoint when claimed again. If another job of
+    its kind (live or dry run) is already queued, the stale one is failed
+    instead and the queued one picks up its checkpoint.
+    """
+    stale = list(EbaySyncJob.objects.filter(
+        status=EbaySyncJob.RUNNING, heartbeat_at__lt=timezone.now() - STALE_AFTER,
+    ).values_list('pk', flat=True))
+    for pk in stale:
+        try:
+            with transaction.atomic():
+                EbaySyncJob.objects.filter(pk=pk, status=EbaySyncJob.RUNNING).update(
+                    status=EbaySyncJob.QUEUED,
+                )
+        except IntegrityError:
+            EbaySyncJob.objects.filter(pk=pk, status=EbaySyncJob.RUNNING).update(
+                status=EbaySyncJob.FAILED,
+                error='Worker stopped reporting progress; sweep abandoned.',
+                finished_at=timezone.now(),
+            )
+    return len(stale)
+
+
+def _resume_previous(job: EbaySyncJob) -> None:
+    """Start `job` from the checkpoint of the full sweep before it, if that failed recently."""
+    if job.is_targeted:
+        return
+    previous = (
+        # Targeted re-syncs in between don't cover the feed; look past them.
+        EbaySyncJob.objects.filter(finished_at__isnull=False, skus=[])
+        .exclude(pk=job.pk)
+        .order_by('-finished_at', '-pk')
+        .first()
+    )
+    if (
+        previous is None
+        or previous.status != EbaySyncJob.FAILED
+        or not previous.checkpoint.get('offset')
+        or previous.dry_run != job.dry_run
+        or previous.finished_at < timezone.now() - RESUME_WITHIN
+    ):
+        return
+    job.checkpoint = previous.checkpoint
+    job.resumed_from = previous
+    job.pages_fetched = previous.pages_fetched
+    job.skus_processed = previous.skus_processed
+    job.report = previous.report
+    job.save(update_fields=['checkpoint', 'resumed_from', 'pages_fetched', 'skus_processed', 'report'])
+
+
+def _finish(job: EbaySyncJob, status: str, *, report: Optional[SyncReport] = None, error: str = '') -> None:
+    values = {'status': status, 'error': error[:1000], 'finished_at': timezone.now()}
+    if report is not None:
+        # A finished sweep has nothing to resume; drop the (large) SKU sets.
+        values.update(
+            report=report.as_dict(),
+            skus_processed=report.processed,
+            checkpoint={},
+        )
+    EbaySyncJob.objects.filter(pk=job.pk).update(**values)
+    for name, value in values.items():
+        setattr(job, name, value)
@@ -0,0 +1,102 @@
+"""Client-side rate limiting for eBay REST calls.
+
+`RateLimiter` is a token bucket shared by every thread using one
+`EbayClient`. Each call takes a token; when the bucket is empty the caller
+sleeps until one refills. The refill rate adapts: a 429 halves it (down to
+`min_rate`) and successful calls grow it back towards the configured rate,
+so a sweep settles just under whatever eBay is currently willing to serve.
+A `Retry-After` from eBay pauses the whole bucket, not just the thread that
+got it, since every other in-flight call would be throttled too.
+
+`ApiStats` holds the counters the client exposes (calls, retries, 429s and
+the time spent waiting on the limiter or backing off).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass
+class ApiStats:
+    calls: int = 0
+    retries: int = 0
+    throttled: int = 0
+    wait_seconds: float = 0.0
+
+    def as_text(self) -> str:
+        return (
+            f'API calls: {self.calls} (retries={self.retries}, throttled={self.throttled}, '
+            f'waited={self.wait_seconds:.1f}s)'
+        )
+
+
+class RateLimiter:
+    """Thread-safe, adaptive token bucket."""
+
+    # Share of the configured rate regained per successful call after a 429.
+    RECOVERY = 0.02
+    # Refills are float sums: a bucket can settle at 0.99999… tokens, whose
+    # remaining wait is too small to move the clock. Count that as a token,
+    # and never sleep for less than MIN_WAIT (which would only spin).
+    TOLERANCE = 1e-9
+    MIN_WAIT = 1e-3
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        *,
+        min_rate: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self.clock = clock
+        self.sleep = sleep
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available; seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._refill(now)
+                delay = self._paused_until - now
+                if delay <= 0:
+                    if self._tokens >= 1 - self.TOLERANCE:
+                        self._tokens -= 1
+                        return waited
+                    delay = max(self.MIN_WAIT, (1 - self._tokens) / self.rate)
+            self.sleep(delay)
+            waited += delay
+
+    def throttled(self, retry_after: float = 0.0) -> None:
+        """eBay answered 429: slow down, and hold every caller for `retry_after`."""
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            self._paused_until = max(self._paused_until, now + retry_after)
+
+    def succeeded(self) -> None:
+        if self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * self.RECOVERY)
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(float(self.burst), self._tokens + elapsed * self.rate)
+        self._updated = now
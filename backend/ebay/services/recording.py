@@ -0,0 +1,199 @@
+"""Record a sweep's eBay responses to disk and replay them offline.
+
+`RecordingClient` is an `EbayClient` that also appends every API response
+it gets — each inventory page, bulk read and offer page — to
+`<dir>/responses.ndjson.gz`, one JSON object per line. Failed calls are
+recorded too (as their error message), so a replay fails the same SKUs.
+
+Images the recorded sweep downloads are kept too, one file per distinct body
+under `<dir>/images/` (named by SHA-256), with `<dir>/images.ndjson` mapping
+each URL to its body. A dry run downloads no images, so its recording has
+none.
+
+`ReplayClient` is a drop-in `EbayClient` that serves those responses without
+touching the network. Inventory pages are replayed from the recorded items
+for any page size or offset; every other call must match a recorded one
+exactly (method, path, params and body) or raises `EbayApiError`. Its image
+source serves recorded bodies, and stores a small generated stand-in for any
+image URL the recording doesn't have, so a replay into an empty database
+creates every product without going to eBay's CDN.
+
+    python manage.py sync_ebay --dry-run --record /tmp/ebay-snapshot
+    python manage.py sync_ebay --replay /tmp/ebay-snapshot
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from io import BytesIO
+from typing import Optional
+
+from .client import INVENTORY_PAGE_SIZE, EbayApiError, EbayClient
+from .images import IMAGE_DIR, ImageFetcher, storage_name
+
+logger = logging.getLogger(__name__)
+
+RECORDING_FILE = 'responses.ndjson.gz'
+IMAGE_INDEX_FILE = 'images.ndjson'
+IMAGE_BODY_DIR = 'images'
+INVENTORY_PATH = '/sell/inventory/v1/inventory_item'
+
+
+def _key(method: str, path: str, params: Optional[dict], json_body: Optional[dict]) -> str:
+    return json.dumps([method, path, params or {}, json_body], sort_keys=True, separators=(',', ':'))
+
+
+class RecordingClient(EbayClient):
+    """An `EbayClient` that writes every response to `directory` as it goes."""
+
+    def __init__(self, directory: str, env: Optional[str] = None, **kwargs):
+        super().__init__(env, **kwargs)
+        self.image_dir = os.path.join(directory, IMAGE_BODY_DIR)
+        os.makedirs(self.image_dir, exist_ok=True)
+        self.path = os.path.join(directory, RECORDING_FILE)
+        self._file = gzip.open(self.path, 'wt', encoding='utf-8')
+        self._image_index = open(os.path.join(directory, IMAGE_INDEX_FILE), 'w', encoding='utf-8')
+        # Offer pages arrive from the sync's pool, inventory pages from the
+        # prefetch thread; one line must not interleave with another.
+        self._write_lock = threading.Lock()
+
+    def _request(self, method, path, *, params=None, json_body=None, **kwargs) -> dict:
+        entry = {'method': method, 'path': path, 'params': params or {}, 'json': json_body}
+        try:
+            entry['response'] = super()._request(method, path, params=params, json_body=json_body, **kwargs)
+        except EbayApiError as exc:
+            entry['error'] = str(exc)
+            self._write(entry)
+            raise
+        self._write(entry)
+        return entry['response']
+
+    def _write(self, entry: dict) -> None:
+        line = json.dumps(entry, separators=(',', ':'), default=str)
+        with self._write_lock:
+            self._file.write(line + '\n')
+
+    def image_fetcher(self, pool_size: int) -> ImageFetcher:
+        return _RecordingImageFetcher(self, pool_size=pool_size)
+
+    def record_image(self, url: str, sha256: str, body) -> None:
+        path = os.path.join(self.image_dir, sha256)
+        with self._write_lock:
+            if not os.path.exists(path):
+                body.seek(0)
+                with open(path, 'wb') as out:
+                    shutil.copyfileobj(body, out)
+            self._image_index.write(json.dumps({'url': url, 'sha256': sha256}) + '\n')
+
+    def close(self) -> None:
+        with self._write_lock:
+            self._file.close()
+            self._image_index.close()
+
+
+class ReplayClient(EbayClient):
+    """An `EbayClient` that answers from a `RecordingClient` recording."""
+
+    def __init__(self, directory: str, env: Optional[str] = None, **kwargs):
+        super().__init__(env, **kwargs)
+        self.directory = directory
+        self.path = os.path.join(directory, RECORDING_FILE)
+        self._images: dict[str, str] = {}
+        index = os.path.join(directory, IMAGE_INDEX_FILE)
+        if os.path.exists(index):
+            with open(index, encoding='utf-8') as lines:
+                for line in lines:
+                    entry = json.loads(line)
+                    self._images[entry['url']] = entry['sha256']
+        # Responses stay serialized until served, so callers that annotate
+        # what they get back (e.g. `bulk_get_inventory_item`) can't alter
+        # the next replay of the same call.
+        self._responses: dict[str, str] = {}
+        pages: dict[int, list[dict]] = {}
+        with gzip.open(self.path, 'rt', encoding='utf-8') as recording:
+            for line in recording:
+                entry = json.loads(line)
+                if entry['method'] == 'GET' and entry['path'] == INVENTORY_PATH and 'response' in entry:
+                    offset = int(entry['params'].get('offset', 0))
+                    pages[offset] = entry['response'].get('inventoryItems') or []
+                    continue
+                key = _key(entry['method'], entry['path'], entry['params'], entry['json'])
+                self._responses[key] = json.dumps(
+                    {'error': entry['error']} if 'error' in entry else {'response': entry['response']},
+                )
+        self._items = [item for offset in sorted(pages) for item in pages[offset]]
+
+    def _request(self, method, path, *, params=None, json_body=None, **kwargs) -> dict:
+        self._count(calls=1)
+        if method == 'GET' and path == INVENTORY_PATH:
+            params = params or {}
+            return self._inventory_page(
+                int(params.get('limit', INVENTORY_PAGE_SIZE)), int(params.get('offset', 0)),
+            )
+        try:
+            recorded = json.loads(self._responses[_key(method, path, params, json_body)])
+        except KeyError:
+            raise EbayApiError(f'{method} {path} {params or {}} is not in the recording {self.path}') from None
+        if 'error' in recorded:
+            raise EbayApiError(recorded['error'])
+        return recorded['response']
+
+    def image_fetcher(self, pool_size: int) -> ImageFetcher:
+        return _ReplayImageFetcher(os.path.join(self.directory, IMAGE_BODY_DIR), self._images, pool_size=pool_size)
+
+    def _inventory_page(self, limit: int, offset: int) -> dict:
+        items = self._items[offset:offset + limit]
+        page = {'inventoryItems': items, 'total': len(self._items), 'size': len(items), 'limit': limit}
+        if offset + limit < len(self._items):
+            page['next'] = f'{INVENTORY_PATH}?limit={limit}&offset={offset + limit}'
+        return page
+
+
+class _RecordingImageFetcher(ImageFetcher):
+    """Downloads as usual, and saves every body it gets into the recording."""
+
+    def __init__(self, client: RecordingClient, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+
+    def _downloaded(self, url: str, sha256: str, body) -> None:
+        self.client.record_image(url, sha256, body)
+
+
+class _ReplayImageFetcher(ImageFetcher):
+    """Stores recorded image bodies, or a stand-in; never downloads."""
+
+    def __init__(self, body_dir: str, recorded: dict[str, str], **kwargs):
+        super().__init__(**kwargs)
+        # Anything that still tries the network fails loudly.
+        self.session = None
+        self.body_dir = body_dir
+        self.recorded = recorded
+        self.stand_ins = 0
+
+    def _fetch(self, url: str) -> Optional[str]:
+        sha256 = self.recorded.get(url)
+        if sha256 is not None:
+            with open(os.path.join(self.body_dir, sha256), 'rb') as body:
+                return self._store(storage_name(url, sha256), body)
+        logger.debug('image %s is not in the recording; storing a stand-in', url)
+        with self._lock:
+            self.stand_ins += 1
+        body = _stand_in(url)
+        return self._store(f'{IMAGE_DIR}/{hashlib.sha256(body).hexdigest()}.png', BytesIO(body))
+
+
+def _stand_in(url: str) -> bytes:
+    """A tiny PNG whose colour is derived from `url`, so equal URLs share one file."""
+    from PIL import Image
+
+    red, green, blue = hashlib.sha256(url.encode()).digest()[:3]
+    buf = BytesIO()
+    Image.new('RGB', (8, 8), color=(red, green, blue)).save(buf, format='PNG')
+    return buf.getvalue()
@@ -7,31 +7,86 @@ SKU. The SKU is the stable idempotency key — it lives on both
 
 This module knows nothing about HTTP — `EbayClient` does. That keeps the
 sync logic unit-testable with a mock client.
+
+Offer lookups (one HTTP round-trip per SKU) dominate a sweep, so they are
+fetched a page at a time on a small thread pool; everything that touches the
+database stays on the calling thread, in feed order.
+
+Each synced SKU's `EbayListing` stores a fingerprint of the eBay fields we
+consume. When a sweep computes the same fingerprint for a SKU that is already
+`synced`, nothing is written for it and it is counted as `unchanged`.
+
+Writes are batched per page: the page's existing Products and EbayListings
+are loaded with one query each, per-item decisions only stage changes in
+memory, and `_flush_page` applies them with `bulk_create` / `bulk_update`.
+Bulk writes skip model signals, so the flush re-indexes search itself and the
+sweep bumps the catalog version at the end. Images for the page's new
+products are downloaded together, on the same pool, just before the flush
+(see `ebay.services.images`).
+
+A sweep can be resumed. After every flushed page the `SyncCheckpoint` (feed
+offset, SKUs seen, SKUs found unsellable, running report) goes to the
+`progress` hook, which the job runner persists; `sync_all(checkpoint)` picks
+up from the first page not yet written. A crash between a flush and its
+checkpoint replays that one page, which the fingerprints make idempotent.
+Deactivation only runs once a sweep has reached the end of the feed.
+
+`sync_skus` re-syncs a given list of SKUs through the same per-page path,
+reading their items with `bulk_get_inventory_item` (25 per call, on the
+pool) instead of walking the feed.
+
+`plan` / `apply` split a sweep in two. `plan` reads the whole feed and
+decides every change against one snapshot of the eBay products and listings
+(two queries), staging exactly what `sync_all` would write without writing
+it; `SyncPlan.as_text()` is the resulting diff — creates, field-level updates
+and deactivations. `apply` then downloads the new products' images and writes
+the plan a page per transaction. A dry-run `plan` is therefore a pure read
+with an exact diff. With `two_phase=True`, `sync_all` runs the two back to
+back (a failed two-phase sweep restarts from the top).
+
+`sync_stock` is the cheap refresh between sweeps: it reads only quantity and
+offer price for SKUs already in the catalog and writes each page's changes
+with a single `UPDATE ... CASE` on `Product.stock` / `price`. It never
+creates products or touches images, slugs, categories or `EbayListing` rows.
 """
 
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
-import os
-from dataclasses import dataclass, field
-from io import BytesIO
-from typing import Optional
-from urllib.parse import urlparse
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from decimal import Decimal
+from itertools import islice
+from typing import Callable, Optional
 
-import requests
 from django.conf import settings
-from django.core.files.base import ContentFile
-from django.db import transaction
+from django.db import connections, transaction
+from django.db.models import Case, DecimalField, PositiveIntegerField, Value, When
 from django.utils import timezone
 from django.utils.text import slugify
 
 from ebay.models import EbayCategoryMapping, EbayListing
-from store.models import Product
+from store import search
+from store.models import CatalogVersion, Category, Product
 
-from .client import EbayApiError, EbayClient
+from .client import BULK_GET_MAX, INVENTORY_PAGE_SIZE, EbayApiError, EbayClient
+from .images import ImageFetcher
+from .timing import PhaseTimer, log_phases, merge_phases, phase_lines
 
 logger = logging.getLogger(__name__)
 
+# Inventory items taken from the feed per prefetch round (one API page).
+OFFER_PREFETCH_BATCH = INVENTORY_PAGE_SIZE
+
+# Columns a sync update writes (bulk_update needs them spelled out).
+PRODUCT_SYNC_FIELDS = ['title', 'brand', 'description', 'price', 'stock', 'category', 'updated_at']
+LISTING_SYNC_FIELDS = [
+    'product', 'ebay_store_category_id', 'ebay_last_modified', 'content_fingerprint',
+    'last_synced_at', 'sync_state', 'sync_error', 'updated_at',
+]
+
 
 @dataclass
 class SyncReport:
@@ -39,18 +94,22 @@ class SyncReport:
     updated: int = 0
     skipped: int = 0
     errors: int = 0
+    unchanged: int = 0
     deactivated: int = 0
     error_details: list[str] = field(default_factory=list)
+    # phase -> {calls, seconds, histogram}; see `ebay.services.timing`.
+    phases: dict[str, dict] = field(default_factory=dict)
 
     @property
     def processed(self) -> int:
-        return self.created + self.updated + self.skipped + self.errors
+        return self.created + self.updated + self.unchanged + self.skipped + self.errors
 
     def as_text(self) -> str:
         lines = [
             f'Processed: {self.processed}',
             f'  created: {self.created}',
             f'  updated: {self.updated}',
+            f'  unchanged: {self.unchanged}',
             f'  skipped: {self.skipped}',
             f'  errors:  {self.errors}',
             f'  deactivated: {self.deactivated}',
@@ -60,48 +119,425 @@ class SyncReport:
             lines.extend(f'  - {detail}' for detail in self.error_details[:20])
             if len(self.error_details) > 20:
                 lines.append(f'  … ({len(self.error_details) - 20} more)')
+        if self.phases:
+            lines.append('Timing (pool phases overlap):')
+            lines.extend(f'  {line}' for line in phase_lines(self.phases))
         return '\n'.join(lines)
 
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class SyncCheckpoint:
+    """Where a sweep has got to, as of its last flushed page."""
+
+    # Inventory items consumed from the feed; the offset to resume at.
+    offset: int = 0
+    pages: int = 0
+    seen_skus: set[str] = field(default_factory=set)
+    unsellable_skus: set[str] = field(default_factory=set)
+    report: SyncReport = field(default_factory=SyncReport)
+
+    def as_dict(self) -> dict:
+        return {
+            'offset': self.offset,
+            'pages': self.pages,
+            'seen_skus': sorted(self.seen_skus),
+            'unsellable_skus': sorted(self.unsellable_skus),
+            'report': self.report.as_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'SyncCheckpoint':
+        return cls(
+            offset=data.get('offset', 0),
+            pages=data.get('pages', 0),
+            seen_skus=set(data.get('seen_skus', ())),
+            unsellable_skus=set(data.get('unsellable_skus', ())),
+            report=SyncReport(**data.get('report', {})),
+        )
+
+
+@dataclass
+class _StagedUpsert:
+    sku: str
+    product: Product
+    created: bool
+    store_category: str
+    fingerprint: str
+    # eBay image URLs for a new product, resolved by `_attach_images`.
+    image_urls: list[str] = field(default_factory=list)
+    # field -> (old, new) for an existing product.
+    changes: dict[str, tuple] = field(default_factory=dict)
+
+
+@dataclass
+class _SyncPage:
+    """One page of SKUs: what the DB already holds, and what to write back."""
+
+    products: dict[str, Product]
+    listings: dict[str, EbayListing]
+    # False for a plain dry run: decisions are only counted, not staged.
+    stage: bool = True
+    upserts: list[_StagedUpsert] = field(default_factory=list)
+    # sku -> (sync_state, sync_error) for skipped / errored SKUs.
+    outcomes: dict[str, tuple[str, str]] = field(default_factory=dict)
+
+
+@dataclass
+class SyncPlan:
+    """Everything a sweep would change, decided before anything is written."""
+
+    report: SyncReport = field(default_factory=SyncReport)
+    # One dict per new product: sku, title, price, stock, category_id.
+    creates: list[dict] = field(default_factory=list)
+    # sku -> {field: (old, new)}; empty when only the listing's fingerprint moves.
+    updates: dict[str, dict[str, tuple]] = field(default_factory=dict)
+    # SKUs whose stock goes to 0 (no published offer).
+    deactivations: list[str] = field(default_factory=list)
+    pages: list[_SyncPage] = field(default_factory=list, repr=False)
+
+    def as_text(self, limit: int = 50) -> str:
+        changed = {sku: diff for sku, diff in self.updates.items() if diff}
+        lines = [
+            f'Plan: {len(self.creates)} to create, {len(changed)} to update '
+            f'(+{len(self.updates) - len(changed)} listing-only), '
+            f'{len(self.deactivations)} to deactivate',
+        ]
+        for create in self.creates[:limit]:
+            lines.append(
+                f'+ {create["sku"]}: {create["title"]!r} price={create["price"]} '
+                f'stock={create["stock"]} category={create["category_id"]}'
+            )
+        for sku, diff in list(changed.items())[:limit]:
+            lines.append(f'~ {sku}: ' + ', '.join(
+                f'{name} {_short(old)} → {_short(new)}' for name, (old, new) in diff.items()
+            ))
+        for sku in self.deactivations[:limit]:
+            lines.append(f'- {sku}: stock → 0')
+        hidden = sum(max(0, n - limit) for n in (len(self.creates), len(changed), len(self.deactivations)))
+        if hidden:
+            lines.append(f'… ({hidden} more)')
+        lines.append(self.report.as_text())
+        return '\n'.join(lines)
+
+
+def _short(value, width: int = 40) -> str:
+    text = repr(value) if isinstance(value, str) else str(value)
+    return text if len(text) <= width else text[:width - 1] + '…'
+
 
 class SyncService:
     """Orchestrates a single sweep of the seller's eBay inventory.
 
-    Caller is expected to handle scheduling (cron, admin button, etc.).
+    Caller is expected to handle scheduling (see `ebay.services.jobs`).
+    `progress`, if given, is called with the sweep's `SyncCheckpoint` after
+    every page.
     """
 
-    def __init__(self, client: Optional[EbayClient] = None, *, dry_run: bool = False):
-        self.client = client or EbayClient()
+    def __init__(
+        self,
+        client: Optional[EbayClient] = None,
+        *,
+        dry_run: bool = False,
+        concurrency: Optional[int] = None,
+        progress: Optional[Callable[[SyncCheckpoint], None]] = None,
+        two_phase: bool = False,
+    ):
+        self.concurrency = max(1, concurrency or getattr(settings, 'EBAY_SYNC_CONCURRENCY', 8))
+        self.client = client or EbayClient(pool_size=self.concurrency)
+        # A recording or replaying client brings its own image source.
+        image_fetcher = getattr(self.client, 'image_fetcher', None)
+        self.images = (
+            image_fetcher(self.concurrency) if image_fetcher else ImageFetcher(pool_size=self.concurrency)
+        )
         self.dry_run = dry_run
+        self.progress = progress
+        self.two_phase = two_phase
+        self.timings = PhaseTimer()
+        self._base_phases: dict[str, dict] = {}
+        self._started = self.timings.clock()
+        # Every Product slug, loaded once per sweep on the first create.
+        self._slugs: Optional[set[str]] = None
+        self._fallback_category: Optional[Category] = None
 
-    def sync_all(self) -> SyncReport:
-        report = SyncReport()
+    def sync_all(self, checkpoint: Optional[SyncCheckpoint] = None) -> SyncReport:
+        """Sweep the inventory feed, or finish the sweep `checkpoint` describes."""
+        if self.two_phase:
+            # Nothing is written until the plan is complete, so there is no
+            # partial sweep to resume.
+            plan = self.plan()
+            return plan.report if self.dry_run else self.apply(plan)
+        checkpoint = checkpoint or SyncCheckpoint()
+        report = checkpoint.report
+        self._start_timing(report)
         mapping_lookup = self._load_category_mappings()
         allowlist = set(getattr(settings, 'EBAY_STORE_CATEGORY_IDS', []) or [])
-        unsellable_skus: set[str] = set()
-        seen_skus: set[str] = set()
+        # The next page downloads while this one's offers and images are fetched.
+        items = self._iter_feed(offset=checkpoint.offset)
 
-        for item in self.client.iter_inventory_items():
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='ebay-offers') as pool:
+                while batch := list(islice(items, OFFER_PREFETCH_BATCH)):
+                    self._sync_batch(pool, batch, checkpoint, mapping_lookup, allowlist)
+                    checkpoint.offset += len(batch)
+                    checkpoint.pages += 1
+                    self._report_progress(checkpoint)
+            # Only a sweep that reached the end of the feed has seen every
+            # unsellable SKU; a partial one must not deactivate anything.
+            if not self.dry_run:
+                self._deactivate_unsellable(checkpoint.unsellable_skus, report)
+        finally:
+            # Stops the prefetch thread if the sweep ended early.
+            getattr(items, 'close', lambda: None)()
+            self._finish_sweep(report)
+        return report
+
+    def sync_skus(self, skus: list[str]) -> SyncReport:
+        """Re-sync just these SKUs, e.g. listings picked in the admin.
+
+        SKUs eBay no longer has are counted as skipped and left alone; SKUs
+        seen with no published offer are deactivated as in a full sweep.
+        """
+        checkpoint = SyncCheckpoint()
+        report = checkpoint.report
+        self._start_timing(report)
+        mapping_lookup = self._load_category_mappings()
+        allowlist = set(getattr(settings, 'EBAY_STORE_CATEGORY_IDS', []) or [])
+        skus = list(dict.fromkeys(sku for sku in skus if sku))
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='ebay-offers') as pool:
+                for start in range(0, len(skus), OFFER_PREFETCH_BATCH):
+                    chunk = skus[start:start + OFFER_PREFETCH_BATCH]
+                    batch = self._read_items(pool, chunk, report)
+                    self._sync_batch(pool, batch, checkpoint, mapping_lookup, allowlist)
+                    checkpoint.offset += len(chunk)
+                    checkpoint.pages += 1
+                    self._report_progress(checkpoint)
+            if not self.dry_run:
+                self._deactivate_unsellable(checkpoint.unsellable_skus, report)
+        finally:
+            self._finish_sweep(report)
+        return report
+
+    def plan(self) -> SyncPlan:
+        """Phase one: read the whole feed and decide every change; writes nothing.
+
+        Decisions are made against one snapshot of the eBay-linked products
+        and listings instead of a query per page. New products' images are
+        not fetched until `apply`.
+        """
+        plan = SyncPlan()
+        checkpoint = SyncCheckpoint(report=plan.report)
+        self._start_timing(plan.report)
+        mapping_lookup = self._load_category_mappings()
+        allowlist = set(getattr(settings, 'EBAY_STORE_CATEGORY_IDS', []) or [])
+        with self.timings.phase('db.read'):
+            products = {p.ebay_listing_id: p for p in Product.objects.filter(ebay_listing_id__isnull=False)}
+            listings = {l.ebay_item_id: l for l in EbayListing.objects.all()}
+
+        def snapshot_page(skus: list[str]) -> _SyncPage:
+            return _SyncPage(
+                products={sku: products[sku] for sku in skus if sku in products},
+                listings={sku: listings[sku] for sku in skus if sku in listings},
+            )
+
+        items = self._iter_feed()
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='ebay-offers') as pool:
+                while batch := list(islice(items, OFFER_PREFETCH_BATCH)):
+                    page = self._stage_batch(pool, batch, checkpoint, mapping_lookup, allowlist, snapshot_page)
+                    plan.pages.append(page)
+                    for upsert in page.upserts:
+                        self._plan_upsert(plan, upsert)
+                    checkpoint.pages += 1
+                    # A heartbeat: at offset 0 there is nothing to resume from.
+                    self._report_progress(SyncCheckpoint(pages=checkpoint.pages, report=plan.report))
+        finally:
+            getattr(items, 'close', lambda: None)()
+        plan.deactivations = sorted(
+            sku for sku in checkpoint.unsellable_skus if sku in products and products[sku].stock > 0
+        )
+        plan.report.deactivated = len(plan.deactivations)
+        self.timings.record('plan', self.timings.clock() - self._started)
+        plan.report.phases = self._collect_timings()
+        return plan
+
+    def apply(self, plan: SyncPlan) -> SyncReport:
+        """Phase two: write `plan`, one transaction per page, then deactivate.
+
+        A dry-run service writes nothing and returns the plan's report.
+        """
+        if self.dry_run:
+            return plan.report
+        # Creates and updates are counted as their pages land, as in `sync_all`.
+        report = SyncReport(
+            unchanged=plan.report.unchanged,
+            skipped=plan.report.skipped,
+            errors=plan.report.errors,
+            error_details=list(plan.report.error_details),
+        )
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='ebay-offers') as pool:
+                for page in plan.pages:
+                    self._attach_images(pool, page, report)
+                    self._flush_page(page, report)
+                    self._report_progress(SyncCheckpoint(pages=len(plan.pages), report=report))
+            self._deactivate_unsellable(set(plan.deactivations), report)
+        finally:
+            self._finish_sweep(report)
+        return report
+
+    def _plan_upsert(self, plan: SyncPlan, upsert: _StagedUpsert) -> None:
+        self._tally_upsert(plan.report, upsert.created)
+        if not upsert.created:
+            plan.updates[upsert.sku] = upsert.changes
+            return
+        product = upsert.product
+        plan.creates.append({
+            'sku': upsert.sku,
+            'title': product.title,
+            'price': product.price,
+            'stock': product.stock,
+            'category_id': product.category_id,
+        })
+
+    def sync_stock(self, skus: Optional[list[str]] = None) -> SyncReport:
+        """Refresh only stock and price of the catalog's eBay products.
+
+        Walks the inventory feed (or reads just `skus`) for quantities and
+        looks up offers only for SKUs that already have a Product. A SKU with
+        no published offer has its stock zeroed straight away. Feed SKUs not
+        in the catalog are ignored and not counted; a full sweep imports them.
+        """
+        report = SyncReport()
+        self._start_timing(report)
+        seen: set[str] = set()
+        items = self._iter_feed() if skus is None else None
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='ebay-offers') as pool:
+                if items is not None:
+                    while batch := list(islice(items, OFFER_PREFETCH_BATCH)):
+                        self._sync_stock_batch(pool, batch, seen, report)
+                else:
+                    skus = list(dict.fromkeys(sku for sku in skus if sku))
+                    for start in range(0, len(skus), OFFER_PREFETCH_BATCH):
+                        batch = self._read_items(pool, skus[start:start + OFFER_PREFETCH_BATCH], report)
+                        self._sync_stock_batch(pool, batch, seen, report)
+        finally:
+            getattr(items, 'close', lambda: None)()
+            self._finish_sweep(report)
+        return report
+
+    def _iter_feed(self, offset: int = 0):
+        # The next page downloads while this one's offers and images are fetched.
+        return iter(self.client.iter_inventory_items(
+            offset=offset,
+            prefetch=getattr(settings, 'EBAY_INVENTORY_PREFETCH_PAGES', 2),
+        ))
+
+    def _read_items(self, pool: ThreadPoolExecutor, skus: list[str], report: SyncReport) -> list[dict]:
+        """Inventory items for `skus`, 25 per call on the pool; unknown SKUs are skipped."""
+        groups = [skus[n:n + BULK_GET_MAX] for n in range(0, len(skus), BULK_GET_MAX)]
+        batch = [item for items in pool.map(self._fetch_items, groups) for item in items]
+        for sku in sorted(set(skus) - {item.get('sku') for item in batch}):
+            logger.warning('sync_ebay: sku=%s is not in the eBay inventory; left alone', sku)
+            report.skipped += 1
+        return batch
+
+    def _finish_sweep(self, report: SyncReport) -> None:
+        # Deactivation is a bulk update that fires no signals; invalidate
+        # the catalog cache once for the whole sweep (a no-op sweep leaves
+        # it, and every cached page, alone). Pages already written by a
+        # sweep that then failed count too.
+        if not self.dry_run and (report.created or report.updated or report.deactivated):
+            CatalogVersion.bump()
+        stats = getattr(self.client, 'stats', None)
+        if stats is not None:
+            logger.info('sync_ebay %s', stats.as_text())
+        self.timings.record('sweep', self.timings.clock() - self._started)
+        report.phases = self._collect_timings()
+        log_phases(logger, report.phases)
+
+    # -- Timing -----------------------------------------------------------
+
+    def _start_timing(self, report: SyncReport) -> None:
+        """Fresh timers for a sweep, added to what a resumed `report` already has."""
+        self.timings = PhaseTimer()
+        self.images.timings = PhaseTimer()
+        if hasattr(self.client, 'timings'):
+            self.client.timings = PhaseTimer()
+        self._base_phases = report.phases
+        self._started = self.timings.clock()
+
+    def _collect_timings(self) -> dict[str, dict]:
+        client_timings = getattr(self.client, 'timings', None)
+        return merge_phases(
+            self._base_phases,
+            self.timings.as_dict(),
+            self.images.timings.as_dict(),
+            client_timings.as_dict() if client_timings is not None else {},
+        )
+
+    def _report_progress(self, checkpoint: SyncCheckpoint) -> None:
+        if self.progress is not None:
+            checkpoint.report.phases = self._collect_timings()
+            self.progress(checkpoint)
+
+    def _sync_batch(
+        self,
+        pool: ThreadPoolExecutor,
+        batch: list[dict],
+        checkpoint: SyncCheckpoint,
+        mapping_lookup: dict[str, EbayCategoryMapping],
+        allowlist: set[str],
+    ) -> None:
+        with self.timings.phase('page'):
+            page = self._stage_batch(pool, batch, checkpoint, mapping_lookup, allowlist, self._load_page)
+            self._attach_images(pool, page, checkpoint.report)
+            self._flush_page(page, checkpoint.report)
+
+    def _stage_batch(
+        self,
+        pool: ThreadPoolExecutor,
+        batch: list[dict],
+        checkpoint: SyncCheckpoint,
+        mapping_lookup: dict[str, EbayCategoryMapping],
+        allowlist: set[str],
+        load_page: Callable[[list[str]], _SyncPage],
+    ) -> _SyncPage:
+        """Decide every SKU in `batch` against the page `load_page` returns."""
+        report = checkpoint.report
+        fresh = []
+        for item in batch:
             sku = item.get('sku')
             if not sku:
                 report.skipped += 1
                 continue
             # eBay can re-yield a SKU across overlapping pages; process it once
             # so counts don't double and a sku can't be both synced and stale.
-            if sku in seen_skus:
+            if sku in checkpoint.seen_skus:
                 continue
-            seen_skus.add(sku)
+            checkpoint.seen_skus.add(sku)
+            fresh.append(item)
 
+        skus = [item['sku'] for item in fresh]
+        offers = self._prefetch_offers(pool, skus)
+        page = load_page(skus)
+        for item in fresh:
+            sku = item['sku']
             try:
-                self._sync_one(item, mapping_lookup, allowlist, report, unsellable_skus)
+                # A failed fetch re-raises here, inside the per-item guard.
+                self._sync_one(
+                    item, offers[sku].result(), page, mapping_lookup, allowlist, report,
+                    checkpoint.unsellable_skus,
+                )
             except Exception as exc:  # noqa: BLE001 — per-item isolation
-                logger.exception('sync_ebay failed for sku=%s', sku)
-                report.errors += 1
-                report.error_details.append(f'{sku}: {exc}')
-                self._record_error(sku, exc)
-
-        if not self.dry_run:
-            self._deactivate_unsellable(unsellable_skus, report)
-        return report
+                self._fail(page, report, sku, exc)
+        return page
 
     def _deactivate_unsellable(self, unsellable_skus: set[str], report: SyncReport) -> None:
         """Zero stock on products positively seen this sweep with no published
@@ -117,43 +553,286 @@ class SyncService:
         stale = Product.objects.filter(
             ebay_listing_id__in=list(unsellable_skus), stock__gt=0,
         )
-        report.deactivated = stale.update(stock=0)
+        with self.timings.phase('db.write'):
+            report.deactivated = stale.update(stock=0, updated_at=timezone.now())
+
+    # -- Stock-only refresh -----------------------------------------------
+
+    def _sync_stock_batch(
+        self, pool: ThreadPoolExecutor, batch: list[dict], seen: set[str], report: SyncReport,
+    ) -> None:
+        with self.timings.phase('db.read'):
+            current = {
+                sku: (stock, price)
+                for sku, stock, price in Product.objects.filter(
+                    ebay_listing_id__in=[item['sku'] for item in batch if item.get('sku')],
+                ).values_list('ebay_listing_id', 'stock', 'price')
+            }
+        fresh = []
+        for item in batch:
+            sku = item.get('sku')
+            if sku in current and sku not in seen:
+                seen.add(sku)
+                fresh.append(item)
+
+        offers = self._prefetch_offers(pool, [item['sku'] for item in fresh])
+        changes: dict[str, tuple[int, Decimal]] = {}
+        unsellable: list[str] = []
+        for item in fresh:
+            sku = item['sku']
+            stock, price = current[sku]
+            try:
+                offer = self._pick_published_offer(offers[sku].result())
+                if offer is None:
+                    # Ended or unpublished: off the storefront now, not at the next sweep.
+                    report.skipped += 1
+                    unsellable.append(sku)
+                    if stock:
+                        report.deactivated += 1
+                        changes[sku] = (0, price)
+                    continue
+                quantity = self._extract_quantity(item)
+                new = (stock if quantity is None else quantity, self._extract_price(offer))
+            except Exception as exc:  # noqa: BLE001 — per-item isolation
+                logger.error('sync_ebay stock refresh failed for sku=%s', sku, exc_info=exc)
+                report.errors += 1
+                report.error_details.append(f'{sku}: {exc}')
+                continue
+            if new == (stock, price):
+                report.unchanged += 1
+            else:
+                report.updated += 1
+                changes[sku] = new
+        self._apply_stock(changes, unsellable)
+
+    def _apply_stock(self, changes: dict[str, tuple[int, Decimal]], unsellable: list[str]) -> None:
+        """Write every change with one UPDATE keyed by `ebay_listing_id`.
+
+        Like `_deactivate_unsellable` this fires no signals; stock and price
+        aren't in the search index, and `_finish_sweep` bumps the catalog.
+        SKUs without a published offer are marked skipped, as a full sweep
+        would: a listing left `synced` with its old fingerprint would be
+        passed over as unchanged once republished, and stay at stock 0.
+        """
+        if self.dry_run:
+            return
+        if unsellable:
+            now = timezone.now()
+            with self.timings.phase('db.write'):
+                EbayListing.objects.filter(ebay_item_id__in=unsellable).update(
+                    sync_state='skipped', sync_error='no published offer', last_synced_at=now, updated_at=now,
+                )
+        if not changes:
+            return
+        price_field = Product._meta.get_field('price')
+        with self.timings.phase('db.write'):
+            Product.objects.filter(ebay_listing_id__in=list(changes)).update(
+                stock=Case(
+                    *(When(ebay_listing_id=sku, then=Value(stock)) for sku, (stock, _) in changes.items()),
+                    output_field=PositiveIntegerField(),
+                ),
+                price=Case(
+                    *(When(ebay_listing_id=sku, then=Value(price)) for sku, (_, price) in changes.items()),
+                    output_field=DecimalField(
+                        max_digits=price_field.max_digits, decimal_places=price_field.decimal_places,
+                    ),
+                ),
+                updated_at=timezone.now(),
+            )
+
+    # -- Offer prefetch ---------------------------------------------------
+
+    def _prefetch_offers(self, pool: ThreadPoolExecutor, skus: list[str]) -> dict[str, Future]:
+        """Start fetching offers for every SKU; at most `concurrency` run at once."""
+        return {sku: pool.submit(self._fetch_offers, sku) for sku in skus}
+
+    def _fetch_offers(self, sku: str) -> list[dict]:
+        try:
+            return self.client.get_offers_for_sku(sku)
+        finally:
+            # A token refresh reads the DB from this worker thread; don't leave
+            # its connection open when the pool thread exits.
+            connections.close_all()
+
+    def _fetch_items(self, skus: list[str]) -> list[dict]:
+        try:
+            return self.client.bulk_get_inventory_item(skus)
+        finally:
+            connections.close_all()
+
+    # -- Page load / flush ------------------------------------------------
+
+    def _load_page(self, skus: list[str]) -> _SyncPage:
+        with self.timings.phase('db.read'):
+            return _SyncPage(
+                products={p.ebay_listing_id: p for p in Product.objects.filter(ebay_listing_id__in=skus)},
+                listings={l.ebay_item_id: l for l in EbayListing.objects.filter(ebay_item_id__in=skus)},
+                stage=not self.dry_run,
+            )
+
+    def _attach_images(self, pool: ThreadPoolExecutor, page: _SyncPage, report: SyncReport) -> None:
+        """Download every new product's images at once and point the products at them."""
+        new = [upsert for upsert in page.upserts if upsert.created]
+        if not new:
+            return
+        with self.timings.phase('images'):
+            stored = self.images.fetch_all(pool, [url for upsert in new for url in upsert.image_urls])
+        for upsert in new:
+            names = [stored[url] for url in upsert.image_urls if stored.get(url)]
+            if not names:
+                page.upserts.remove(upsert)
+                self._fail(page, report, upsert.sku, EbayApiError(
+                    f'sku={upsert.sku} has no usable image URL; eBay returned {upsert.image_urls!r}.'
+                ))
+                continue
+            product = upsert.product
+            product.image, product.image2, product.image3, product.image4 = (names + [None] * 4)[:4]
+
+    def _flush_page(self, page: _SyncPage, report: SyncReport) -> None:
+        """Write the page's staged changes in one transaction.
+
+        If the bulk write fails, retry each SKU on its own so one bad row
+        costs that SKU (reported as an error), not the whole page.
+        """
+        if self.dry_run or not (page.upserts or page.outcomes):
+            return
+        with self.timings.phase('db.write'):
+            try:
+                with transaction.atomic():
+                    self._apply(page, page.upserts, page.outcomes)
+            except Exception:  # noqa: BLE001 — fall back to per-item isolation
+                logger.exception('sync_ebay bulk write failed; retrying %d SKUs one by one',
+                                 len(page.upserts) + len(page.outcomes))
+                self._apply_individually(page, report)
+                return
+        for upsert in page.upserts:
+            self._tally_upsert(report, upsert.created)
+
+    def _apply_individually(self, page: _SyncPage, report: SyncReport) -> None:
+        for upsert in page.upserts:
+            if upsert.created:
+                # The rolled-back bulk insert may have assigned a pk.
+                upsert.product.pk = None
+            try:
+                with transaction.atomic():
+                    self._apply(page, [upsert], {})
+            except Exception as exc:  # noqa: BLE001 — per-item isolation
+                logger.exception('sync_ebay failed for sku=%s', upsert.sku)
+                report.errors += 1
+                report.error_details.append(f'{upsert.sku}: {exc}')
+                page.outcomes[upsert.sku] = ('error', str(exc)[:1000])
+            else:
+                self._tally_upsert(report, upsert.created)
+        for sku, outcome in page.outcomes.items():
+            try:
+                with transaction.atomic():
+                    self._apply(page, [], {sku: outcome})
+            except Exception:  # noqa: BLE001 — audit row only; keep going
+                logger.exception('sync_ebay could not record outcome for sku=%s', sku)
+
+    def _apply(
+        self,
+        page: _SyncPage,
+        upserts: list[_StagedUpsert],
+        outcomes: dict[str, tuple[str, str]],
+    ) -> None:
+        now = timezone.now()
+        new_products = [u.product for u in upserts if u.created]
+        changed_products = [u.product for u in upserts if not u.created]
+        Product.objects.bulk_create(new_products)
+        self._ensure_pks(new_products)
+        for product in changed_products:
+            product.updated_at = now
+        Product.objects.bulk_update(changed_products, PRODUCT_SYNC_FIELDS)
+
+        new_listings, changed_listings = [], []
+
+        def stage(sku, **values):
+            listing = page.listings.get(sku)
+            if listing is None:
+                new_listings.append(EbayListing(ebay_item_id=sku, **values))
+                return
+            for name, value in values.items():
+                setattr(listing, name, value)
+            listing.updated_at = now
+            changed_listings.append(listing)
+
+        for upsert in upserts:
+            stage(
+                upsert.sku,
+                product=upsert.product,
+                ebay_store_category_id=upsert.store_category,
+                ebay_last_modified=now,
+                content_fingerprint=upsert.fingerprint,
+                last_synced_at=now,
+                sync_state='synced',
+                sync_error='',
+            )
+        for sku, (state, detail) in outcomes.items():
+            stage(sku, last_synced_at=now, sync_state=state, sync_error=detail)
+        EbayListing.objects.bulk_create(new_listings)
+        EbayListing.objects.bulk_update(changed_listings, LISTING_SYNC_FIELDS)
+
+        search.index_products([p.pk for p in new_products + changed_products])
+
+    @staticmethod
+    def _ensure_pks(products: list[Product]) -> None:
+        # Backends that can't return ids from a bulk insert leave pk unset.
+        missing = {p.ebay_listing_id: p for p in products if p.pk is None}
+        if not missing:
+            return
+        for sku, pk in Product.objects.filter(ebay_listing_id__in=list(missing)).values_list(
+            'ebay_listing_id', 'pk',
+        ):
+            missing[sku].pk = pk
 
     # -- Per-item ---------------------------------------------------------
 
     def _sync_one(
         self,
         item: dict,
+        offers: list[dict],
+        page: _SyncPage,
         mapping_lookup: dict[str, EbayCategoryMapping],
         allowlist: set[str],
         report: SyncReport,
         unsellable_skus: set[str],
     ) -> None:
         sku = item['sku']
-        offers = self.client.get_offers_for_sku(sku)
         offer = self._pick_published_offer(offers)
         if offer is None:
             # In inventory but no live offer → ended/unpublished. Record it so
             # any product we previously created for it gets deactivated.
             unsellable_skus.add(sku)
-            self._skip(report, sku, 'no published offer')
+            self._skip(page, report, sku, 'no published offer')
             return
 
         store_category_keys = offer.get('storeCategoryNames') or []
         mapping = self._match_mapping(store_category_keys, mapping_lookup)
         if mapping is None and not (allowlist and any(k in allowlist for k in store_category_keys)):
-            self._skip(report, sku, f'unmapped store category ({store_category_keys or "none"})')
+            self._skip(page, report, sku, f'unmapped store category ({store_category_keys or "none"})')
             return
 
-        if self.dry_run:
-            created = not Product.objects.filter(ebay_listing_id=sku).exists()
-            self._tally_upsert(report, created)
+        fingerprint = self._fingerprint(item, offer, mapping)
+        if self._is_unchanged(page.listings.get(sku), fingerprint):
+            report.unchanged += 1
             return
 
-        with transaction.atomic():
-            product, created = self._upsert_product(item, offer, mapping)
-            self._upsert_listing(sku, product, offer, store_category_keys)
-        self._tally_upsert(report, created)
+        if not page.stage:
+            self._tally_upsert(report, sku not in page.products)
+            return
+
+        # Counted once the page's writes land (see `_flush_page`).
+        product, created, changes = self._stage_product(item, offer, mapping, page.products.get(sku))
+        page.upserts.append(_StagedUpsert(
+            sku=sku,
+            product=product,
+            created=created,
+            store_category=store_category_keys[0] if store_category_keys else '',
+            fingerprint=fingerprint,
+            image_urls=((item.get('product') or {}).get('imageUrls') or [])[:4] if created else [],
+            changes=changes,
+        ))
 
     @staticmethod
     def _tally_upsert(report: SyncReport, created: bool) -> None:
@@ -162,18 +841,66 @@ class SyncService:
         else:
             report.updated += 1
 
-    def _skip(self, report: SyncReport, sku: str, reason: str) -> None:
+    # -- Change detection -------------------------------------------------
+
+    @staticmethod
+    def _fingerprint(item: dict, offer: dict, mapping: Optional[EbayCategoryMapping]) -> str:
+        """Hash of everything `_stage_product` reads for this SKU.
+
+        Includes the Pokebin category the SKU resolves to, so remapping a
+        store category re-syncs its products even if eBay didn't change.
+        """
+        product_payload = item.get('product') or {}
+        price = (offer.get('pricingSummary') or {}).get('price') or {}
+        content = {
+            'title': product_payload.get('title'),
+            'brand': product_payload.get('brand'),
+            'description': product_payload.get('description'),
+            'image_urls': (product_payload.get('imageUrls') or [])[:4],
+            'availability': item.get('availability'),
+            'listing_description': offer.get('listingDescription'),
+            'price': price.get('value'),
+            'store_categories': offer.get('storeCategoryNames') or [],
+            'category': (
+                mapping.pokebin_category_id if mapping is not None
+                else getattr(settings, 'EBAY_FALLBACK_CATEGORY_SLUG', '')
+            ),
+        }
+        encoded = json.dumps(content, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _is_unchanged(listing: Optional[EbayListing], fingerprint: str) -> bool:
+        return bool(
+            listing is not None
+            and listing.sync_state == 'synced'
+            and listing.content_fingerprint == fingerprint
+            and listing.product_id is not None
+        )
+
+    def _skip(self, page: _SyncPage, report: SyncReport, sku: str, reason: str) -> None:
         report.skipped += 1
-        self._record_skip(sku, reason)
+        self._record_outcome(page, sku, 'skipped', reason)
+
+    def _fail(self, page: _SyncPage, report: SyncReport, sku: str, exc: Exception) -> None:
+        logger.error('sync_ebay failed for sku=%s', sku, exc_info=exc)
+        report.errors += 1
+        report.error_details.append(f'{sku}: {exc}')
+        self._record_outcome(page, sku, 'error', str(exc))
 
     # -- Product upsert ---------------------------------------------------
 
-    def _upsert_product(
+    def _stage_product(
         self,
         item: dict,
         offer: dict,
         mapping: Optional[EbayCategoryMapping],
-    ) -> tuple[Product, bool]:
+        existing: Optional[Product],
+    ) -> tuple[Product, bool, dict[str, tuple]]:
+        """Apply the eBay data to `existing` (or a new Product) in memory.
+
+        Also returns `{field: (old, new)}` for the fields of `existing` it changed.
+        """
         sku = item['sku']
         product_payload = item.get('product') or {}
         title = product_payload.get('title') or f'eBay {sku}'
@@ -186,43 +913,41 @@ class SyncService:
         price = self._extract_price(offer)
         quantity = self._extract_quantity(item)
 
-        existing = Product.objects.filter(ebay_listing_id=sku).first()
         if existing:
-            existing.title = title
-            existing.brand = brand
-            existing.description = description
-            existing.price = price
+            values = {'title': title, 'brand': brand, 'description': description, 'price': price}
             # A missing quantity means "eBay didn't say", not "zero" — leave
             # the stored stock alone rather than hiding a live product.
             if quantity is not None:
-                existing.stock = quantity
+                values['stock'] = quantity
             if mapping is not None:
-                existing.category = mapping.pokebin_category
-            existing.save()
-            return existing, False
+                values['category_id'] = mapping.pokebin_category_id
+            changes = {}
+            for name, value in values.items():
+                old = getattr(existing, name)
+                if old != value:
+                    changes[name] = (old, value)
+                    setattr(existing, name, value)
+            return existing, False, changes
 
         category = self._resolve_category(mapping, sku)
-        images = self._collect_images(product_payload, sku)
-        product = Product.objects.create(
+        # Images are attached for the whole page at once (`_attach_images`).
+        product = Product(
             category=category,
             title=title,
             brand=brand,
             description=description,
             slug=self._make_slug(title, sku),
             price=price,
-            image=images[0],
-            image2=images[1],
-            image3=images[2],
-            image4=images[3],
             stock=quantity if quantity is not None else 0,
             ebay_listing_id=sku,
         )
-        return product, True
+        return product, True, {}
 
     def _resolve_category(self, mapping: Optional[EbayCategoryMapping], sku: str):
         if mapping is not None:
             return mapping.pokebin_category
-        from store.models import Category
+        if self._fallback_category is not None:
+            return self._fallback_category
         slug = getattr(settings, 'EBAY_FALLBACK_CATEGORY_SLUG', '') or ''
         if not slug:
             raise EbayApiError(
@@ -234,60 +959,20 @@ class SyncService:
             raise EbayApiError(
                 f'sku={sku}: EBAY_FALLBACK_CATEGORY_SLUG="{slug}" matches no Category.'
             )
+        self._fallback_category = fallback
         return fallback
 
-    def _collect_images(self, product_payload: dict, sku: str) -> list:
-        image_urls = product_payload.get('imageUrls') or []
-        downloaded = [
-            self._download_image(url, sku, idx)
-            for idx, url in enumerate(image_urls[:4])
-        ]
-        usable = [image for image in downloaded if image is not None]
-        if not usable:
-            raise EbayApiError(
-                f'sku={sku} has no usable image URL; eBay returned {image_urls!r}.'
-            )
-        return (usable + [None, None, None, None])[:4]
-
     # -- EbayListing audit -----------------------------------------------
 
-    def _upsert_listing(
-        self,
-        sku: str,
-        product: Product,
-        offer: dict,
-        store_category_keys: list[str],
-    ) -> EbayListing:
-        primary_category = store_category_keys[0] if store_category_keys else ''
-        listing, _ = EbayListing.objects.update_or_create(
-            ebay_item_id=sku,
-            defaults={
-                'product': product,
-                'ebay_store_category_id': primary_category,
-                'last_synced_at': timezone.now(),
-                'sync_state': 'synced',
-                'sync_error': '',
-            },
-        )
-        return listing
-
-    def _record_skip(self, sku: str, reason: str) -> None:
-        self._record_outcome(sku, 'skipped', reason)
-
-    def _record_error(self, sku: str, exc: Exception) -> None:
-        self._record_outcome(sku, 'error', str(exc))
-
-    def _record_outcome(self, sku: str, state: str, detail: str = '') -> None:
-        if self.dry_run:
+    def _record_outcome(self, page: _SyncPage, sku: str, state: str, detail: str = '') -> None:
+        if not page.stage:
             return
-        EbayListing.objects.update_or_create(
-            ebay_item_id=sku,
-            defaults={
-                'last_synced_at': timezone.now(),
-                'sync_state': state,
-                'sync_error': detail[:1000],
-            },
-        )
+        detail = detail[:1000]
+        listing = page.listings.get(sku)
+        # Same skip/error as last sweep: nothing new to record.
+        if listing is not None and (listing.sync_state, listing.sync_error) == (state, detail):
+            return
+        page.outcomes[sku] = (state, detail)
 
     # -- Helpers ----------------------------------------------------------
 
@@ -316,7 +1001,6 @@ class SyncService:
 
     @staticmethod
     def _extract_price(offer: dict):
-        from decimal import Decimal
         try:
             return Decimal(offer['pricingSummary']['price']['value'])
         except (KeyError, TypeError, ValueError) as exc:
@@ -336,30 +1020,13 @@ class SyncService:
         candidate = (f'{base}-{suffix}' if suffix else base)[:255]
         return self._unique_slug(candidate)
 
-    @staticmethod
-    def _unique_slug(candidate: str) -> str:
+    def _unique_slug(self, candidate: str) -> str:
+        if self._slugs is None:
+            self._slugs = set(Product.objects.values_list('slug', flat=True))
         slug = candidate
         n = 2
-        while Product.objects.filter(slug=slug).exists():
+        while slug in self._slugs:
             slug = f'{candidate[:248]}-{n}'[:255]
             n += 1
+        self._slugs.add(slug)
         return slug
-
-    @staticmethod
-    def _download_image(url: str, sku: str, index: int) -> Optional[ContentFile]:
-        if not url:
-            return None
-        try:
-            resp = requests.get(url, timeout=20)
-        except requests.RequestException as exc:
-            logger.warning('image download failed for %s: %s', url, exc)
-            return None
-        if resp.status_code != 200:
-            logger.warning('image %s returned %s', url, resp.status_code)
-            return None
-
-        # Pick a sensible filename: keep eBay's extension when possible.
-        path = urlparse(url).path
-        ext = os.path.splitext(path)[1] or '.jpg'
-        name = f'ebay-{slugify(sku)}-{index}{ext}'
-        return ContentFile(resp.content, name=name)
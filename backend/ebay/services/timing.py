@@ -0,0 +1,96 @@
+"""Per-phase timing for eBay sweeps.
+
+A sweep's time goes to a handful of phases: HTTP calls to eBay (token,
+inventory pages, bulk reads, offers), image downloads and storage uploads,
+and database reads and writes. `PhaseTimer` records, per phase, how many
+times it ran, the total seconds and a latency histogram. `EbayClient`,
+`ImageFetcher` and `SyncService` each keep one; the service merges them into
+`SyncReport.phases` (a plain dict, so it survives the job's JSON report and
+checkpoint) and logs one `key=value` line per phase when the sweep ends.
+
+Phases that run on the sync's thread pool overlap, so their seconds add up
+to more than the sweep's wall-clock time; `sweep` is the wall-clock total.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+# Upper bounds (ms) of the histogram buckets; one more bucket holds the rest.
+BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500, 5000)
+BUCKET_LABELS = tuple(f'≤{ms}ms' if ms < 1000 else f'≤{ms / 1000:g}s' for ms in BUCKETS_MS) + (
+    f'>{BUCKETS_MS[-1] / 1000:g}s',
+)
+
+
+def _empty() -> dict:
+    return {'calls': 0, 'seconds': 0.0, 'histogram': [0] * (len(BUCKETS_MS) + 1)}
+
+
+class PhaseTimer:
+    """Thread-safe call counts, total seconds and latency histograms by phase."""
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self.clock = clock
+        self._phases: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.record(name, self.clock() - start)
+
+    def record(self, name: str, seconds: float) -> None:
+        bucket = bisect.bisect_left(BUCKETS_MS, seconds * 1000)
+        with self._lock:
+            stats = self._phases.setdefault(name, _empty())
+            stats['calls'] += 1
+            stats['seconds'] += seconds
+            stats['histogram'][bucket] += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {name: {**stats, 'histogram': list(stats['histogram'])} for name, stats in self._phases.items()}
+
+
+def merge_phases(*phase_dicts: dict) -> dict:
+    """Sum several `as_dict()` results (e.g. a resumed sweep's and this run's)."""
+    merged: dict[str, dict] = {}
+    for phases in phase_dicts:
+        for name, stats in (phases or {}).items():
+            total = merged.setdefault(name, _empty())
+            total['calls'] += stats['calls']
+            total['seconds'] += stats['seconds']
+            total['histogram'] = [a + b for a, b in zip(total['histogram'], stats['histogram'])]
+    return merged
+
+
+def phase_lines(phases: dict) -> list[str]:
+    """One line per phase, slowest first, with the non-empty histogram buckets."""
+    lines = []
+    for name, stats in sorted(phases.items(), key=lambda kv: -kv[1]['seconds']):
+        avg_ms = stats['seconds'] * 1000 / stats['calls'] if stats['calls'] else 0.0
+        buckets = ' '.join(
+            f'{label}:{count}' for label, count in zip(BUCKET_LABELS, stats['histogram']) if count
+        )
+        lines.append(
+            f'{name}: {stats["calls"]} × avg {avg_ms:.0f}ms = {stats["seconds"]:.1f}s  [{buckets}]'
+        )
+    return lines
+
+
+def log_phases(logger, phases: dict) -> None:
+    """Emit each phase as a `key=value` line for log-based dashboards."""
+    for name, stats in sorted(phases.items()):
+        logger.info(
+            'sync_ebay phase=%s calls=%d seconds=%.3f histogram_ms=%s',
+            name, stats['calls'], stats['seconds'],
+            ','.join(f'{bound}:{count}' for bound, count in zip(BUCKETS_MS + ('inf',), stats['histogram'])),
+        )
@@ -1,77 +1,103 @@
 """Tests for the EbayListing admin "Sync now" action.
 
-This is the primary way the seller triggers a sync (no cron worker), so the
-view must degrade gracefully: a failing sync should surface as an admin
-message and a redirect, never a 500.
+The button only queues an `EbaySyncJob` for the `run_sync_jobs` worker, so the
+request never runs the sweep itself and a second click while one is queued or
+running doesn't start another.
 """
 
 from unittest import mock
 
 from django.contrib.auth import get_user_model
 from django.contrib.messages import get_messages
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
-from ebay.services import EbayApiError, EbayAuthError, SyncReport
+from ebay.models import EbayListing, EbaySyncJob
+
+# Admin pages pull in static assets; skip the (uncollected) manifest.
+PLAIN_STATICFILES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
 
 
 class SyncNowAdminViewTests(TestCase):
     def setUp(self):
         self.url = reverse('admin:ebay_ebaylisting_sync_now')
         self.changelist_url = reverse('admin:ebay_ebaylisting_changelist')
-        admin = get_user_model().objects.create_superuser(
+        self.admin = get_user_model().objects.create_superuser(
             username='boss', email='boss@pokebin.app', password='secret-pw',
         )
-        self.client.force_login(admin)
+        self.client.force_login(self.admin)
 
     def _messages(self, response):
         return [m.message for m in get_messages(response.wsgi_request)]
 
-    def test_api_error_shows_message_instead_of_500(self):
-        with mock.patch('ebay.admin.SyncService') as service_cls:
-            service_cls.return_value.sync_all.side_effect = EbayApiError(
-                'eBay /sell/inventory returned 500: upstream boom'
-            )
+    def test_post_queues_a_job_without_running_the_sync(self):
+        with mock.patch('ebay.services.jobs.SyncService') as service_cls:
             response = self.client.post(self.url)
 
+        service_cls.assert_not_called()
         self.assertRedirects(response, self.changelist_url, fetch_redirect_response=False)
+        job = EbaySyncJob.objects.get()
+        self.assertEqual(job.status, EbaySyncJob.QUEUED)
+        self.assertEqual(job.requested_by, self.admin)
         self.assertTrue(
-            any('upstream boom' in m for m in self._messages(response)),
+            any(f'#{job.pk} queued' in m for m in self._messages(response)),
             self._messages(response),
         )
 
-    def test_auth_error_shows_message_instead_of_500(self):
-        with mock.patch('ebay.admin.SyncService') as service_cls:
-            service_cls.return_value.sync_all.side_effect = EbayAuthError(
-                'No eBay refresh token on file.'
-            )
-            response = self.client.post(self.url)
+    def test_second_click_while_a_sweep_is_active_queues_nothing(self):
+        running = EbaySyncJob.objects.create(status=EbaySyncJob.RUNNING)
 
-        self.assertRedirects(response, self.changelist_url, fetch_redirect_response=False)
+        response = self.client.post(self.url)
+
+        self.assertEqual(EbaySyncJob.objects.count(), 1)
         self.assertTrue(
-            any('refresh token' in m for m in self._messages(response)),
+            any(f'#{running.pk} is already running' in m for m in self._messages(response)),
             self._messages(response),
         )
 
-    def test_post_runs_sync_and_reports_counts(self):
-        report = SyncReport(created=2, updated=1, skipped=3, errors=0)
-        with mock.patch('ebay.admin.SyncService') as service_cls:
-            service_cls.return_value.sync_all.return_value = report
-            response = self.client.post(self.url)
+    def test_get_does_not_queue_a_job(self):
+        response = self.client.get(self.url)
 
-        service_cls.return_value.sync_all.assert_called_once_with()
+        self.assertFalse(EbaySyncJob.objects.exists())
         self.assertRedirects(response, self.changelist_url, fetch_redirect_response=False)
-        self.assertTrue(
-            any('created=2' in m and 'updated=1' in m for m in self._messages(response)),
-            self._messages(response),
+
+    def test_resync_action_queues_a_targeted_job(self):
+        listings = [EbayListing.objects.create(ebay_item_id=sku) for sku in ('PSA-2', 'PSA-1')]
+
+        self.client.post(self.changelist_url, {
+            'action': 'resync_selected',
+            '_selected_action': [listing.pk for listing in listings],
+        })
+
+        job = EbaySyncJob.objects.get()
+        self.assertEqual(job.skus, ['PSA-1', 'PSA-2'])
+        self.assertEqual(job.status, EbaySyncJob.QUEUED)
+
+    @override_settings(STORAGES=PLAIN_STATICFILES)
+    def test_changelist_shows_the_latest_job_progress(self):
+        EbaySyncJob.objects.create(
+            status=EbaySyncJob.RUNNING, pages_fetched=3, skus_processed=250,
+            report={'phases': {'http.offers': {'calls': 250, 'seconds': 41.2, 'histogram': [0] * 9}}},
         )
 
-    def test_get_does_not_run_sync(self):
-        with mock.patch('ebay.admin.SyncService') as service_cls:
-            response = self.client.get(self.url)
+        response = self.client.get(self.changelist_url)
 
-        service_cls.return_value.sync_all.assert_not_called()
-        self.assertRedirects(response, self.changelist_url, fetch_redirect_response=False)
+        self.assertContains(response, '250 SKUs over 3 pages')
+        self.assertContains(response, 'Slowest phases: http.offers 41.2s.')
+
+    @override_settings(STORAGES=PLAIN_STATICFILES)
+    def test_job_history_renders_the_report(self):
+        job = EbaySyncJob.objects.create(
+            status=EbaySyncJob.SUCCEEDED,
+            report={'created': 2, 'updated': 1, 'error_details': []},
+        )
+
+        response = self.client.get(reverse('admin:ebay_ebaysyncjob_change', args=[job.pk]))
+
+        self.assertContains(response, 'created: 2')
 
 
 class SyncNowPermissionTests(TestCase):
@@ -86,8 +112,7 @@ class SyncNowPermissionTests(TestCase):
         self.client.force_login(staff_without_perm)
 
     def test_staff_without_change_permission_cannot_run_sync(self):
-        with mock.patch('ebay.admin.SyncService') as service_cls:
-            response = self.client.post(self.url)
+        response = self.client.post(self.url)
 
         self.assertEqual(response.status_code, 403)
-        service_cls.return_value.sync_all.assert_not_called()
+        self.assertFalse(EbaySyncJob.objects.exists())
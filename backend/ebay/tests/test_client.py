@@ -1,18 +1,25 @@
-"""Tests for EbayClient.ensure_access_token caching.
+"""Tests for EbayClient: token caching, rate limiting and retries.
 
 The sync makes one authenticated GET per inventory page and per SKU, all
 through `ensure_access_token`. It must not re-read the token row from the DB
-(or refresh) on every call when the in-memory token is still valid.
+(or refresh) on every call when the in-memory token is still valid. Every
+call also passes the shared rate limiter, and throttled or transiently failed
+calls are retried rather than failing their SKU. Inventory pages can be
+fetched ahead on a background thread.
 """
 
 import datetime as dt
+import threading
+import time
 from unittest import mock
 
+import requests
 from django.test import TestCase
 from django.utils import timezone
 
 from ebay.models import EbayAuthToken
-from ebay.services.client import EbayApiError, EbayAuthError, EbayClient
+from ebay.services.client import EbayApiError, EbayAuthError, EbayClient, prefetched
+from ebay.services.ratelimit import RateLimiter
 
 
 class EnsureAccessTokenTests(TestCase):
@@ -89,6 +96,16 @@ class EnsureAccessTokenTests(TestCase):
             client.ensure_access_token()
 
 
+class ConnectionPoolTests(TestCase):
+    def test_pool_is_sized_for_the_sync_concurrency(self):
+        with self.settings(EBAY_SYNC_CONCURRENCY=12):
+            client = EbayClient(env='sandbox')
+        self.assertEqual(client._session.get_adapter('https://api.ebay.com')._pool_maxsize, 12)
+
+        client = EbayClient(env='sandbox', pool_size=3)
+        self.assertEqual(client._session.get_adapter('https://api.ebay.com')._pool_maxsize, 3)
+
+
 class RefreshAccessTokenScopeTests(TestCase):
     def test_includes_scope_when_given(self):
         client = EbayClient(env='sandbox')
@@ -212,3 +229,271 @@ class BulkMigrateListingTests(TestCase):
         client = self._client()
         with self.assertRaises(ValueError):
             client.bulk_migrate_listing([str(n) for n in range(6)])
+
+
+class _FakeClock:
+    """Monotonic clock whose sleep() just advances time."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class RateLimiterTests(TestCase):
+    def test_bucket_allows_a_burst_then_paces_calls(self):
+        clock = _FakeClock()
+        limiter = RateLimiter(rate=10, burst=2, clock=clock, sleep=clock.sleep)
+
+        waits = [limiter.acquire() for _ in range(4)]
+
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertAlmostEqual(waits[2], 0.1)
+        self.assertAlmostEqual(waits[3], 0.1)
+
+    def test_throttle_halves_the_rate_and_pauses_every_caller(self):
+        clock = _FakeClock()
+        limiter = RateLimiter(rate=10, burst=5, clock=clock, sleep=clock.sleep)
+
+        limiter.throttled(retry_after=3)
+
+        self.assertEqual(limiter.rate, 5)
+        self.assertGreaterEqual(limiter.acquire(), 3)
+
+    def test_rate_recovers_as_calls_succeed(self):
+        limiter = RateLimiter(rate=10, burst=1)
+        limiter.throttled()
+        limiter.throttled()
+
+        for _ in range(100):
+            limiter.succeeded()
+
+        self.assertEqual(limiter.rate, 10)
+
+    def test_rate_never_drops_below_the_floor(self):
+        limiter = RateLimiter(rate=10, burst=1, min_rate=1)
+        for _ in range(10):
+            limiter.throttled()
+
+        self.assertEqual(limiter.rate, 1)
+
+    def test_a_refill_a_rounding_error_short_of_a_token_still_acquires(self):
+        clock = _FakeClock()
+        limiter = RateLimiter(rate=50, burst=10, clock=clock, sleep=clock.sleep)
+        limiter._tokens = 1 - 1e-12
+
+        self.assertEqual(limiter.acquire(), 0.0)
+
+    def test_waits_are_never_too_short_to_move_the_clock(self):
+        clock = _FakeClock()
+        limiter = RateLimiter(rate=50, burst=10, clock=clock, sleep=clock.sleep)
+        limiter._tokens = 1 - 1e-8
+
+        limiter.acquire()
+
+        self.assertEqual(clock.slept, [RateLimiter.MIN_WAIT])
+
+
+class RetryTests(TestCase):
+    """`_request` retries 429s (any method) and transient failures of
+    idempotent calls, sleeping through the limiter so tests never wait.
+    Backoff jitter is pinned to the top of its range so runs repeat exactly."""
+
+    def setUp(self):
+        self.clock = _FakeClock()
+        self.client = EbayClient(
+            env='production',
+            rate_limiter=RateLimiter(rate=100, burst=10, clock=self.clock, sleep=self.clock.sleep),
+        )
+        self.client.ensure_access_token = mock.Mock(return_value='tok')
+        jitter = mock.patch('ebay.services.client.random.uniform', side_effect=lambda low, high: high)
+        jitter.start()
+        self.addCleanup(jitter.stop)
+
+    @staticmethod
+    def _response(status_code, body=None, headers=None):
+        resp = mock.Mock(status_code=status_code, headers=headers or {})
+        resp.json.return_value = body if body is not None else {}
+        resp.text = str(body)
+        return resp
+
+    def _send(self, *responses):
+        return mock.patch.object(self.client._session, 'request', side_effect=list(responses))
+
+    def test_429_honours_retry_after_then_succeeds(self):
+        with self._send(
+            self._response(429, headers={'Retry-After': '2'}),
+            self._response(200, {'offers': [{'offerId': 'o1'}]}),
+        ) as request:
+            offers = self.client.get_offers_for_sku('SKU-1')
+
+        self.assertEqual(offers, [{'offerId': 'o1'}])
+        self.assertEqual(request.call_count, 2)
+        self.assertGreaterEqual(sum(self.clock.slept), 2)
+        stats = self.client.stats
+        self.assertEqual((stats.calls, stats.retries, stats.throttled), (2, 1, 1))
+        self.assertGreaterEqual(stats.wait_seconds, 2)
+
+    def test_transient_5xx_on_a_get_is_retried_with_backoff(self):
+        with self._send(self._response(503), self._response(502), self._response(200, {})):
+            self.client.get_offers_for_sku('SKU-1')
+
+        self.assertEqual(self.client.stats.retries, 2)
+        self.assertEqual(len(self.clock.slept), 2)
+
+    def test_connection_error_on_a_get_is_retried(self):
+        with self._send(requests.ConnectionError('reset'), self._response(200, {})) as request:
+            self.client.get_offers_for_sku('SKU-1')
+
+        self.assertEqual(request.call_count, 2)
+
+    def test_gives_up_after_max_retries(self):
+        self.client.max_retries = 2
+        with self._send(*[self._response(500, {'error': 'boom'})] * 3) as request:
+            with self.assertRaises(EbayApiError):
+                self.client.get_offers_for_sku('SKU-1')
+
+        self.assertEqual(request.call_count, 3)
+
+    def test_5xx_on_a_post_is_not_retried(self):
+        with self._send(self._response(500, {'error': 'boom'})) as request:
+            with self.assertRaises(EbayApiError):
+                self.client.bulk_migrate_listing(['111'])
+
+        self.assertEqual(request.call_count, 1)
+
+    def test_429_on_a_post_is_retried(self):
+        with self._send(self._response(429), self._response(200, {'responses': []})) as request:
+            self.client.bulk_migrate_listing(['111'])
+
+        self.assertEqual(request.call_count, 2)
+
+    def test_retry_after_beyond_the_cap_fails_fast(self):
+        with self._send(self._response(429, {'error': 'quota'}, headers={'Retry-After': '86400'})) as request:
+            with self.assertRaises(EbayApiError):
+                self.client.get_offers_for_sku('SKU-1')
+
+        self.assertEqual(request.call_count, 1)
+        self.assertEqual(self.clock.slept, [])
+
+
+class BulkReadTests(TestCase):
+    def setUp(self):
+        self.client = EbayClient(env='production')
+        self.client.ensure_access_token = mock.Mock(return_value='tok')
+
+    @staticmethod
+    def _response(status_code, body):
+        resp = mock.Mock(status_code=status_code, headers={})
+        resp.json.return_value = body
+        resp.text = str(body)
+        return resp
+
+    def test_bulk_get_returns_found_items_and_drops_unknown_skus(self):
+        body = {'responses': [
+            {'statusCode': 200, 'sku': 'A', 'inventoryItem': {'product': {'title': 'Pikachu'}}},
+            {'statusCode': 404, 'sku': 'B', 'errors': [{'errorId': 25702}]},
+        ]}
+        with mock.patch.object(
+            self.client._session, 'request', return_value=self._response(207, body),
+        ) as request:
+            items = self.client.bulk_get_inventory_item(['A', 'B'])
+
+        self.assertEqual(request.call_args.args[0], 'POST')
+        self.assertEqual(request.call_args.kwargs['json'], {'requests': [{'sku': 'A'}, {'sku': 'B'}]})
+        self.assertEqual(items, [{'product': {'title': 'Pikachu'}, 'sku': 'A'}])
+
+    def test_bulk_get_raises_on_other_per_sku_errors(self):
+        body = {'responses': [{'statusCode': 500, 'sku': 'A', 'errors': [{'errorId': 25001}]}]}
+        with mock.patch.object(self.client._session, 'request', return_value=self._response(207, body)):
+            with self.assertRaises(EbayApiError):
+                self.client.bulk_get_inventory_item(['A'])
+
+    def test_bulk_get_rejects_more_than_25(self):
+        with self.assertRaises(ValueError):
+            self.client.bulk_get_inventory_item([str(n) for n in range(26)])
+
+    def test_inventory_pages_are_eBays_maximum(self):
+        with mock.patch.object(
+            self.client._session, 'request', return_value=self._response(200, {'inventoryItems': []}),
+        ) as request:
+            list(self.client.iter_inventory_items())
+
+        self.assertEqual(request.call_args.kwargs['params']['limit'], 200)
+
+    def test_offers_follow_pagination(self):
+        pages = [
+            self._response(200, {'offers': [{'offerId': '1'}], 'next': 'more'}),
+            self._response(200, {'offers': [{'offerId': '2'}]}),
+        ]
+        with mock.patch.object(self.client._session, 'request', side_effect=pages) as request:
+            offers = self.client.get_offers_for_sku('SKU-1')
+
+        self.assertEqual([o['offerId'] for o in offers], ['1', '2'])
+        self.assertEqual(request.call_args.kwargs['params']['offset'], 1)
+
+
+class PrefetchTests(TestCase):
+    def test_values_arrive_in_order(self):
+        self.assertEqual(list(prefetched(iter(range(10)), 2)), list(range(10)))
+
+    def test_producer_stays_within_the_look_ahead(self):
+        produced = []
+
+        def pages():
+            for n in range(10):
+                produced.append(n)
+                yield n
+
+        values = prefetched(pages(), 2)
+        self.assertEqual(next(values), 0)
+        time.sleep(0.3)  # let the producer run as far as it can
+        # One handed over, two queued, one blocked waiting for room.
+        self.assertLessEqual(len(produced), 4)
+        self.assertEqual(list(values), list(range(1, 10)))
+
+    def test_producer_error_reaches_the_consumer_in_place(self):
+        def pages():
+            yield 1
+            raise EbayApiError('eBay /sell/inventory returned 503')
+
+        values = prefetched(pages(), 2)
+        self.assertEqual(next(values), 1)
+        with self.assertRaisesMessage(EbayApiError, '503'):
+            next(values)
+
+    def test_closing_early_stops_the_producer(self):
+        finished = threading.Event()
+
+        def pages():
+            try:
+                n = 0
+                while True:
+                    yield n
+                    n += 1
+            finally:
+                finished.set()
+
+        values = prefetched(pages(), 1)
+        next(values)
+        values.close()
+
+        self.assertTrue(finished.wait(2))
+
+    def test_inventory_pages_are_fetched_ahead(self):
+        client = EbayClient(env='sandbox')
+        pages = [
+            {'inventoryItems': [{'sku': 'A'}, {'sku': 'B'}], 'next': 'more', 'size': 2},
+            {'inventoryItems': [{'sku': 'C'}], 'size': 1},
+        ]
+        with mock.patch.object(client, 'list_inventory_items', side_effect=pages) as list_items:
+            items = list(client.iter_inventory_items(page_size=2, prefetch=2))
+
+        self.assertEqual([item['sku'] for item in items], ['A', 'B', 'C'])
+        self.assertEqual(list_items.call_args_list[1].kwargs, {'limit': 2, 'offset': 2})
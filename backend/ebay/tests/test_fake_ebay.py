@@ -0,0 +1,105 @@
+"""Tests for the fake eBay server (`ebay.services.fake_ebay`) and the
+`bench_ebay_sync` command built on it.
+
+The sweeps here go over real HTTP to a `FakeEbayServer` on localhost, through
+an unmodified `EbayClient` and `ImageFetcher`; only the token is primed.
+"""
+
+import datetime as dt
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ebay.models import EbayCategoryMapping
+from ebay.services import EbayClient, SyncService
+from ebay.services.fake_ebay import FakeEbayConfig, FakeEbayServer, sku_for
+from ebay.services.images import ImageFetcher
+from ebay.services.ratelimit import RateLimiter
+from store.models import Category, Product
+
+
+class FakeEbayServerTests(TestCase):
+    def setUp(self):
+        for n in range(FakeEbayConfig.categories):
+            EbayCategoryMapping.objects.create(
+                ebay_store_category_id=FakeEbayConfig.store_category(n),
+                pokebin_category=Category.objects.create(name=f'Bench {n}', slug=f'bench-{n}'),
+                active=True,
+            )
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.storage = FileSystemStorage(location=media)
+
+    def _serve(self, **config):
+        server = FakeEbayServer(FakeEbayConfig(**config)).start()
+        self.addCleanup(server.stop)
+        return server
+
+    def _service(self, server):
+        client = EbayClient(hosts=server.hosts, pool_size=4, rate_limiter=RateLimiter(rate=1000, burst=4))
+        client._cache_access_token('fake-ebay-token', timezone.now() + dt.timedelta(hours=1))
+        service = SyncService(client, concurrency=4)
+        service.images = ImageFetcher(pool_size=4, storage=self.storage)
+        return service
+
+    def test_sweep_imports_the_whole_synthetic_catalog(self):
+        server = self._serve(skus=30, images_per_sku=2, distinct_images=10)
+
+        report = self._service(server).sync_all()
+
+        self.assertEqual((report.created, report.errors), (30, 0))
+        product = Product.objects.get(ebay_listing_id=sku_for(7))
+        self.assertEqual(product.title, 'Bench Card 000007')
+        self.assertTrue(product.image2)
+        # Shared photos are downloaded once.
+        self.assertEqual(server.requests['image'], 10)
+
+    def test_pagination_quirks_and_unpublished_offers(self):
+        server = self._serve(
+            skus=45, page_cap=7, trailing_empty_page=True, offers_per_sku=3,
+            unpublished_rate=0.2, images_per_sku=1,
+        )
+
+        report = self._service(server).sync_all()
+
+        self.assertEqual(report.created + report.skipped, 45)
+        self.assertGreater(report.skipped, 0)
+        self.assertEqual(report.errors, 0)
+        # Seven pages of at most 7 items, then the empty one the last links to.
+        self.assertEqual(server.requests['inventory'], 8)
+
+    def test_throttled_calls_are_retried(self):
+        server = self._serve(skus=40, throttle_rate=0.1, retry_after=0.01, images_per_sku=1)
+
+        service = self._service(server)
+        report = service.sync_all()
+
+        self.assertEqual((report.created, report.errors), (40, 0))
+        self.assertGreater(server.requests['throttled'], 0)
+        self.assertEqual(service.client.stats.throttled, server.requests['throttled'])
+
+    def test_bulk_reads_leave_out_unknown_skus(self):
+        server = self._serve(skus=5)
+
+        items = self._service(server).client.bulk_get_inventory_item([sku_for(1), sku_for(9)])
+
+        self.assertEqual([item['sku'] for item in items], [sku_for(1)])
+
+
+class BenchCommandTests(TestCase):
+    def test_reports_throughput_and_rolls_back(self):
+        out = StringIO()
+
+        call_command('bench_ebay_sync', '--skus', '20', '--concurrency', '2', stdout=out)
+
+        self.assertIn('20 SKUs:', out.getvalue())
+        self.assertIn('SKUs/sec', out.getvalue())
+        self.assertIn('created=20', out.getvalue())
+        self.assertIn('API calls', out.getvalue())
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(EbayCategoryMapping.objects.exists())
@@ -0,0 +1,93 @@
+"""Tests for ImageFetcher: streamed, content-addressed, deduplicated storage.
+
+Downloads are mocked at `requests.Session.get`; files land in a temporary
+FileSystemStorage so each test starts from an empty bucket.
+"""
+
+import hashlib
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase
+
+from ebay.services import images
+from ebay.services.images import ImageFetcher
+
+
+def _response(body=b'front-photo', status_code=200):
+    response = mock.Mock(status_code=status_code)
+    # Two chunks, so the body really is assembled from the stream.
+    response.iter_content.return_value = [body[:4], body[4:]]
+    return response
+
+
+class ImageFetcherTests(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.storage = FileSystemStorage(location=self.location)
+        self.fetcher = ImageFetcher(pool_size=4, storage=self.storage)
+        self.pool = ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(self.pool.shutdown)
+
+    def _fetch(self, urls, bodies):
+        with mock.patch.object(self.fetcher.session, 'get', side_effect=lambda url, **kw: _response(bodies[url])) as get:
+            stored = self.fetcher.fetch_all(self.pool, urls)
+        return stored, get
+
+    def test_stores_streamed_body_under_its_content_hash(self):
+        stored, get = self._fetch(['https://i.ebayimg.com/a/0.JPG'], {'https://i.ebayimg.com/a/0.JPG': b'front-photo'})
+
+        digest = hashlib.sha256(b'front-photo').hexdigest()
+        self.assertEqual(stored, {'https://i.ebayimg.com/a/0.JPG': f'images/ebay/{digest}.jpg'})
+        self.assertTrue(get.call_args.kwargs['stream'])
+        with self.storage.open(f'images/ebay/{digest}.jpg') as stored_file:
+            self.assertEqual(stored_file.read(), b'front-photo')
+
+    def test_identical_bytes_from_different_listings_are_stored_once(self):
+        urls = ['https://i.ebayimg.com/a/0.jpg', 'https://i.ebayimg.com/b/0.jpg']
+        with mock.patch.object(self.storage, 'save', wraps=self.storage.save) as save:
+            stored, _ = self._fetch(urls, {url: b'stock-photo' for url in urls})
+
+        self.assertEqual(len(set(stored.values())), 1)
+        self.assertEqual(save.call_count, 1)
+
+    def test_image_stored_by_an_earlier_sweep_is_not_uploaded_again(self):
+        url = 'https://i.ebayimg.com/a/0.jpg'
+        first, _ = self._fetch([url], {url: b'stock-photo'})
+
+        later = ImageFetcher(storage=self.storage)
+        with mock.patch.object(later.session, 'get', return_value=_response(b'stock-photo')), \
+                mock.patch.object(self.storage, 'save') as save:
+            second = later.fetch_all(self.pool, ['https://i.ebayimg.com/c/0.jpg'])
+
+        save.assert_not_called()
+        self.assertEqual(list(second.values()), list(first.values()))
+
+    def test_each_url_is_downloaded_once_per_sweep(self):
+        url = 'https://i.ebayimg.com/a/0.jpg'
+        _, get = self._fetch([url, url], {url: b'front-photo'})
+        stored, again = self._fetch([url], {url: b'front-photo'})
+
+        self.assertEqual(get.call_count, 1)
+        again.assert_not_called()
+        self.assertTrue(stored[url])
+
+    def test_failed_and_oversized_downloads_map_to_none(self):
+        missing = 'https://i.ebayimg.com/missing.jpg'
+        huge = 'https://i.ebayimg.com/huge.jpg'
+
+        def get(url, **kwargs):
+            if url == missing:
+                return _response(b'', status_code=404)
+            return _response(b'x' * 64)
+
+        with mock.patch.object(images, 'MAX_IMAGE_BYTES', 32), \
+                mock.patch.object(self.fetcher.session, 'get', side_effect=get):
+            stored = self.fetcher.fetch_all(self.pool, [missing, huge])
+
+        self.assertEqual(stored, {missing: None, huge: None})
+        self.assertEqual(self.storage.listdir('')[1], [])
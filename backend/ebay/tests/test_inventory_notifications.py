@@ -0,0 +1,87 @@
+"""Tests for the eBay inventory notification endpoint.
+
+Item and offer change notifications are turned into targeted sync jobs for
+the SKUs they name; the signature is always enforced because each accepted
+POST queues work.
+"""
+
+import hashlib
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ebay.models import EbaySyncJob
+
+TOKEN = 'a' * 40
+ENDPOINT = 'https://pokebin-api.onrender.com/ebay/inventory-notifications/'
+
+
+def _notification(data, topic='ITEM_CHANGE'):
+    return json.dumps({
+        'metadata': {'topic': topic, 'schemaVersion': '1.0'},
+        'notification': {'notificationId': 'n-1', 'data': data},
+    })
+
+
+@override_settings(EBAY_VERIFICATION_TOKEN=TOKEN, EBAY_INVENTORY_NOTIFICATION_ENDPOINT=ENDPOINT)
+class InventoryNotificationTests(TestCase):
+    def setUp(self):
+        self.url = reverse('ebay-inventory-notification')
+        patcher = mock.patch('ebay.views.verify_ebay_signature', return_value=True)
+        self.verify = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _post(self, body):
+        return self.client.post(self.url, data=body, content_type='application/json')
+
+    def test_challenge_uses_this_endpoints_url(self):
+        response = self.client.get(self.url, {'challenge_code': 'c'})
+
+        expected = hashlib.sha256(('c' + TOKEN + ENDPOINT).encode('utf-8')).hexdigest()
+        self.assertEqual(response.json()['challengeResponse'], expected)
+
+    def test_notification_queues_a_targeted_sync(self):
+        response = self._post(_notification({'sku': 'PSA-1'}))
+
+        self.assertEqual(response.status_code, 200)
+        job = EbaySyncJob.objects.get()
+        self.assertEqual((job.status, job.skus), (EbaySyncJob.QUEUED, ['PSA-1']))
+
+    def test_skus_are_found_wherever_the_topic_nests_them(self):
+        self._post(_notification({'offer': {'sku': 'B'}, 'items': [{'sku': 'A'}, {'sku': 'B'}]}))
+
+        self.assertEqual(EbaySyncJob.objects.get().skus, ['A', 'B'])
+
+    def test_later_notifications_merge_into_the_waiting_job(self):
+        self._post(_notification({'sku': 'A'}))
+        self._post(_notification({'sku': 'C'}, topic='OFFER_CHANGE'))
+
+        self.assertEqual(EbaySyncJob.objects.get().skus, ['A', 'C'])
+
+    def test_notification_is_not_swallowed_by_a_queued_dry_run(self):
+        EbaySyncJob.objects.create(status=EbaySyncJob.QUEUED, dry_run=True)
+
+        self._post(_notification({'sku': 'A'}))
+
+        job = EbaySyncJob.objects.get(dry_run=False)
+        self.assertEqual((job.status, job.skus), (EbaySyncJob.QUEUED, ['A']))
+
+    def test_unverified_notification_is_rejected(self):
+        self.verify.return_value = False
+
+        response = self._post(_notification({'sku': 'A'}))
+
+        self.assertEqual(response.status_code, 412)
+        self.assertFalse(EbaySyncJob.objects.exists())
+
+    def test_notification_without_skus_is_acknowledged_and_ignored(self):
+        response = self._post(_notification({'listingId': '123'}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(EbaySyncJob.objects.exists())
+
+    def test_malformed_body_is_bad_request(self):
+        self.assertEqual(self._post('not json').status_code, 400)
+        self.assertEqual(self._post('[]').status_code, 400)
@@ -0,0 +1,361 @@
+"""Tests for the background sync jobs (`ebay.services.jobs`).
+
+`SyncService` is replaced by a fake that reports a couple of pages through
+the progress hook, so these cover the job lifecycle — queueing, claiming,
+progress, history, the one-sweep-at-a-time rule, stale-worker recovery and
+resuming from checkpoints — without touching eBay.
+"""
+
+import copy
+import datetime as dt
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ebay.models import EbaySyncJob
+from ebay.services import (
+    SyncCheckpoint, SyncJobBusy, SyncReport, enqueue_sync, run_next_job, start_sync,
+)
+from ebay.services.jobs import RESUME_WITHIN, STALE_AFTER, claim_next_job
+
+
+class _FakeService:
+    """Walks two pages of 100 SKUs, checkpointing after each like `sync_all` does."""
+
+    def __init__(self, *, dry_run=False, progress=None, error=None):
+        self.dry_run = dry_run
+        self.progress = progress
+        self.error = error
+        self.seen_during_run = []
+        self.resumed_from = None
+        self.client = None
+
+    def sync_skus(self, skus):
+        self.synced_skus = list(skus)
+        return SyncReport(updated=len(skus))
+
+    def sync_stock(self, skus=None):
+        self.stock_skus = skus
+        return SyncReport(updated=3)
+
+    def sync_all(self, checkpoint=None):
+        self.resumed_from = copy.deepcopy(checkpoint)
+        checkpoint = checkpoint or SyncCheckpoint()
+        while checkpoint.pages < 2:
+            checkpoint.report.updated += 100
+            checkpoint.offset += 100
+            checkpoint.pages += 1
+            checkpoint.seen_skus.add(f'SKU-{checkpoint.pages}')
+            self.progress(checkpoint)
+            self.seen_during_run.append(EbaySyncJob.objects.get(status=EbaySyncJob.RUNNING))
+            if self.error:
+                raise self.error
+        checkpoint.report.created = 5
+        return checkpoint.report
+
+
+def _patch_service(**kwargs):
+    services = []
+
+    def build(*, dry_run=False, progress=None):
+        services.append(_FakeService(dry_run=dry_run, progress=progress, **kwargs))
+        return services[-1]
+
+    return mock.patch('ebay.services.jobs.SyncService', side_effect=build), services
+
+
+class EnqueueTests(TestCase):
+    def test_enqueue_creates_a_queued_job(self):
+        job, created = enqueue_sync()
+
+        self.assertTrue(created)
+        self.assertEqual(job.status, EbaySyncJob.QUEUED)
+
+    def test_enqueue_returns_the_active_job_instead_of_a_second_one(self):
+        first, _ = enqueue_sync()
+
+        again, created = enqueue_sync()
+
+        self.assertFalse(created)
+        self.assertEqual(again, first)
+        self.assertEqual(EbaySyncJob.objects.count(), 1)
+
+    def test_finished_jobs_do_not_block_a_new_one(self):
+        EbaySyncJob.objects.create(status=EbaySyncJob.SUCCEEDED)
+        EbaySyncJob.objects.create(status=EbaySyncJob.FAILED)
+
+        _, created = enqueue_sync()
+
+        self.assertTrue(created)
+
+
+class TargetedEnqueueTests(TestCase):
+    def test_targeted_requests_merge_into_the_queued_job(self):
+        first, created = enqueue_sync(skus=['B', 'A'])
+        again, created_again = enqueue_sync(skus=['C', 'A'])
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(again, first)
+        again.refresh_from_db()
+        self.assertEqual(again.skus, ['A', 'B', 'C'])
+
+    def test_full_sweep_request_widens_a_queued_targeted_job(self):
+        job, _ = enqueue_sync(skus=['A'])
+
+        enqueue_sync()
+
+        job.refresh_from_db()
+        self.assertFalse(job.is_targeted)
+
+    def test_live_targeted_request_does_not_merge_into_a_queued_dry_run(self):
+        dry, _ = enqueue_sync(dry_run=True)
+
+        job, created = enqueue_sync(skus=['A'])
+
+        self.assertTrue(created)
+        self.assertNotEqual(job, dry)
+        self.assertEqual((job.dry_run, job.skus), (False, ['A']))
+        dry.refresh_from_db()
+        self.assertEqual(dry.skus, [])
+
+    def test_full_sweep_is_queued_while_a_dry_run_runs(self):
+        EbaySyncJob.objects.create(status=EbaySyncJob.RUNNING, dry_run=True, heartbeat_at=timezone.now())
+
+        job, created = enqueue_sync()
+
+        self.assertTrue(created)
+        self.assertEqual((job.status, job.dry_run), (EbaySyncJob.QUEUED, False))
+
+    def test_targeted_job_queues_behind_a_running_full_sweep(self):
+        EbaySyncJob.objects.create(status=EbaySyncJob.RUNNING, heartbeat_at=timezone.now())
+
+        job, created = enqueue_sync(skus=['A'])
+
+        self.assertTrue(created)
+        self.assertEqual(job.status, EbaySyncJob.QUEUED)
+
+    def test_worker_runs_a_targeted_job_through_sync_skus(self):
+        enqueue_sync(skus=['A', 'B'])
+        patcher, services = _patch_service()
+
+        with patcher:
+            finished = run_next_job()
+
+        self.assertEqual(services[0].synced_skus, ['A', 'B'])
+        self.assertEqual(finished.report['updated'], 2)
+
+
+class RunJobTests(TestCase):
+    def test_worker_runs_the_queued_job_and_records_the_report(self):
+        job, _ = enqueue_sync()
+        patcher, services = _patch_service()
+
+        with patcher:
+            finished = run_next_job()
+
+        self.assertEqual(finished.pk, job.pk)
+        self.assertEqual(finished.status, EbaySyncJob.SUCCEEDED)
+        self.assertEqual(finished.pages_fetched, 2)
+        self.assertEqual(finished.skus_processed, 205)
+        self.assertEqual(finished.report['created'], 5)
+        self.assertIsNotNone(finished.finished_at)
+        self.assertEqual(finished.checkpoint, {})
+        # Progress is visible on the row while the sweep is still running.
+        mid_run = services[0].seen_during_run[0]
+        self.assertEqual((mid_run.pages_fetched, mid_run.skus_processed), (1, 100))
+
+    def test_failed_sweep_is_recorded_and_the_worker_survives(self):
+        enqueue_sync()
+        patcher, _ = _patch_service(error=RuntimeError('eBay returned 500'))
+
+        with patcher:
+            finished = run_next_job()
+
+        self.assertEqual(finished.status, EbaySyncJob.FAILED)
+        self.assertIn('eBay returned 500', finished.error)
+        # Partial progress is kept for the history, and to resume from.
+        self.assertEqual(finished.pages_fetched, 1)
+        self.assertEqual(finished.checkpoint['offset'], 100)
+
+    def test_idle_worker_returns_none(self):
+        self.assertIsNone(run_next_job())
+
+    def test_dry_run_flag_reaches_the_service(self):
+        enqueue_sync(dry_run=True)
+        patcher, services = _patch_service()
+
+        with patcher:
+            run_next_job()
+
+        self.assertTrue(services[0].dry_run)
+
+
+class ConcurrencyTests(TestCase):
+    def test_queued_job_waits_while_another_sweep_runs(self):
+        EbaySyncJob.objects.create(status=EbaySyncJob.RUNNING, heartbeat_at=timezone.now())
+        EbaySyncJob.objects.create(status=EbaySyncJob.QUEUED)
+
+        self.assertIsNone(claim_next_job())
+
+    def test_cli_sweep_refuses_to_start_while_one_runs(self):
+        running = EbaySyncJob.objects.create(status=EbaySyncJob.RUNNING, heartbeat_at=timezone.now())
+
+        with self.assertRaises(SyncJobBusy) as ctx:
+            start_sync()
+
+        self.assertEqual(ctx.exception.job, running)
+
+    def test_stale_running_job_is_requeued(self):
+        stale = EbaySyncJob.objects.create(
+            status=EbaySyncJob.RUNNING,
+            heartbeat_at=timezone.now() - STALE_AFTER - dt.timedelta(minutes=1),
+        )
+
+        claimed = claim_next_job()
+
+        self.assertEqual(claimed, stale)
+        self.assertEqual(claimed.status, EbaySyncJob.RUNNING)
+
+    def test_stale_job_is_failed_when_another_is_already_queued(self):
+        stale = EbaySyncJob.objects.create(
+            status=EbaySyncJob.RUNNING,
+            heartbeat_at=timezone.now() - STALE_AFTER - dt.timedelta(minutes=1),
+        )
+        queued = EbaySyncJob.objects.create(status=EbaySyncJob.QUEUED)
+
+        claimed = claim_next_job()
+
+        self.assertEqual(claimed, queued)
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, EbaySyncJob.FAILED)
+        self.assertIn('Worker stopped', stale.error)
+
+
+def _checkpoint(offset=100, pages=1):
+    return SyncCheckpoint(
+        offset=offset, pages=pages, seen_skus={'SKU-1'}, unsellable_skus={'SKU-9'},
+        report=SyncReport(updated=100),
+    ).as_dict()
+
+
+class ResumeTests(TestCase):
+    def test_requeued_job_resumes_from_its_own_checkpoint(self):
+        EbaySyncJob.objects.create(
+            status=EbaySyncJob.RUNNING, checkpoint=_checkpoint(),
+            heartbeat_at=timezone.now() - STALE_AFTER - dt.timedelta(minutes=1),
+        )
+        patcher, services = _patch_service()
+
+        with patcher:
+            finished = run_next_job()
+
+        resumed = services[0].resumed_from
+        self.assertEqual(resumed.offset, 100)
+        self.assertEqual(resumed.unsellable_skus, {'SKU-9'})
+        # Only the remaining page was walked; counts carry over.
+        self.assertEqual(finished.pages_fetched, 2)
+        self.assertEqual(finished.report['updated'], 200)
+
+    def test_new_job_resumes_a_recently_failed_sweep(self):
+        failed = EbaySyncJob.objects.create(
+            status=EbaySyncJob.FAILED, checkpoint=_checkpoint(), finished_at=timezone.now(),
+        )
+        enqueue_sync()
+        patcher, services = _patch_service()
+
+        with patcher:
+            finished = run_next_job()
+
+        self.assertEqual(services[0].resumed_from.offset, 100)
+        self.assertEqual(finished.resumed_from, failed)
+
+    def test_old_or_successful_sweeps_are_not_resumed(self):
+        EbaySyncJob.objects.create(
+            status=EbaySyncJob.FAILED, checkpoint=_checkpoint(),
+            finished_at=timezone.now() - RESUME_WITHIN - dt.timedelta(minutes=1),
+        )
+        enqueue_sync()
+        patcher, services = _patch_service()
+
+        with patcher:
+            run_next_job()
+
+        self.assertIsNone(services[0].resumed_from)
+
+    def test_checkpoint_at_offset_zero_is_not_resumed(self):
+        # What a failed two-phase sweep leaves: progress, but nothing written.
+        EbaySyncJob.objects.create(
+            status=EbaySyncJob.FAILED, checkpoint=_checkpoint(offset=0), finished_at=timezone.now(),
+        )
+        enqueue_sync()
+        patcher, services = _patch_service()
+
+        with patcher:
+            run_next_job()
+
+        self.assertIsNone(services[0].resumed_from)
+
+    def test_sweep_started_without_resume_starts_at_the_top(self):
+        # What `sync_ebay --record` asks for: the recording covers the whole feed.
+        EbaySyncJob.objects.create(
+            status=EbaySyncJob.FAILED, checkpoint=_checkpoint(), finished_at=timezone.now(),
+        )
+
+        job = start_sync(resume=False)
+
+        self.assertEqual(job.checkpoint, {})
+        self.assertIsNone(job.resumed_from)
+
+    def test_cli_sweep_resumes_too(self):
+        EbaySyncJob.objects.create(
+            status=EbaySyncJob.FAILED, checkpoint=_checkpoint(), finished_at=timezone.now(),
+        )
+
+        job = start_sync()
+
+        self.assertEqual(job.checkpoint['offset'], 100)
+
+
+class CommandTests(TestCase):
+    def test_run_sync_jobs_once_drains_the_queue(self):
+        enqueue_sync()
+        out = StringIO()
+        patcher, _ = _patch_service()
+
+        with patcher:
+            call_command('run_sync_jobs', '--once', stdout=out)
+
+        self.assertEqual(EbaySyncJob.objects.get().status, EbaySyncJob.SUCCEEDED)
+        self.assertIn('succeeded', out.getvalue())
+
+    def test_sync_ebay_records_its_run_as_a_job(self):
+        service = _FakeService(progress=None)
+        with mock.patch('ebay.management.commands.sync_ebay.SyncService', return_value=service):
+            call_command('sync_ebay', stdout=StringIO())
+
+        job = EbaySyncJob.objects.get()
+        self.assertEqual(job.status, EbaySyncJob.SUCCEEDED)
+        self.assertEqual(job.pages_fetched, 2)
+
+    def test_sync_ebay_refuses_while_a_sweep_runs(self):
+        EbaySyncJob.objects.create(status=EbaySyncJob.RUNNING, heartbeat_at=timezone.now())
+
+        with mock.patch('ebay.management.commands.sync_ebay.SyncService'):
+            with self.assertRaisesMessage(CommandError, 'already running'):
+                call_command('sync_ebay', stdout=StringIO())
+
+    def test_sync_ebay_stock_only_runs_outside_the_job_queue(self):
+        # Even while a sweep runs: the stock refresh doesn't take its lock.
+        EbaySyncJob.objects.create(status=EbaySyncJob.RUNNING, heartbeat_at=timezone.now())
+        service = _FakeService(progress=None)
+        out = StringIO()
+        with mock.patch('ebay.management.commands.sync_ebay.SyncService', return_value=service):
+            call_command('sync_ebay', '--stock-only', stdout=out)
+
+        self.assertIsNone(service.stock_skus)
+        self.assertEqual(EbaySyncJob.objects.count(), 1)
+        self.assertIn('updated: 3', out.getvalue())
@@ -0,0 +1,173 @@
+"""Tests for recording a sweep's eBay responses and replaying them offline.
+
+A fake eBay answers the recording sweep through the client's HTTP session;
+the replayed sweep runs with that session (and image downloads) patched to
+fail, so any call that reaches the network shows up as an error.
+"""
+
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ebay.models import EbayCategoryMapping, EbayListing, EbaySyncJob
+from ebay.services import EbayApiError, RecordingClient, ReplayClient, SyncService
+from store.models import Category, Product
+
+ITEMS = [
+    {'sku': f'SKU-{n}', 'product': {'title': f'Card {n}', 'imageUrls': [f'https://i.ebayimg.com/{n}.jpg']},
+     'availability': {'shipToLocationAvailability': {'quantity': n}}}
+    for n in range(1, 6)
+]
+
+
+def _response(status_code, body):
+    resp = mock.Mock(status_code=status_code, headers={})
+    resp.json.return_value = body
+    resp.text = str(body)
+    return resp
+
+
+def _fake_ebay(method, url, params=None, json=None, **kwargs):
+    path = url.split('.com', 1)[1]
+    if path == '/sell/inventory/v1/inventory_item':
+        offset, limit = params['offset'], params['limit']
+        page = {'inventoryItems': ITEMS[offset:offset + limit], 'size': len(ITEMS[offset:offset + limit])}
+        if offset + limit < len(ITEMS):
+            page['next'] = 'more'
+        return _response(200, page)
+    if params['sku'] == 'SKU-3':
+        return _response(500, {'errors': [{'errorId': 25001}]})
+    return _response(200, {'offers': [{
+        'sku': params['sku'],
+        'status': 'PUBLISHED',
+        'pricingSummary': {'price': {'value': '5.00'}},
+        'storeCategoryNames': ['/Pokemon/Cards'],
+    }]})
+
+
+def _image(url, **kwargs):
+    resp = mock.Mock(status_code=200)
+    resp.iter_content.return_value = [f'bytes of {url}'.encode()]
+    return resp
+
+
+def _offline():
+    return mock.patch('requests.Session.request', side_effect=AssertionError('network call'))
+
+
+class RecordReplayTests(TestCase):
+    def setUp(self):
+        EbayCategoryMapping.objects.create(
+            ebay_store_category_id='/Pokemon/Cards',
+            pokebin_category=Category.objects.create(name='Cards', slug='cards'),
+            active=True,
+        )
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+
+    def _record(self, dry_run=True):
+        client = RecordingClient(self.directory, env='production', pool_size=2)
+        client.ensure_access_token = mock.Mock(return_value='tok')
+        client.max_retries = 0
+        with mock.patch.object(client._session, 'request', side_effect=_fake_ebay), \
+                mock.patch('ebay.services.images.requests.Session.get', side_effect=_image):
+            report = SyncService(client, dry_run=dry_run, concurrency=2).sync_all()
+        client.close()
+        return report
+
+    def _replay_client(self):
+        client = ReplayClient(self.directory, env='production')
+        patcher = mock.patch.object(client._session, 'request', side_effect=AssertionError('network call'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return client
+
+    def test_replayed_sweep_matches_the_recorded_one(self):
+        recorded = self._record()
+
+        replayed = SyncService(self._replay_client(), dry_run=True, concurrency=2).sync_all()
+
+        self.assertEqual((recorded.created, recorded.errors), (4, 1))
+        # Counts match exactly; only the timings differ.
+        self.assertEqual(
+            {**replayed.as_dict(), 'phases': None}, {**recorded.as_dict(), 'phases': None},
+        )
+
+    def test_inventory_replays_at_any_page_size_or_offset(self):
+        self._record()
+
+        client = self._replay_client()
+        items = list(client.iter_inventory_items(page_size=2, offset=1))
+
+        self.assertEqual([item['sku'] for item in items], ['SKU-2', 'SKU-3', 'SKU-4', 'SKU-5'])
+        self.assertEqual(client.stats.calls, 2)
+
+    def test_recorded_failure_replays_as_a_failure(self):
+        self._record()
+
+        with self.assertRaisesMessage(EbayApiError, 'returned 500'):
+            self._replay_client().get_offers_for_sku('SKU-3')
+
+    def test_call_missing_from_the_recording_raises(self):
+        self._record()
+
+        with self.assertRaisesMessage(EbayApiError, 'not in the recording'):
+            self._replay_client().get_offers_for_sku('SKU-99')
+
+    def test_sync_ebay_replays_a_recording(self):
+        self._record()
+        out = StringIO()
+
+        with mock.patch('requests.Session.request', side_effect=AssertionError('network call')):
+            call_command('sync_ebay', '--replay', self.directory, '--dry-run', stdout=out)
+
+        self.assertIn('created: 4', out.getvalue())
+
+    def test_sync_ebay_rejects_a_missing_recording(self):
+        with self.assertRaisesMessage(CommandError, 'Cannot read recording'):
+            call_command('sync_ebay', '--replay', f'{self.directory}/nope', stdout=StringIO())
+
+    def test_replay_stores_the_recorded_images_offline(self):
+        self._record(dry_run=False)
+        recorded = dict(Product.objects.values_list('ebay_listing_id', 'image'))
+        Product.objects.all().delete()
+        EbayListing.objects.all().delete()
+
+        with _offline():
+            report = SyncService(ReplayClient(self.directory, env='production'), concurrency=2).sync_all()
+
+        self.assertEqual((report.created, report.errors), (4, 1))
+        self.assertEqual(dict(Product.objects.values_list('ebay_listing_id', 'image')), recorded)
+
+    def test_images_missing_from_the_recording_get_stand_ins(self):
+        # A dry run downloads no images, so its recording has none.
+        self._record()
+        out = StringIO()
+
+        with _offline():
+            call_command('sync_ebay', '--replay', self.directory, stdout=out)
+
+        self.assertIn('created: 4', out.getvalue())
+        self.assertIn('4 images were not in the recording', out.getvalue())
+        self.assertTrue(all(Product.objects.values_list('image', flat=True)))
+
+    def test_replay_runs_outside_the_job_queue(self):
+        self._record()
+        # A failed live sweep's checkpoint is neither resumed nor blocking.
+        EbaySyncJob.objects.create(
+            status=EbaySyncJob.FAILED, finished_at=timezone.now(),
+            checkpoint={'offset': 3, 'pages': 1, 'seen_skus': [], 'unsellable_skus': [], 'report': {}},
+        )
+        EbaySyncJob.objects.create(status=EbaySyncJob.RUNNING, heartbeat_at=timezone.now())
+        out = StringIO()
+
+        with _offline():
+            call_command('sync_ebay', '--replay', self.directory, '--dry-run', stdout=out)
+
+        self.assertIn('created: 4', out.getvalue())
+        self.assertEqual(EbaySyncJob.objects.count(), 2)
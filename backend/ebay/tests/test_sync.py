@@ -1,21 +1,29 @@
 """Tests for SyncService.
 
 Mocks `EbayClient.iter_inventory_items` / `get_offers_for_sku` and the
-network call inside `_download_image` so the suite runs offline. Uses
+image downloads (`requests.Session.get` inside `ImageFetcher`) so the suite
+runs offline. Uses
 the default FileSystemStorage; we don't need to validate where the bytes
 land — only that the upsert logic is correct.
 """
 
+import copy
+import threading
+import time
 from decimal import Decimal
-from io import BytesIO
+from io import BytesIO, StringIO
 from unittest import mock
 
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from PIL import Image
 
-from ebay.models import EbayCategoryMapping, EbayListing
-from ebay.services import SyncService
-from store.models import Category, Product
+from ebay.models import EbayCategoryMapping, EbayListing, EbaySyncJob
+from ebay.services import EbayApiError, SyncService
+from store.models import Category, CatalogVersion, Product
+from store.search import search_products
 
 
 def _png_bytes() -> bytes:
@@ -60,18 +68,33 @@ class _FakeClient:
         self._items = list(items)
         self._offers = offers_by_sku or {}
 
-    def iter_inventory_items(self, page_size=100):
-        yield from self._items
+    def iter_inventory_items(self, page_size=100, offset=0, prefetch=0):
+        self.prefetch = prefetch
+        yield from self._items[offset:]
 
     def get_offers_for_sku(self, sku):
         return self._offers.get(sku, [])
 
+    def bulk_get_inventory_item(self, skus):
+        assert len(skus) <= 25
+        self.bulk_calls = getattr(self, 'bulk_calls', 0) + 1
+        return [item for item in self._items if item.get('sku') in skus]
 
-def _patch_image_download(target='ebay.services.sync.requests.get'):
-    response = mock.Mock()
-    response.status_code = 200
-    response.content = _png_bytes()
-    return mock.patch(target, return_value=response)
+
+def _image_response(status_code=200, body=None):
+    response = mock.Mock(status_code=status_code)
+    response.iter_content.return_value = [_png_bytes() if body is None else body]
+    return response
+
+
+def _patch_image_download(responses=None):
+    """Serve a PNG for every image URL, or `responses[url]` when given."""
+    responses = responses or {}
+
+    def get(url, **kwargs):
+        return responses.get(url) or _image_response()
+
+    return mock.patch('ebay.services.images.requests.Session.get', side_effect=get)
 
 
 class SyncServiceTests(TestCase):
@@ -125,6 +148,24 @@ class SyncServiceTests(TestCase):
         self.assertEqual(product.price, Decimal('159.99'))
         self.assertEqual(Product.objects.count(), 1)
 
+    def test_synced_products_are_full_text_searchable(self):
+        client = _FakeClient(items=[_inventory_item()], offers_by_sku={'SKU-1': [_offer()]})
+        with _patch_image_download():
+            SyncService(client=client).sync_all()
+
+        client2 = _FakeClient(
+            items=[_inventory_item(title='Blastoise EX')],
+            offers_by_sku={'SKU-1': [_offer()]},
+        )
+        with _patch_image_download():
+            SyncService(client=client2).sync_all()
+
+        self.assertFalse(search_products(Product.objects.all(), 'charizard').exists())
+        self.assertEqual(
+            list(search_products(Product.objects.all(), 'blastoise').values_list('ebay_listing_id', flat=True)),
+            ['SKU-1'],
+        )
+
     def test_skips_unmapped_store_category(self):
         client = _FakeClient(
             items=[_inventory_item(sku='SKU-Plush')],
@@ -193,8 +234,8 @@ class SyncServiceTests(TestCase):
             items=[_inventory_item()],
             offers_by_sku={'SKU-1': [_offer()]},
         )
-        bad_response = mock.Mock(status_code=404, content=b'')
-        with mock.patch('ebay.services.sync.requests.get', return_value=bad_response):
+        bad = _image_response(404, b'')
+        with _patch_image_download({'https://i.ebayimg.com/SKU-1/0.jpg': bad}):
             report = SyncService(client=client).sync_all()
 
         self.assertEqual(report.errors, 1)
@@ -212,18 +253,151 @@ class SyncServiceTests(TestCase):
         self.assertFalse(Product.objects.exists())
         self.assertFalse(EbayListing.objects.exists())
 
+    def test_sweep_invalidates_the_catalog_cache_only_when_it_changed_something(self):
+        client = _FakeClient(items=[_inventory_item()], offers_by_sku={'SKU-1': [_offer()]})
+        before = CatalogVersion.current()
+        with self.captureOnCommitCallbacks(execute=True):
+            SyncService(client=client, dry_run=True).sync_all()
+        self.assertEqual(CatalogVersion.current(), before)
+
+        with _patch_image_download(), self.captureOnCommitCallbacks(execute=True):
+            SyncService(client=client).sync_all()
+        self.assertGreater(CatalogVersion.current(), before)
+
+        before = CatalogVersion.current()
+        with self.captureOnCommitCallbacks(execute=True):
+            SyncService(client=client).sync_all()
+        self.assertEqual(CatalogVersion.current(), before)
+
+    def test_unchanged_sku_is_not_rewritten(self):
+        client = _FakeClient(items=[_inventory_item()], offers_by_sku={'SKU-1': [_offer()]})
+        with _patch_image_download():
+            SyncService(client=client).sync_all()
+        listing = EbayListing.objects.get(ebay_item_id='SKU-1')
+        self.assertEqual(len(listing.content_fingerprint), 64)
+        self.assertIsNotNone(listing.ebay_last_modified)
+
+        # Mappings, then the page's Products and EbayListings — no writes.
+        with self.assertNumQueries(3):
+            report = SyncService(client=client).sync_all()
+
+        self.assertEqual((report.created, report.updated, report.unchanged), (0, 0, 1))
+        self.assertEqual(report.processed, 1)
+        self.assertEqual(EbayListing.objects.get(ebay_item_id='SKU-1').updated_at, listing.updated_at)
+
+    def test_changed_content_or_mapping_is_resynced(self):
+        client = _FakeClient(items=[_inventory_item()], offers_by_sku={'SKU-1': [_offer()]})
+        with _patch_image_download():
+            SyncService(client=client).sync_all()
+        first = EbayListing.objects.get(ebay_item_id='SKU-1').content_fingerprint
+
+        client = _FakeClient(items=[_inventory_item()], offers_by_sku={'SKU-1': [_offer(price='99.00')]})
+        report = SyncService(client=client).sync_all()
+        self.assertEqual((report.updated, report.unchanged), (1, 0))
+        self.assertNotEqual(EbayListing.objects.get(ebay_item_id='SKU-1').content_fingerprint, first)
+
+        sealed = Category.objects.create(name='Sealed', slug='sealed')
+        self.mapping.pokebin_category = sealed
+        self.mapping.save()
+        report = SyncService(client=client).sync_all()
+        self.assertEqual(report.updated, 1)
+        self.assertEqual(Product.objects.get(ebay_listing_id='SKU-1').category, sealed)
+
+    def test_repeated_skip_is_not_rewritten(self):
+        client = _FakeClient(items=[_inventory_item()], offers_by_sku={})
+        SyncService(client=client).sync_all()
+
+        # Mappings, the page preload, and the (no-op) deactivation.
+        with self.assertNumQueries(4):
+            report = SyncService(client=client).sync_all()
+        self.assertEqual(report.skipped, 1)
+
+    def _sweep_queries(self, skus):
+        client = _FakeClient(
+            items=[_inventory_item(sku=sku) for sku in skus],
+            offers_by_sku={sku: [_offer(sku=sku)] for sku in skus},
+        )
+        with _patch_image_download(), CaptureQueriesContext(connection) as queries:
+            report = SyncService(client=client).sync_all()
+        return report, len(queries)
+
+    def test_writes_are_batched_per_page(self):
+        small, small_queries = self._sweep_queries([f'A-{n}' for n in range(3)])
+        large, large_queries = self._sweep_queries([f'B-{n}' for n in range(40)])
+
+        self.assertEqual((small.created, large.created), (3, 40))
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(EbayListing.objects.filter(sync_state='synced').count(), 43)
+
+        # Re-sync with new prices: one bulk update per table, same query count.
+        client = _FakeClient(
+            items=[_inventory_item(sku=f'B-{n}') for n in range(40)],
+            offers_by_sku={f'B-{n}': [_offer(sku=f'B-{n}', price='1.00')] for n in range(40)},
+        )
+        with CaptureQueriesContext(connection) as queries:
+            report = SyncService(client=client).sync_all()
+        self.assertEqual(report.updated, 40)
+        self.assertLessEqual(len(queries), large_queries)
+        self.assertEqual(set(Product.objects.filter(ebay_listing_id__startswith='B-').values_list('price', flat=True)),
+                         {Decimal('1.00')})
+
+    def test_failed_bulk_write_falls_back_to_per_sku_writes(self):
+        real_bulk_create = Product.objects.bulk_create
+
+        def reject_batches(objs, *args, **kwargs):
+            if len(objs) > 1:
+                raise RuntimeError('bulk insert failed')
+            if objs and objs[0].ebay_listing_id == 'SKU-2':
+                raise RuntimeError('bad row')
+            return real_bulk_create(objs, *args, **kwargs)
+
+        client = _FakeClient(
+            items=[_inventory_item(sku=f'SKU-{n}') for n in range(1, 4)],
+            offers_by_sku={f'SKU-{n}': [_offer(sku=f'SKU-{n}')] for n in range(1, 4)},
+        )
+        with _patch_image_download(), mock.patch.object(Product.objects, 'bulk_create', reject_batches):
+            report = SyncService(client=client).sync_all()
+
+        self.assertEqual((report.created, report.errors), (2, 1))
+        self.assertEqual(report.error_details, ['SKU-2: bad row'])
+        self.assertEqual(EbayListing.objects.get(ebay_item_id='SKU-2').sync_state, 'error')
+        self.assertEqual(
+            set(Product.objects.values_list('ebay_listing_id', flat=True)), {'SKU-1', 'SKU-3'},
+        )
+
+    def test_dry_run_counts_unchanged(self):
+        client = _FakeClient(items=[_inventory_item()], offers_by_sku={'SKU-1': [_offer()]})
+        with _patch_image_download():
+            SyncService(client=client).sync_all()
+
+        report = SyncService(client=client, dry_run=True).sync_all()
+        self.assertEqual((report.updated, report.unchanged), (0, 1))
+
     def test_uses_first_successful_image_when_an_earlier_one_fails(self):
         client = _FakeClient(
             items=[_inventory_item(image_count=2)],
             offers_by_sku={'SKU-1': [_offer()]},
         )
-        ok = mock.Mock(status_code=200, content=_png_bytes())
-        bad = mock.Mock(status_code=404, content=b'')
-        with mock.patch('ebay.services.sync.requests.get', side_effect=[bad, ok]):
+        bad = _image_response(404, b'')
+        with _patch_image_download({'https://i.ebayimg.com/SKU-1/0.jpg': bad}):
             report = SyncService(client=client).sync_all()
 
         self.assertEqual((report.created, report.errors), (1, 0))
-        self.assertTrue(Product.objects.get(ebay_listing_id='SKU-1').image)
+        product = Product.objects.get(ebay_listing_id='SKU-1')
+        self.assertTrue(product.image)
+        self.assertFalse(product.image2)
+
+    def test_shared_stock_photo_is_stored_once(self):
+        client = _FakeClient(
+            items=[_inventory_item(sku='SKU-1'), _inventory_item(sku='SKU-2', title='Blastoise EX')],
+            offers_by_sku={'SKU-1': [_offer(sku='SKU-1')], 'SKU-2': [_offer(sku='SKU-2')]},
+        )
+        with _patch_image_download():
+            SyncService(client=client).sync_all()
+
+        names = set(Product.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertRegex(names.pop(), r'^images/ebay/[0-9a-f]{64}\.jpg$')
 
     def test_missing_quantity_does_not_zero_existing_stock(self):
         client = _FakeClient(items=[_inventory_item(stock=4)], offers_by_sku={'SKU-1': [_offer()]})
@@ -316,6 +490,13 @@ class SyncServiceTests(TestCase):
         self.assertEqual(report.deactivated, 0)
         self.assertEqual(Product.objects.get(ebay_listing_id='SKU-1').stock, 4)
 
+    @override_settings(EBAY_INVENTORY_PREFETCH_PAGES=3)
+    def test_sweep_prefetches_inventory_pages(self):
+        client = _FakeClient(items=[], offers_by_sku={})
+        SyncService(client=client).sync_all()
+
+        self.assertEqual(client.prefetch, 3)
+
     def test_errored_item_is_not_deactivated(self):
         self._ebay_product('SKU-1', stock=3)
         bad_offer = _offer()
@@ -340,3 +521,364 @@ class SyncServiceTests(TestCase):
 
         self.assertEqual(report.deactivated, 0)
         self.assertEqual(Product.objects.get(ebay_listing_id='SKU-1').stock, 4)
+
+
+class _FlakyFeedClient(_FakeClient):
+    """Feed that raises once it reaches item `fail_at` (first sweep only)."""
+
+    def __init__(self, *args, fail_at=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail_at = fail_at
+        self.offer_calls = []
+
+    def iter_inventory_items(self, page_size=100, offset=0, prefetch=0):
+        for index, item in enumerate(self._items[offset:], start=offset):
+            if index == self.fail_at:
+                self.fail_at = None
+                raise EbayApiError('eBay /sell/inventory returned 503')
+            yield item
+
+    def get_offers_for_sku(self, sku):
+        self.offer_calls.append(sku)
+        return super().get_offers_for_sku(sku)
+
+
+@mock.patch('ebay.services.sync.OFFER_PREFETCH_BATCH', 2)
+class ResumableSweepTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Cards', slug='cards')
+        EbayCategoryMapping.objects.create(
+            ebay_store_category_id='/Pokemon/Cards', pokebin_category=category,
+        )
+        for sku in ('SKU-1', 'SKU-4'):
+            Product.objects.create(
+                category=category, title=sku, slug=sku.lower(), price=Decimal('1.00'),
+                image='images/old.jpg', stock=2, ebay_listing_id=sku,
+            )
+        # SKU-1 and SKU-4 have been ended on eBay; the others are live.
+        items = [_inventory_item(sku=f'SKU-{n}') for n in range(1, 6)]
+        offers = {f'SKU-{n}': [_offer(sku=f'SKU-{n}')] for n in (2, 3, 5)}
+        self.client = _FlakyFeedClient(items=items, offers_by_sku=offers, fail_at=4)
+        self.checkpoints = []
+
+    def _service(self):
+        return SyncService(
+            client=self.client,
+            progress=lambda checkpoint: self.checkpoints.append(copy.deepcopy(checkpoint)),
+        )
+
+    def test_failed_sweep_checkpoints_each_page_and_deactivates_nothing(self):
+        with _patch_image_download(), self.assertRaises(EbayApiError):
+            self._service().sync_all()
+
+        last = self.checkpoints[-1]
+        self.assertEqual((last.offset, last.pages), (4, 2))
+        self.assertEqual(last.seen_skus, {'SKU-1', 'SKU-2', 'SKU-3', 'SKU-4'})
+        self.assertEqual(last.unsellable_skus, {'SKU-1', 'SKU-4'})
+        # The feed wasn't covered, so nothing was zeroed.
+        self.assertEqual(Product.objects.get(ebay_listing_id='SKU-1').stock, 2)
+
+    def test_resumed_sweep_skips_finished_pages_and_then_deactivates(self):
+        with _patch_image_download(), self.assertRaises(EbayApiError):
+            self._service().sync_all()
+        self.client.offer_calls.clear()
+
+        with _patch_image_download():
+            report = self._service().sync_all(self.checkpoints[-1])
+
+        self.assertEqual(self.client.offer_calls, ['SKU-5'])
+        # Counts span the whole sweep, not just the resumed part.
+        self.assertEqual((report.created, report.skipped), (3, 2))
+        self.assertEqual(report.deactivated, 2)
+        self.assertEqual(Product.objects.get(ebay_listing_id='SKU-1').stock, 0)
+        self.assertEqual(self.checkpoints[-1].pages, 3)
+
+
+class TargetedSyncTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Cards', slug='cards')
+        EbayCategoryMapping.objects.create(
+            ebay_store_category_id='/Pokemon/Cards', pokebin_category=category,
+        )
+        self.items = [_inventory_item(sku=f'SKU-{n}') for n in range(30)]
+        self.offers = {f'SKU-{n}': [_offer(sku=f'SKU-{n}')] for n in range(30)}
+
+    def test_syncs_only_the_given_skus_with_bulk_reads(self):
+        client = _FakeClient(items=self.items, offers_by_sku=self.offers)
+        wanted = [f'SKU-{n}' for n in range(28)]
+
+        with _patch_image_download():
+            report = SyncService(client=client).sync_skus(wanted)
+
+        self.assertEqual(report.created, 28)
+        # 28 SKUs read 25 at a time.
+        self.assertEqual(client.bulk_calls, 2)
+        self.assertFalse(Product.objects.filter(ebay_listing_id='SKU-29').exists())
+
+    def test_unknown_sku_is_skipped_and_unsellable_sku_is_deactivated(self):
+        self.offers['SKU-1'] = [_offer(sku='SKU-1', status='UNPUBLISHED')]
+        client = _FakeClient(items=self.items, offers_by_sku=self.offers)
+        Product.objects.create(
+            category=Category.objects.get(), title='Old', slug='old', price=Decimal('1.00'),
+            image='images/old.jpg', stock=2, ebay_listing_id='SKU-1',
+        )
+
+        report = SyncService(client=client).sync_skus(['SKU-1', 'NOT-ON-EBAY'])
+
+        self.assertEqual((report.skipped, report.deactivated), (2, 1))
+        self.assertEqual(Product.objects.get(ebay_listing_id='SKU-1').stock, 0)
+
+
+class _SlowOfferClient(_FakeClient):
+    """Records how many offer lookups run at once; SKU-3 fails outright."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def get_offers_for_sku(self, sku):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(0.02)
+            if sku == 'SKU-3':
+                raise RuntimeError('eBay 500')
+            return super().get_offers_for_sku(sku)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class ConcurrentOfferFetchTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Cards', slug='cards')
+        EbayCategoryMapping.objects.create(
+            ebay_store_category_id='/Pokemon/Cards',
+            ebay_store_category_name='Pokemon → Cards',
+            pokebin_category=category,
+            active=True,
+        )
+        skus = [f'SKU-{n}' for n in range(12)]
+        # SKU-5 has no published offer; SKU-3's lookup raises.
+        self.client = _SlowOfferClient(
+            items=[_inventory_item(sku=sku) for sku in skus],
+            offers_by_sku={sku: [_offer(sku=sku)] for sku in skus if sku != 'SKU-5'},
+        )
+
+    def test_offers_are_fetched_concurrently_within_the_limit(self):
+        with _patch_image_download():
+            report = SyncService(client=self.client, concurrency=4).sync_all()
+
+        self.assertGreater(self.client.max_in_flight, 1)
+        self.assertLessEqual(self.client.max_in_flight, 4)
+        self.assertEqual(
+            (report.created, report.updated, report.skipped, report.errors), (10, 0, 1, 1),
+        )
+
+    def test_failed_lookup_is_isolated_to_its_sku(self):
+        with _patch_image_download():
+            report = SyncService(client=self.client, concurrency=4).sync_all()
+
+        self.assertEqual(report.error_details, ['SKU-3: eBay 500'])
+        self.assertEqual(EbayListing.objects.get(ebay_item_id='SKU-3').sync_state, 'error')
+        self.assertEqual(Product.objects.count(), 10)
+
+    def test_concurrency_of_one_fetches_serially(self):
+        with _patch_image_download():
+            report = SyncService(client=self.client, concurrency=1).sync_all()
+
+        self.assertEqual(self.client.max_in_flight, 1)
+        self.assertEqual(report.processed, 12)
+
+
+class StockOnlyTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Cards', slug='cards')
+        for sku, stock in (('SKU-1', 4), ('SKU-2', 2), ('SKU-3', 1)):
+            Product.objects.create(
+                category=category, title=f'Local {sku}', slug=f'local-{sku.lower()}',
+                price=Decimal('10.00'), image='images/local.jpg', stock=stock, ebay_listing_id=sku,
+            )
+        self.client = _FakeClient(
+            items=[
+                _inventory_item(sku='SKU-1', title='eBay title', stock=1),
+                _inventory_item(sku='SKU-2', stock=2),
+                _inventory_item(sku='SKU-3', stock=1),
+                _inventory_item(sku='NEW-1', stock=9),
+            ],
+            offers_by_sku={
+                'SKU-1': [_offer(sku='SKU-1', price='12.50')],
+                'SKU-2': [_offer(sku='SKU-2', price='10.00')],
+                'SKU-3': [_offer(sku='SKU-3', status='UNPUBLISHED')],
+                'NEW-1': [_offer(sku='NEW-1')],
+            },
+        )
+        self.client.get_offers_for_sku = mock.Mock(side_effect=self.client.get_offers_for_sku)
+
+    def test_changes_are_written_with_one_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            report = SyncService(client=self.client).sync_stock()
+
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "store_product"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('CASE', updates[0])
+        self.assertEqual(
+            (report.updated, report.unchanged, report.skipped, report.deactivated), (1, 1, 1, 1),
+        )
+        stock = dict(Product.objects.values_list('ebay_listing_id', 'stock'))
+        self.assertEqual(stock, {'SKU-1': 1, 'SKU-2': 2, 'SKU-3': 0})
+        self.assertEqual(Product.objects.get(ebay_listing_id='SKU-1').price, Decimal('12.50'))
+
+    def test_only_stock_and_price_change(self):
+        SyncService(client=self.client).sync_stock()
+
+        product = Product.objects.get(ebay_listing_id='SKU-1')
+        self.assertEqual((product.title, product.slug, product.image.name),
+                         ('Local SKU-1', 'local-sku-1', 'images/local.jpg'))
+        self.assertFalse(EbayListing.objects.exists())
+
+    def test_skus_not_in_the_catalog_are_ignored(self):
+        report = SyncService(client=self.client).sync_stock()
+
+        self.assertFalse(Product.objects.filter(ebay_listing_id='NEW-1').exists())
+        looked_up = {c.args[0] for c in self.client.get_offers_for_sku.call_args_list}
+        self.assertEqual(looked_up, {'SKU-1', 'SKU-2', 'SKU-3'})
+        self.assertEqual(report.processed, 3)
+
+    def test_bad_offer_is_an_error_for_its_sku_only(self):
+        del self.client._offers['SKU-1'][0]['pricingSummary']
+
+        report = SyncService(client=self.client).sync_stock()
+
+        self.assertEqual(report.errors, 1)
+        self.assertEqual(Product.objects.get(ebay_listing_id='SKU-1').stock, 4)
+        self.assertEqual(Product.objects.get(ebay_listing_id='SKU-3').stock, 0)
+
+    def test_dry_run_writes_nothing(self):
+        before = CatalogVersion.current()
+        report = SyncService(client=self.client, dry_run=True).sync_stock()
+
+        self.assertEqual(report.updated, 1)
+        self.assertEqual(Product.objects.get(ebay_listing_id='SKU-1').stock, 4)
+        self.assertEqual(CatalogVersion.current(), before)
+
+    def test_given_skus_are_read_in_bulk(self):
+        report = SyncService(client=self.client).sync_stock(['SKU-1', 'GONE'])
+
+        self.assertEqual(self.client.bulk_calls, 1)
+        self.assertEqual(Product.objects.get(ebay_listing_id='SKU-1').stock, 1)
+        self.assertEqual(Product.objects.get(ebay_listing_id='SKU-3').stock, 1)
+        self.assertEqual((report.updated, report.skipped), (1, 1))
+
+    def test_full_sweep_restocks_a_listing_the_refresh_deactivated(self):
+        EbayCategoryMapping.objects.create(
+            ebay_store_category_id='/Pokemon/Cards', pokebin_category=Category.objects.get(slug='cards'),
+            active=True,
+        )
+        client = _FakeClient(
+            items=[_inventory_item(sku='PSA-1', stock=3)], offers_by_sku={'PSA-1': [_offer(sku='PSA-1')]},
+        )
+        with _patch_image_download():
+            SyncService(client=client).sync_all()
+        client._offers['PSA-1'][0]['status'] = 'UNPUBLISHED'
+
+        SyncService(client=client).sync_stock()
+
+        self.assertEqual(Product.objects.get(ebay_listing_id='PSA-1').stock, 0)
+        self.assertEqual(EbayListing.objects.get(ebay_item_id='PSA-1').sync_state, 'skipped')
+
+        # Republished as it was: same content, but the sweep must not skip it.
+        client._offers['PSA-1'][0]['status'] = 'PUBLISHED'
+        report = SyncService(client=client).sync_all()
+
+        self.assertEqual((report.updated, report.unchanged), (1, 0))
+        self.assertEqual(Product.objects.get(ebay_listing_id='PSA-1').stock, 3)
+        self.assertEqual(EbayListing.objects.get(ebay_item_id='PSA-1').sync_state, 'synced')
+
+
+class PlanApplyTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Cards', slug='cards')
+        EbayCategoryMapping.objects.create(
+            ebay_store_category_id='/Pokemon/Cards', pokebin_category=self.category, active=True,
+        )
+        with _patch_image_download():
+            SyncService(client=_FakeClient(
+                items=[_inventory_item(sku='SKU-1'), _inventory_item(sku='SKU-2')],
+                offers_by_sku={'SKU-1': [_offer(sku='SKU-1')], 'SKU-2': [_offer(sku='SKU-2')]},
+            )).sync_all()
+        self.client = _FakeClient(
+            items=[
+                _inventory_item(sku='SKU-1', title='Charizard EX (PSA 10)', stock=2),
+                _inventory_item(sku='SKU-2'),
+                _inventory_item(sku='NEW-1', title='Pikachu'),
+            ],
+            offers_by_sku={
+                'SKU-1': [_offer(sku='SKU-1', price='199.99')],
+                'SKU-2': [_offer(sku='SKU-2', status='UNPUBLISHED')],
+                'NEW-1': [_offer(sku='NEW-1', price='5.00')],
+            },
+        )
+
+    def test_plan_is_an_exact_diff_and_writes_nothing(self):
+        with CaptureQueriesContext(connection) as queries:
+            plan = SyncService(client=self.client).plan()
+
+        self.assertFalse([q for q in queries if not q['sql'].startswith('SELECT')])
+        # Mappings, the product and listing snapshots, and the slug set.
+        self.assertEqual(len(queries), 4)
+        self.assertEqual(plan.updates, {'SKU-1': {
+            'title': ('Charizard EX', 'Charizard EX (PSA 10)'),
+            'price': (Decimal('149.99'), Decimal('199.99')),
+            'stock': (4, 2),
+        }})
+        self.assertEqual([c['sku'] for c in plan.creates], ['NEW-1'])
+        self.assertEqual(plan.deactivations, ['SKU-2'])
+        self.assertEqual(Product.objects.get(ebay_listing_id='SKU-1').stock, 4)
+        text = plan.as_text()
+        self.assertIn("+ NEW-1: 'Pikachu' price=5.00", text)
+        self.assertIn('price 149.99 → 199.99', text)
+        self.assertIn('- SKU-2: stock → 0', text)
+
+    def test_apply_writes_the_plan(self):
+        service = SyncService(client=self.client)
+        plan = service.plan()
+
+        with _patch_image_download():
+            report = service.apply(plan)
+
+        self.assertEqual((report.created, report.updated, report.deactivated), (1, 1, 1))
+        stock = dict(Product.objects.values_list('ebay_listing_id', 'stock'))
+        self.assertEqual(stock, {'SKU-1': 2, 'SKU-2': 0, 'NEW-1': 4})
+        self.assertEqual(Product.objects.get(ebay_listing_id='SKU-1').title, 'Charizard EX (PSA 10)')
+        self.assertEqual(EbayListing.objects.get(ebay_item_id='SKU-2').sync_state, 'skipped')
+
+    def test_two_phase_sweep_matches_a_regular_one(self):
+        with _patch_image_download():
+            report = SyncService(client=self.client, two_phase=True).sync_all()
+
+        self.assertEqual(
+            (report.created, report.updated, report.skipped, report.deactivated), (1, 1, 1, 1),
+        )
+        self.assertTrue(Product.objects.filter(ebay_listing_id='NEW-1').exists())
+
+    def test_two_phase_dry_run_returns_the_planned_counts(self):
+        report = SyncService(client=self.client, two_phase=True, dry_run=True).sync_all()
+
+        self.assertEqual((report.created, report.updated, report.deactivated), (1, 1, 1))
+        self.assertFalse(Product.objects.filter(ebay_listing_id='NEW-1').exists())
+        self.assertEqual(Product.objects.get(ebay_listing_id='SKU-2').stock, 4)
+
+    def test_sync_ebay_plan_prints_the_diff_without_recording_a_job(self):
+        out = StringIO()
+        with mock.patch(
+            'ebay.management.commands.sync_ebay.SyncService',
+            side_effect=lambda client, **kwargs: SyncService(client=self.client, **kwargs),
+        ):
+            call_command('sync_ebay', '--plan', stdout=out)
+
+        self.assertIn('Plan: 1 to create, 1 to update', out.getvalue())
+        self.assertFalse(EbaySyncJob.objects.exists())
@@ -0,0 +1,134 @@
+"""Tests for the per-phase sweep timings (`ebay.services.timing`).
+
+`PhaseTimer` runs on a fake clock. The sweep tests use a real `EbayClient`
+with its HTTP session mocked, so the client's `http.*` phases are collected
+alongside the service's own.
+"""
+
+from unittest import mock
+
+from django.test import TestCase
+
+from ebay.models import EbayCategoryMapping, EbaySyncJob
+from ebay.services import EbayClient, SyncCheckpoint, SyncReport, SyncService
+from ebay.services.timing import PhaseTimer, merge_phases, phase_lines
+from store.models import Category
+
+ITEMS = [
+    {'sku': f'SKU-{n}', 'product': {'title': f'Card {n}', 'imageUrls': []},
+     'availability': {'shipToLocationAvailability': {'quantity': n}}}
+    for n in range(1, 4)
+]
+
+
+def _response(body):
+    resp = mock.Mock(status_code=200, headers={})
+    resp.json.return_value = body
+    return resp
+
+
+def _fake_ebay(method, url, params=None, json=None, **kwargs):
+    if url.endswith('/sell/inventory/v1/inventory_item'):
+        return _response({'inventoryItems': ITEMS, 'size': len(ITEMS)})
+    return _response({'offers': [{
+        'sku': params['sku'],
+        'status': 'PUBLISHED',
+        'pricingSummary': {'price': {'value': '5.00'}},
+        'storeCategoryNames': ['/Pokemon/Cards'],
+    }]})
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class PhaseTimerTests(TestCase):
+    def test_counts_seconds_and_buckets_each_phase(self):
+        clock = _Clock()
+        timer = PhaseTimer(clock=clock)
+        for seconds in (0.005, 0.2, 7):
+            with timer.phase('http.offers'):
+                clock.now += seconds
+
+        stats = timer.as_dict()['http.offers']
+
+        self.assertEqual(stats['calls'], 3)
+        self.assertAlmostEqual(stats['seconds'], 7.205)
+        # ≤10ms, ≤250ms and >5s.
+        self.assertEqual(stats['histogram'], [1, 0, 0, 1, 0, 0, 0, 0, 1])
+
+    def test_phase_is_recorded_when_its_block_raises(self):
+        timer = PhaseTimer()
+        with self.assertRaises(ValueError), timer.phase('db.write'):
+            raise ValueError
+
+        self.assertEqual(timer.as_dict()['db.write']['calls'], 1)
+
+    def test_merge_adds_up_runs_and_lines_list_the_slowest_first(self):
+        first, second = PhaseTimer(), PhaseTimer()
+        first.record('images', 0.3)
+        second.record('images', 0.3)
+        second.record('db.read', 0.02)
+
+        merged = merge_phases(first.as_dict(), second.as_dict())
+
+        self.assertEqual((merged['images']['calls'], merged['images']['seconds']), (2, 0.6))
+        lines = phase_lines(merged)
+        self.assertEqual(lines[0], 'images: 2 × avg 300ms = 0.6s  [≤500ms:2]')
+        self.assertTrue(lines[1].startswith('db.read: 1 × avg 20ms'))
+
+
+class SweepTimingTests(TestCase):
+    def setUp(self):
+        EbayCategoryMapping.objects.create(
+            ebay_store_category_id='/Pokemon/Cards',
+            pokebin_category=Category.objects.create(name='Cards', slug='cards'),
+            active=True,
+        )
+        self.client = EbayClient(env='production', pool_size=2)
+        self.client.ensure_access_token = mock.Mock(return_value='tok')
+        patcher = mock.patch.object(self.client._session, 'request', side_effect=_fake_ebay)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sweep_reports_and_logs_every_phase(self):
+        with self.assertLogs('ebay.services.sync', level='INFO') as logs:
+            report = SyncService(self.client, concurrency=2).sync_all()
+
+        phases = report.phases
+        self.assertEqual(phases['http.inventory']['calls'], 1)
+        self.assertEqual(phases['http.offers']['calls'], 3)
+        self.assertEqual(phases['page']['calls'], 1)
+        self.assertEqual(phases['sweep']['calls'], 1)
+        self.assertIn('db.read', phases)
+        self.assertIn('db.write', phases)
+        self.assertIn('Timing (pool phases overlap):', report.as_text())
+        self.assertTrue(any(
+            'sync_ebay phase=http.offers calls=3 ' in line for line in logs.output
+        ))
+
+    def test_resumed_sweep_adds_to_the_checkpointed_timings(self):
+        earlier = PhaseTimer()
+        earlier.record('http.offers', 1.5)
+        checkpoint = SyncCheckpoint(report=SyncReport(phases=earlier.as_dict()))
+
+        report = SyncService(self.client, dry_run=True, concurrency=2).sync_all(checkpoint)
+
+        self.assertEqual(report.phases['http.offers']['calls'], 4)
+        self.assertGreaterEqual(report.phases['http.offers']['seconds'], 1.5)
+        # The phases survive the job's JSON round trip.
+        self.assertEqual(SyncCheckpoint.from_dict(checkpoint.as_dict()).report.phases, report.phases)
+
+    def test_job_summarises_its_slowest_phases(self):
+        job = EbaySyncJob(report={'phases': merge_phases(*(
+            {name: {'calls': 1, 'seconds': seconds, 'histogram': [0] * 9}}
+            for name, seconds in [('sweep', 60.0), ('page', 55.0), ('http.offers', 41.2),
+                                  ('images', 9.8), ('db.write', 3.14), ('db.read', 0.5)]
+        ))})
+
+        self.assertEqual(job.slowest_phases, 'http.offers 41.2s, images 9.8s, db.write 3.1s')
+        self.assertEqual(EbaySyncJob().slowest_phases, '')
@@ -4,4 +4,5 @@ from . import views
 
 urlpatterns = [
     path('account-deletion/', views.account_deletion, name='ebay-account-deletion'),
+    path('inventory-notifications/', views.inventory_notification, name='ebay-inventory-notification'),
 ]
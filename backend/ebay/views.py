@@ -3,6 +3,12 @@
 The marketplace account-deletion endpoint is required for production keyset
 access: eBay validates it with a GET challenge, then POSTs deletion events.
 https://developer.ebay.com/develop/guides-v2/marketplace-user-account-deletion
+
+The inventory notification endpoint receives the Notification API's item and
+offer change topics. Each verified notification queues a targeted re-sync of
+the SKUs it names (merged into any job already waiting), which the
+`run_sync_jobs` worker picks up within seconds.
+https://developer.ebay.com/api-docs/commerce/notification/static/overview.html
 """
 
 import hashlib
@@ -14,6 +20,7 @@ from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
+from .services import enqueue_sync
 from .services.signature import verify_ebay_signature
 
 logger = logging.getLogger(__name__)
@@ -27,19 +34,76 @@ def account_deletion(request):
     GET is eBay's endpoint-ownership challenge; POST is a real deletion event.
     """
     if request.method == 'GET':
-        return _challenge_response(request)
+        return _challenge_response(request, settings.EBAY_DELETION_ENDPOINT, 'EBAY_DELETION_ENDPOINT')
     return _acknowledge_deletion(request)
 
 
-def _challenge_response(request):
+@csrf_exempt
+@require_http_methods(['GET', 'POST'])
+def inventory_notification(request):
+    """eBay item/offer change notifications: re-sync the SKUs they name.
+
+    GET is the same endpoint-ownership challenge as for account deletion.
+    A POST that fails signature verification is always rejected, since it
+    would otherwise let anyone queue sync work.
+    """
+    if request.method == 'GET':
+        return _challenge_response(
+            request,
+            getattr(settings, 'EBAY_INVENTORY_NOTIFICATION_ENDPOINT', ''),
+            'EBAY_INVENTORY_NOTIFICATION_ENDPOINT',
+        )
+    if not verify_ebay_signature(request.headers.get('x-ebay-signature', ''), request.body):
+        logger.warning('eBay inventory notification failed signature verification')
+        return HttpResponse(status=412)
+
+    try:
+        payload = json.loads(request.body or b'{}')
+    except json.JSONDecodeError:
+        return HttpResponseBadRequest('invalid JSON')
+    if not isinstance(payload, dict):
+        return HttpResponseBadRequest('invalid payload')
+    topic = (payload.get('metadata') or {}).get('topic')
+    skus = sorted(_notification_skus((payload.get('notification') or {}).get('data')))
+    if not skus:
+        # Acknowledge anyway: eBay retries anything but a 2xx.
+        logger.info('eBay notification %s named no SKUs; ignored', topic)
+        return HttpResponse(status=200)
+
+    job, created = enqueue_sync(skus=skus)
+    logger.info(
+        'eBay notification %s: %d SKU(s) %s sync #%s',
+        topic, len(skus), 'queued as' if created else 'merged into', job.pk,
+    )
+    return HttpResponse(status=200)
+
+
+def _notification_skus(data, depth: int = 0) -> set[str]:
+    """Every `sku` value in a notification's data, however it is nested."""
+    if depth > 5:
+        return set()
+    skus = set()
+    if isinstance(data, dict):
+        sku = data.get('sku')
+        if isinstance(sku, str) and sku:
+            skus.add(sku)
+        for value in data.values():
+            if isinstance(value, (dict, list)):
+                skus |= _notification_skus(value, depth + 1)
+    elif isinstance(data, list):
+        for value in data:
+            skus |= _notification_skus(value, depth + 1)
+    return skus
+
+
+def _challenge_response(request, endpoint: str, endpoint_setting: str):
     challenge_code = request.GET.get('challenge_code')
     if not challenge_code:
         return HttpResponseBadRequest('missing challenge_code')
 
     token = settings.EBAY_VERIFICATION_TOKEN
-    endpoint = settings.EBAY_DELETION_ENDPOINT
     if not token or not endpoint:
-        logger.error('eBay deletion endpoint unconfigured: set EBAY_VERIFICATION_TOKEN and EBAY_DELETION_ENDPOINT')
+        logger.error('eBay notification endpoint unconfigured: set EBAY_VERIFICATION_TOKEN and %s', endpoint_setting)
         return JsonResponse({'error': 'endpoint not configured'}, status=500)
 
     # eBay requires this exact concatenation order, hex-encoded.
@@ -97,6 +97,7 @@ INSTALLED_APPS = [
     'account',
     'payment',
     'ebay',
+    'outbox',
 ]
 
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
@@ -395,12 +396,30 @@ EBAY_STORE_CATEGORY_IDS = [
 # rather than dumped into an arbitrary category.
 EBAY_FALLBACK_CATEGORY_SLUG = env('EBAY_FALLBACK_CATEGORY_SLUG', default='')
 
+# How many per-SKU offer lookups a sync sweep keeps in flight at once (and the
+# size of the client's HTTP connection pool). 1 fetches serially.
+EBAY_SYNC_CONCURRENCY = env.int('EBAY_SYNC_CONCURRENCY', default=8)
+# Inventory pages a sweep fetches ahead of the one it is processing, on a
+# background thread. 0 fetches each page only when the previous one is done.
+EBAY_INVENTORY_PREFETCH_PAGES = env.int('EBAY_INVENTORY_PREFETCH_PAGES', default=2)
+
+# Client-side ceiling on eBay REST calls per second, shared by every thread of
+# a sweep (the Sell APIs allow on the order of 2M calls/day, ~23/s). A 429
+# halves the rate, which then recovers as calls succeed.
+EBAY_API_CALLS_PER_SECOND = env.float('EBAY_API_CALLS_PER_SECOND', default=20.0)
+# Retries for a throttled (429) call, or an idempotent one that hit a
+# transient 5xx / connection error, before it fails.
+EBAY_API_MAX_RETRIES = env.int('EBAY_API_MAX_RETRIES', default=4)
+
 # Marketplace account-deletion notification endpoint (required for production
 # keys). The token is what you register in the eBay portal (32-80 chars,
 # [A-Za-z0-9_-]); the endpoint must be the exact public URL you register, since
 # eBay folds it into the challenge hash.
 EBAY_VERIFICATION_TOKEN = env('EBAY_VERIFICATION_TOKEN', default='')
 EBAY_DELETION_ENDPOINT = env('EBAY_DELETION_ENDPOINT', default='')
+# Public URL registered as the Notification API destination for item/offer
+# change topics (same challenge scheme and verification token as above).
+EBAY_INVENTORY_NOTIFICATION_ENDPOINT = env('EBAY_INVENTORY_NOTIFICATION_ENDPOINT', default='')
 
 # When True, deletion notifications that fail x-ebay-signature verification are
 # rejected (HTTP 412) instead of acknowledged. Default False: we still ack
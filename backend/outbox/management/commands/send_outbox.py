@@ -0,0 +1,53 @@
+"""Deliver queued transactional email (order confirmations, verification mail).
+
+Long-running worker: drains the outbox in batches over one SMTP connection per
+batch, then sleeps while there is nothing due. Failed sends are retried with
+exponential backoff and marked `failed` after `MAX_ATTEMPTS`.
+
+    python manage.py send_outbox
+    python manage.py send_outbox --once          # drain what's due, then exit
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from outbox.services import BATCH_SIZE, send_pending
+
+
+class Command(BaseCommand):
+    help = 'Send queued outbox emails in batches, retrying failures with backoff.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once nothing is due instead of polling forever.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help=f'Emails claimed and sent per SMTP connection (default {BATCH_SIZE}).',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Seconds to sleep when the outbox is empty (default 5).',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                report = send_pending(options['batch_size'])
+                if report.claimed:
+                    self.stdout.write(
+                        f'outbox: sent={report.sent} retried={report.retried} failed={report.failed}'
+                    )
+                    continue
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('outbox: stopped.')
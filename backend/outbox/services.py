@@ -0,0 +1,152 @@
+"""Queue transactional email now, deliver it later.
+
+`queue_email` is called from request handlers inside the transaction that
+creates the Order or User, so the request never waits on the mail provider.
+`send_pending` is the delivery side, driven by `manage.py send_outbox`: it
+claims a batch of due rows, sends them over one SMTP connection, and
+reschedules failures with exponential backoff.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 8
+# Retry delays double from BACKOFF_BASE up to BACKOFF_MAX: 1m, 2m, 4m … 1h.
+BACKOFF_BASE = dt.timedelta(minutes=1)
+BACKOFF_MAX = dt.timedelta(hours=1)
+# A claimed row is invisible to other senders for this long. If the worker
+# dies mid-batch the row simply becomes due again afterwards.
+CLAIM_LEASE = dt.timedelta(minutes=5)
+
+
+@dataclass
+class SendReport:
+    claimed: int = 0
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+def queue_email(
+    subject: str,
+    body: str,
+    to: list[str],
+    *,
+    from_email: Optional[str] = None,
+    reply_to: Optional[list[str]] = None,
+) -> OutboxEmail:
+    """Store an email for background delivery.
+
+    Call it inside the same `transaction.atomic()` block as the row the email
+    is about; the email is then committed (or rolled back) together with it.
+    """
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(to),
+        reply_to=list(reply_to or []),
+    )
+
+
+def send_pending(batch_size: int = BATCH_SIZE) -> SendReport:
+    """Deliver one batch of due emails over a single reused connection."""
+    batch = _claim_batch(batch_size)
+    report = SendReport(claimed=len(batch))
+    if not batch:
+        return report
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as exc:  # noqa: BLE001 — mail server unreachable; retry the lot
+        logger.warning('outbox: could not open mail connection: %s', exc)
+        for email in batch:
+            _record_failure(email, exc, report)
+        return report
+
+    sent_ids = []
+    try:
+        for email in batch:
+            try:
+                connection.send_messages([_as_message(email, connection)])
+            except Exception as exc:  # noqa: BLE001 — per-message isolation
+                _record_failure(email, exc, report)
+            else:
+                sent_ids.append(email.pk)
+    finally:
+        connection.close()
+
+    if sent_ids:
+        OutboxEmail.objects.filter(pk__in=sent_ids).update(
+            status=OutboxEmail.SENT, sent_at=timezone.now(), last_error='',
+        )
+    report.sent = len(sent_ids)
+    return report
+
+
+def _claim_batch(batch_size: int) -> list[OutboxEmail]:
+    """Lock the next due rows and lease them to this worker.
+
+    `skip_locked` lets several workers drain the outbox side by side without
+    sending the same row twice (a no-op on SQLite, which has no row locks).
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'pk')[:batch_size]
+        )
+        if batch:
+            OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + CLAIM_LEASE,
+            )
+    for email in batch:
+        email.attempts += 1
+    return batch
+
+
+def _as_message(email: OutboxEmail, connection) -> EmailMessage:
+    return EmailMessage(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=email.to,
+        reply_to=email.reply_to or None,
+        connection=connection,
+    )
+
+
+def _record_failure(email: OutboxEmail, exc: Exception, report: SendReport) -> None:
+    email.last_error = str(exc)[:1000]
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = OutboxEmail.FAILED
+        report.failed += 1
+        logger.error('outbox: giving up on email %s after %s attempts: %s', email.pk, email.attempts, exc)
+    else:
+        email.next_attempt_at = timezone.now() + backoff_delay(email.attempts)
+        report.retried += 1
+        logger.warning('outbox: email %s failed (attempt %s), retrying: %s', email.pk, email.attempts, exc)
+    email.save(update_fields=['status', 'next_attempt_at', 'last_error'])
+
+
+def backoff_delay(attempts: int) -> dt.timedelta:
+    """Delay before the next try after `attempts` failed sends."""
+    return min(BACKOFF_BASE * (2 ** max(attempts - 1, 0)), BACKOFF_MAX)
@@ -0,0 +1,111 @@
+"""Tests for the email outbox and its `send_outbox` worker.
+
+Django's test runner swaps in the locmem mail backend, so delivered messages
+land in `mail.outbox`; failures are simulated by patching the connection.
+"""
+
+import datetime as dt
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import OutboxEmail
+from .services import MAX_ATTEMPTS, backoff_delay, queue_email, send_pending
+
+
+class SendPendingTests(TestCase):
+    def test_sends_due_emails_and_marks_them_sent(self):
+        queue_email('Order received', 'Thanks!', ['ash@pokebin.app'], reply_to=['support@pokebin.app'])
+        queue_email('Order received', 'Thanks!', ['misty@pokebin.app'])
+
+        report = send_pending()
+
+        self.assertEqual((report.claimed, report.sent, report.retried), (2, 2, 0))
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['ash@pokebin.app', 'misty@pokebin.app'])
+        self.assertEqual(mail.outbox[0].reply_to, ['support@pokebin.app'])
+        self.assertFalse(OutboxEmail.objects.exclude(status=OutboxEmail.SENT).exists())
+
+    def test_reuses_one_connection_per_batch(self):
+        for n in range(3):
+            queue_email('Hi', 'Body', [f'user{n}@pokebin.app'])
+
+        with mock.patch('outbox.services.get_connection', wraps=mail.get_connection) as get_connection:
+            send_pending()
+
+        get_connection.assert_called_once_with()
+
+    def test_does_not_send_emails_that_are_not_due(self):
+        email = queue_email('Hi', 'Body', ['ash@pokebin.app'])
+        OutboxEmail.objects.filter(pk=email.pk).update(
+            next_attempt_at=timezone.now() + dt.timedelta(minutes=5),
+        )
+
+        report = send_pending()
+
+        self.assertEqual(report.claimed, 0)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_failed_send_is_rescheduled_with_backoff(self):
+        email = queue_email('Hi', 'Body', ['ash@pokebin.app'])
+
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=ConnectionError('smtp down'),
+        ):
+            before = timezone.now()
+            report = send_pending()
+
+        self.assertEqual((report.sent, report.retried), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('smtp down', email.last_error)
+        self.assertGreaterEqual(email.next_attempt_at, before + backoff_delay(1))
+
+    def test_gives_up_after_max_attempts(self):
+        email = queue_email('Hi', 'Body', ['ash@pokebin.app'])
+        OutboxEmail.objects.filter(pk=email.pk).update(attempts=MAX_ATTEMPTS - 1)
+
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=ConnectionError('smtp down'),
+        ):
+            report = send_pending()
+
+        self.assertEqual(report.failed, 1)
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.FAILED)
+
+    def test_backoff_doubles_and_is_capped(self):
+        self.assertEqual(backoff_delay(1), dt.timedelta(minutes=1))
+        self.assertEqual(backoff_delay(3), dt.timedelta(minutes=4))
+        self.assertEqual(backoff_delay(30), dt.timedelta(hours=1))
+
+
+class SendOutboxCommandTests(TestCase):
+    def test_once_drains_every_batch_then_exits(self):
+        for n in range(5):
+            queue_email('Hi', 'Body', [f'user{n}@pokebin.app'])
+
+        call_command('send_outbox', '--once', '--batch-size', '2', stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 5)
+
+
+class RegistrationQueuesEmailTests(TestCase):
+    def test_api_register_queues_verification_email(self):
+        response = self.client.post(reverse('api-register'), data={
+            'username': 'ash',
+            'email': 'ash@pokebin.app',
+            'password1': 'pikachu-rules-42',
+            'password2': 'pikachu-rules-42',
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboxEmail.objects.get().to, ['ash@pokebin.app'])
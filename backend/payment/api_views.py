@@ -1,12 +1,14 @@
 from decimal import Decimal
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 from .models import Order, OrderItem, ShippingAddress
-from store.models import Product
-from django.core.mail import EmailMessage
-from django.conf import settings
+from store.models import CatalogVersion, Product
+from outbox.services import queue_email
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -32,65 +34,40 @@ def api_complete_order(request):
         ]
         shipping_address = '\n'.join(filter(None, address_parts))
 
-        # Resolve products and compute total using database prices — never trust client-supplied prices
-        resolved_items = []
-        total_cost = Decimal('0.00')
+        # Merge duplicate lines so each product is locked and decremented once.
+        quantities = {}
         for item in cart_items:
-            try:
-                product = Product.objects.get(id=item.get('id'), stock__gt=0)
-                quantity = int(item.get('quantity', 1))
-                if quantity < 1:
-                    continue
-                total_cost += product.price * quantity
-                resolved_items.append((product, quantity))
-            except Product.DoesNotExist:
+            quantity = int(item.get('quantity', 1))
+            if quantity < 1 or item.get('id') is None:
                 continue
+            product_id = int(item['id'])
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
 
-        if not resolved_items:
+        user = request.user if request.user.is_authenticated else None
+        try:
+            # The confirmation email is queued in the same transaction as the
+            # order, so it is sent if and only if the order commits.
+            with transaction.atomic():
+                order, resolved_items = _place_order(quantities, shipping_data, shipping_address, user)
+                if order is not None and order.email:
+                    product_list = [product.title for product, _ in resolved_items]
+                    queue_email(
+                        subject='Order received',
+                        body=f'Hi!\n\nThank you for placing your order. Your order number is: {order.id}\n\n'
+                             f'Please see your order below:\n\n{", ".join(product_list)}\n\n'
+                             f'Total paid: ${order.amount_paid:.2f}',
+                        to=[order.email],
+                        reply_to=['support@pokebin.app'],
+                    )
+        except InsufficientStock as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if order is None:
             return Response(
                 {'error': 'No valid products in cart'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Create order
-        order = Order.objects.create(
-            full_name=shipping_data.get('full_name', ''),
-            email=shipping_data.get('email', ''),
-            shipping_address=shipping_address,
-            amount_paid=total_cost,
-            user=request.user if request.user.is_authenticated else None
-        )
-
-        # Create order items and update product stock
-        product_list = []
-        for product, quantity in resolved_items:
-            OrderItem.objects.create(
-                order=order,
-                product=product,
-                quantity=quantity,
-                price=product.price,
-                user=request.user if request.user.is_authenticated else None
-            )
-            product.stock -= quantity
-            product.units_sold += quantity
-            product.save()
-            product_list.append(product.title)
-
-        # Send email
-        try:
-            email_message = EmailMessage(
-                subject='Order received',
-                body=f'Hi!\n\nThank you for placing your order. Your order number is: {order.id}\n\n'
-                     f'Please see your order below:\n\n{", ".join(product_list)}\n\n'
-                     f'Total paid: ${total_cost:.2f}',
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[shipping_data.get('email', '')],
-                reply_to=['support@pokebin.app'],
-            )
-            email_message.send(fail_silently=False)
-        except Exception as e:
-            print(f'Error sending email: {e}')
-
         return Response({
             'success': True,
             'order_id': order.id,
@@ -104,5 +81,71 @@ def api_complete_order(request):
         )
 
 
+class InsufficientStock(Exception):
+    """A cart line asks for more units than are left in stock."""
+
+
+def _place_order(quantities, shipping_data, shipping_address, user):
+    """Create the Order, its OrderItems and the stock decrements.
+
+    Must run inside `transaction.atomic()`: the product rows stay locked until
+    the caller's transaction commits.
+
+    Costs a fixed number of queries however many lines the cart has: one locked
+    SELECT for every product, one INSERT for the order, one bulk INSERT for the
+    items and one UPDATE for stock/units_sold. Prices come from the database —
+    never trust client-supplied prices.
+
+    Returns `(None, [])` when none of the requested products is purchasable.
+    """
+    # Row locks keep two concurrent checkouts from overselling the same slab.
+    products = (
+        Product.objects.select_for_update()
+        .filter(stock__gt=0)
+        .in_bulk(list(quantities))
+    )
+    resolved_items = [
+        (products[product_id], quantity)
+        for product_id, quantity in quantities.items()
+        if product_id in products
+    ]
+    if not resolved_items:
+        return None, []
+
+    for product, quantity in resolved_items:
+        if quantity > product.stock:
+            raise InsufficientStock(
+                f'Only {product.stock} of "{product.title}" left in stock'
+            )
 
+    total_cost = sum(
+        (product.price * quantity for product, quantity in resolved_items),
+        Decimal('0.00'),
+    )
+    order = Order.objects.create(
+        full_name=shipping_data.get('full_name', ''),
+        email=shipping_data.get('email', ''),
+        shipping_address=shipping_address,
+        amount_paid=total_cost,
+        user=user,
+    )
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, product=product, quantity=quantity,
+                  price=product.price, user=user)
+        for product, quantity in resolved_items
+    ])
 
+    # One UPDATE for every line; F() keeps the arithmetic in the database.
+    delta = Case(
+        *[When(pk=product.pk, then=Value(quantity)) for product, quantity in resolved_items],
+        output_field=IntegerField(),
+    )
+    Product.objects.filter(pk__in=[product.pk for product, _ in resolved_items]).update(
+        stock=F('stock') - delta,
+        units_sold=F('units_sold') + delta,
+        updated_at=timezone.now(),
+    )
+    # `update()` skips the save signals; stock changed, so cached catalog
+    # pages are stale (the bump itself waits for the order to commit).
+    CatalogVersion.bump()
+    return order, resolved_items
@@ -1,3 +1,130 @@
+"""Tests for the React checkout endpoint (`api_complete_order`).
+
+Checkout must cost a fixed number of queries regardless of cart size, and a
+failed checkout must leave no partial Order or stock change behind.
+"""
+
+from decimal import Decimal
+
+from django.core import mail
 from django.test import TestCase
+from django.urls import reverse
+
+from outbox.models import OutboxEmail
+from store.models import Category, CatalogVersion, Product
+
+from .models import Order, OrderItem
+
+
+class ApiCompleteOrderTests(TestCase):
+    def setUp(self):
+        self.url = reverse('api-complete-order')
+        category = Category.objects.create(name='Cards', slug='cards')
+        self.products = [
+            Product.objects.create(
+                category=category,
+                title=f'Card {n}',
+                slug=f'card-{n}',
+                price=Decimal('10.00') + n,
+                image='images/card.jpg',
+                stock=5,
+            )
+            for n in range(6)
+        ]
+
+    def _post(self, cart_items):
+        return self.client.post(
+            self.url,
+            data={
+                'cart_items': cart_items,
+                'shipping': {'full_name': 'Ash', 'email': 'ash@pokebin.app', 'city': 'Pallet'},
+            },
+            content_type='application/json',
+        )
+
+    def test_places_order_and_decrements_stock(self):
+        first, second = self.products[:2]
+        response = self._post([
+            {'id': first.pk, 'quantity': 2},
+            {'id': second.pk, 'quantity': 1},
+        ])
+
+        self.assertEqual(response.status_code, 200, response.content)
+        order = Order.objects.get(pk=response.json()['order_id'])
+        self.assertEqual(order.amount_paid, first.price * 2 + second.price)
+        self.assertEqual(OrderItem.objects.filter(order=order).count(), 2)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.stock, first.units_sold), (3, 2))
+        self.assertEqual((second.stock, second.units_sold), (4, 1))
+
+    def test_confirmation_email_is_queued_not_sent(self):
+        response = self._post([{'id': self.products[0].pk, 'quantity': 1}])
+
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.to, ['ash@pokebin.app'])
+        self.assertIn(str(response.json()['order_id']), email.body)
+
+    def test_query_count_does_not_grow_with_cart_size(self):
+        # The catalog bump waits for the commit, which the test never reaches.
+        with self.assertNumQueries(7):
+            self._post([{'id': self.products[0].pk, 'quantity': 1}])
+        with self.assertNumQueries(7):
+            self._post([{'id': p.pk, 'quantity': 1} for p in self.products[1:]])
+
+    def test_catalog_version_is_bumped_after_the_order_commits(self):
+        before = CatalogVersion.current()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self._post([{'id': self.products[0].pk, 'quantity': 1}])
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(CatalogVersion.current(), before + 1)
+
+    def test_failed_checkout_leaves_the_catalog_version_alone(self):
+        before = CatalogVersion.current()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self._post([
+                {'id': self.products[0].pk, 'quantity': 1},
+                {'id': self.products[1].pk, 'quantity': 6},
+            ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(CatalogVersion.current(), before)
+
+    def test_duplicate_lines_are_merged(self):
+        product = self.products[0]
+        self._post([{'id': product.pk, 'quantity': 1}, {'id': product.pk, 'quantity': 2}])
+
+        item = OrderItem.objects.get(product=product)
+        self.assertEqual(item.quantity, 3)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 2)
+
+    def test_insufficient_stock_rolls_back_whole_order(self):
+        plenty, scarce = self.products[:2]
+        response = self._post([
+            {'id': plenty.pk, 'quantity': 1},
+            {'id': scarce.pk, 'quantity': 6},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+        self.assertFalse(OutboxEmail.objects.exists())
+        plenty.refresh_from_db()
+        self.assertEqual(plenty.stock, 5)
+
+    def test_out_of_stock_and_unknown_products_are_ignored(self):
+        sold_out = self.products[0]
+        sold_out.stock = 0
+        sold_out.save()
+
+        response = self._post([{'id': sold_out.pk, 'quantity': 1}, {'id': 999999, 'quantity': 1}])
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'No valid products in cart')
+        self.assertFalse(Order.objects.exists())
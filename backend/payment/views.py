@@ -8,9 +8,9 @@ from store.models import Product
 
 from django.http import JsonResponse
 
-from django.core.mail import EmailMessage
+from django.db import transaction
 
-from django.conf import settings
+from outbox.services import queue_email
 
 def checkout(request):
     
@@ -67,51 +67,52 @@ def complete_order(request):
             2) Create order -> Guest users without an account
         
         '''
-        product_list = []
-        if request.user.is_authenticated:
+        # Order rows and the confirmation email commit (or roll back) together;
+        # the email itself goes out from the `send_outbox` worker.
+        with transaction.atomic():
             
-            order = Order.objects.create(full_name=name, email=email, shipping_address=shipping_address, 
-                                         amount_paid=total_cost, user=request.user)
+            product_list = []
+            if request.user.is_authenticated:
+            
+                order = Order.objects.create(full_name=name, email=email, shipping_address=shipping_address, 
+                                             amount_paid=total_cost, user=request.user)
                         
-            for item in cart: 
+                for item in cart: 
                 
-                OrderItem.objects.create(order_id=order.pk, product=item['product'], quantity=item['qty'],
-                                         price=item['price'], user=request.user)
-                update_catalog = Product.objects.get(pk=item['product_id'])
-                update_catalog.stock -= 1
-                update_catalog.units_sold += 1
-                update_catalog.save()
-                product_list.append(item['product'])
-        else: # guest users
+                    OrderItem.objects.create(order_id=order.pk, product=item['product'], quantity=item['qty'],
+                                             price=item['price'], user=request.user)
+                    update_catalog = Product.objects.get(pk=item['product_id'])
+                    update_catalog.stock -= 1
+                    update_catalog.units_sold += 1
+                    update_catalog.save()
+                    product_list.append(item['product'])
+            else: # guest users
             
-            order = Order.objects.create(full_name=name, email=email, shipping_address=shipping_address, 
-                                         amount_paid=total_cost)
+                order = Order.objects.create(full_name=name, email=email, shipping_address=shipping_address, 
+                                             amount_paid=total_cost)
             
-            for item in cart: 
-                
-                OrderItem.objects.create(order_id=order.pk, product=item['product'], quantity=item['qty'],
-                                         price=item['price'])
+                for item in cart: 
                 
-                update_catalog = Product.objects.get(pk=item['product_id'])
-                update_catalog.stock -= 1
-                update_catalog.units_sold += 1
-                update_catalog.save()
-                product_list.append(item['product'])
+                    OrderItem.objects.create(order_id=order.pk, product=item['product'], quantity=item['qty'],
+                                             price=item['price'])
                 
-        
-        all_products = product_list
-        # email order
-        
-        email_message = EmailMessage(
-            subject='Order received',
-            body='Hi! ' + '\n\n' + 'Thank you for placing your order. Your order numer is : ' + str(order.pk) + '\n\n' + 
-                    'Please see your order below:' + '\n\n' + str(all_products) + '\n\n' + 'Total paid: $' +
-                    str(cart.get_total()),
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[email],
-            reply_to=['support@pokebin.app'],
-        )
-        email_message.send(fail_silently=False)
+                    update_catalog = Product.objects.get(pk=item['product_id'])
+                    update_catalog.stock -= 1
+                    update_catalog.units_sold += 1
+                    update_catalog.save()
+                    product_list.append(item['product'])
+
+            all_products = product_list
+            # email order
+
+            queue_email(
+                subject='Order received',
+                body='Hi! ' + '\n\n' + 'Thank you for placing your order. Your order numer is : ' + str(order.pk) + '\n\n' + 
+                        'Please see your order below:' + '\n\n' + str(all_products) + '\n\n' + 'Total paid: $' +
+                        str(cart.get_total()),
+                to=[email],
+                reply_to=['support@pokebin.app'],
+            )
                 
             
             
@@ -1,13 +1,22 @@
 from rest_framework import viewsets, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from .cache import CatalogCacheMixin, cached_categories, with_in_stock_counts
+from .filters import ProductSearchFilter
 from .models import Category, Product
-from .serializers import CategorySerializer, ProductSerializer
+from .pagination import ProductCursorPagination, wants_cursor_pagination
+from .serializers import CategoryWithCountSerializer, ProductSerializer
 
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.all()
-    serializer_class = CategorySerializer
+    serializer_class = CategoryWithCountSerializer
+
+    def get_queryset(self):
+        # The list is the same in-process copy the templates use.
+        if self.action == 'list':
+            return cached_categories()
+        return with_in_stock_counts(Category.objects.all())
 
     @action(detail=True, methods=['get'])
     def products(self, request, pk=None):
@@ -17,10 +26,10 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Product.objects.filter(stock__gt=0).select_related('category')
     serializer_class = ProductSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [filters.OrderingFilter, ProductSearchFilter]
     search_fields = ['title', 'description', 'brand']
     ordering_fields = ['price', 'title']
     ordering = ['pk']
@@ -33,6 +42,14 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(category__slug=category)
         return queryset
 
+    @property
+    def paginator(self):
+        # `?pagination=cursor` opts into keyset pagination (no COUNT/OFFSET);
+        # everything else keeps the global page-number pagination.
+        if not hasattr(self, '_paginator') and wants_cursor_pagination(self.request):
+            self._paginator = ProductCursorPagination()
+        return super().paginator
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
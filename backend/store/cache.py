@@ -0,0 +1,198 @@
+"""Read-through cache and conditional GETs for the catalog API.
+
+Every anonymous visitor gets the same `/api/products/` and `/api/categories/`
+payloads, so we cache the serialized data under a key made of the catalog
+version, the endpoint, and the normalized query string. Invalidation is a
+single `CatalogVersion.bump()` (on Product/Category save or delete, after a
+checkout, and at the end of an eBay sweep; the counter moves once the change
+commits): old keys simply stop being asked for and expire on their own.
+
+The same version gives every response a strong `ETag`, and its timestamp a
+`Last-Modified`. A client revalidating with `If-None-Match` or
+`If-Modified-Since` gets a 304 before any product is queried or serialized.
+
+The category list (with per-category in-stock counts) is small, wanted on
+every template render and by the categories API, and changes rarely; it is
+kept in process memory instead (see `cached_categories`).
+
+The legacy storefront's pages and its catalog aggregates are cached by
+version too (see `storefront_page`).
+"""
+
+import hashlib
+import threading
+import time
+from functools import partial
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Count, Max, Min, Q
+from django.dispatch import receiver
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .models import CatalogVersion, Category, Product, catalog_changed
+
+CACHE_PREFIX = 'catalog'
+# Entries are never served past a version bump; the timeout only bounds how
+# long superseded ones sit in memory.
+CACHE_TIMEOUT = 60 * 60
+# How long a process trusts its category list before re-reading the catalog
+# version. Changes made in this process invalidate it immediately; this only
+# bounds staleness for changes made by other workers.
+CATEGORY_RECHECK_SECONDS = 60
+
+
+def with_in_stock_counts(queryset):
+    """Annotate categories with `in_stock_count`, the number of products on sale."""
+    return queryset.annotate(in_stock_count=Count('product', filter=Q(product__stock__gt=0)))
+
+
+class _CategoryCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.rows = None
+        self.version = None
+        self.checked_at = 0.0
+
+
+_categories = _CategoryCache()
+
+
+def cached_categories():
+    """All categories in creation (pk) order, annotated with `in_stock_count`.
+
+    Served from process memory; at most one catalog-version lookup per
+    `CATEGORY_RECHECK_SECONDS`, and the aggregate query only after a change.
+    Returns a fresh list each call so callers may slice or reorder it.
+    """
+    now = time.monotonic()
+    rows = _categories.rows
+    if rows is not None and now - _categories.checked_at < CATEGORY_RECHECK_SECONDS:
+        return list(rows)
+    version = CatalogVersion.current()
+    with _categories.lock:
+        if _categories.rows is None or _categories.version != version:
+            # The order the menu has always shown; the GROUP BY alone
+            # wouldn't guarantee one.
+            _categories.rows = list(with_in_stock_counts(Category.objects.order_by('pk')))
+            _categories.version = version
+        _categories.checked_at = now
+        return list(_categories.rows)
+
+
+@receiver(catalog_changed)
+def invalidate_cached_categories(**kwargs):
+    with _categories.lock:
+        _categories.clear()
+
+
+def catalog_variant(request, view_name: str, action: str, lookup: str = '') -> str:
+    """Digest identifying one catalog representation, independent of version."""
+    params = request.query_params
+    normalized = urlencode(sorted(
+        (key, value) for key in params for value in sorted(params.getlist(key))
+    ))
+    # Responses embed absolute URLs (images, pagination links), so the host
+    # the client used is part of the variant, as is the negotiated format.
+    renderer = getattr(request, 'accepted_renderer', None)
+    raw = '|'.join([
+        request.build_absolute_uri('/'), getattr(renderer, 'format', ''),
+        view_name, action, lookup, normalized,
+    ])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def catalog_cache_key(version: int, variant: str) -> str:
+    return f'{CACHE_PREFIX}:{version}:{variant}'
+
+
+def catalog_etag(version: int, variant: str) -> str:
+    return f'"{version}-{variant[:16]}"'
+
+
+def storefront_page(ordering, page_number, per_page):
+    """One page of in-stock products for the template storefront, plus stats.
+
+    `stats` holds the in-stock `count` and the `min_price`/`max_price` range,
+    computed by a single aggregate query; the paginator reuses the count
+    instead of issuing its own `COUNT(*)`. Both the stats and each page's rows
+    are cached until the catalog version moves, so a warm landing page costs
+    one version lookup however large the catalog grows.
+    """
+    version = CatalogVersion.current()
+    in_stock = Product.objects.filter(stock__gt=0)
+    stats = cache.get_or_set(
+        catalog_cache_key(version, 'storefront:stats'),
+        lambda: in_stock.aggregate(count=Count('pk'), min_price=Min('price'), max_price=Max('price')),
+        CACHE_TIMEOUT,
+    )
+
+    paginator = Paginator(in_stock.order_by(*ordering), per_page)
+    paginator.count = stats['count']
+    page = paginator.get_page(page_number)
+    page.object_list = cache.get_or_set(
+        catalog_cache_key(version, f'storefront:{",".join(ordering)}:{per_page}:{page.number}'),
+        lambda: list(page.object_list),
+        CACHE_TIMEOUT,
+    )
+    return page, stats
+
+
+class CatalogCacheMixin:
+    """Conditional, cached `list` and `retrieve` for the catalog viewsets.
+
+    Every GET carries `ETag`/`Last-Modified` and is answered with a 304 when
+    the client's copy is current. Anonymous GETs are additionally served from
+    the cache; only the response data is cached, rendering (JSON or the
+    browsable API) still happens per request.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response('list', request, partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(
+            'retrieve', request, partial(super().retrieve, request, *args, **kwargs),
+        )
+
+    def _cached_response(self, action, request, render):
+        if request.method != 'GET':
+            return render()
+        lookup = str(self.kwargs.get(self.lookup_url_kwarg or self.lookup_field, ''))
+        variant = catalog_variant(request, self.basename, action, lookup)
+        version, updated_at = CatalogVersion.state()
+        etag = catalog_etag(version, variant)
+        last_modified = int(updated_at.timestamp()) if updated_at else None
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return self._with_validators(not_modified, etag, last_modified)
+
+        if request.user.is_authenticated:
+            return self._with_validators(render(), etag, last_modified)
+
+        key = catalog_cache_key(version, variant)
+        data = cache.get(key)
+        if data is not None:
+            return self._with_validators(Response(data), etag, last_modified)
+        response = render()
+        if response.status_code == 200:
+            cache.set(key, response.data, CACHE_TIMEOUT)
+        return self._with_validators(response, etag, last_modified)
+
+    @staticmethod
+    def _with_validators(response, etag, last_modified):
+        if response.status_code not in (200, 304):
+            return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        # Let browsers keep the body but always revalidate it.
+        patch_cache_control(response, no_cache=True)
+        return response
@@ -0,0 +1,26 @@
+from rest_framework import filters
+
+from .search import search_products
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """`?search=` answered from the full-text index instead of `icontains` scans.
+
+    Results come back best match first, unless the client asked for an
+    explicit `?ordering=`. Must run after `OrderingFilter` so its default
+    ordering doesn't overwrite the rank.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+        return search_products(queryset, query, rank_order=self.ranks_by_relevance(request))
+
+    @classmethod
+    def ranks_by_relevance(cls, request) -> bool:
+        """Whether this request's results come back best match first."""
+        params = request.query_params
+        return bool(params.get(cls.search_param, '').strip()) and not params.get(
+            filters.OrderingFilter.ordering_param
+        )
@@ -0,0 +1,83 @@
+"""Show the query plans behind the storefront's hot-path lookups.
+
+Loads a synthetic catalog (100k products by default, a fifth of them out of
+stock, spread over a handful of categories) inside a transaction, runs
+`EXPLAIN` and times each listing/detail query the API and templates issue,
+then rolls everything back. Run it against a scratch database, or at least
+not against production: the bulk insert holds its locks until rollback.
+
+    python manage.py bench_catalog_queries
+    python manage.py bench_catalog_queries --products 20000 --rounds 50
+"""
+
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from store.models import Category, Product
+
+CATEGORY_COUNT = 8
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN and time the catalog listing/detail queries on a synthetic catalog.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--rounds', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            categories = self._load(options['products'])
+            self._analyze()
+            for label, queryset in self._queries(categories, options['products']):
+                self._report(label, queryset, options['rounds'])
+            transaction.set_rollback(True)
+
+    def _load(self, count):
+        self.stdout.write(f'Loading {count} products ({connection.vendor})...')
+        categories = Category.objects.bulk_create([
+            Category(name=f'Bench {n}', slug=f'bench-category-{n}') for n in range(CATEGORY_COUNT)
+        ])
+        for start in range(0, count, BATCH_SIZE):
+            Product.objects.bulk_create([
+                Product(
+                    category=categories[n % CATEGORY_COUNT],
+                    title=f'Bench Card {n:06d}',
+                    slug=f'bench-card-{n:06d}',
+                    price=Decimal(n % 50_000) / 100,
+                    image='images/bench.jpg',
+                    stock=0 if n % 5 == 0 else 1 + n % 3,
+                )
+                for n in range(start, min(start + BATCH_SIZE, count))
+            ])
+        return categories
+
+    @staticmethod
+    def _analyze():
+        # Fresh statistics, so the planner sees the real row counts.
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    @staticmethod
+    def _queries(categories, count):
+        in_stock = Product.objects.filter(stock__gt=0).select_related('category')
+        page = 15
+        return [
+            ('listing, default order (pk)', in_stock.order_by('pk')[:page + 1]),
+            ('listing, ?ordering=price', in_stock.order_by('price', 'pk')[:page + 1]),
+            ('category page by price', in_stock.filter(category=categories[3]).order_by('price', 'pk')[:page + 1]),
+            ('product detail by slug', Product.objects.filter(slug=f'bench-card-{count // 2:06d}')),
+        ]
+
+    def _report(self, label, queryset, rounds):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            list(queryset.all())
+        elapsed = (time.perf_counter() - start) / rounds * 1000
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n{label}: {elapsed:.2f} ms'))
+        self.stdout.write(queryset.explain())
@@ -0,0 +1,120 @@
+"""Benchmark ProductSerializer image-URL resolution.
+
+Serializes a page of in-memory products (no database) with the current
+`ProductSerializer` and with the previous implementation — four
+`SerializerMethodField`s that each hit the storage backend, read settings and
+call `request.build_absolute_uri` — and prints the time per page for both.
+Runs against local FileSystemStorage and against S3Storage behind a custom
+domain (the R2/S3 production setup; no network is touched).
+
+    python manage.py bench_product_serializer
+    python manage.py bench_product_serializer --page-size 100 --rounds 200
+"""
+
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from rest_framework import serializers
+
+from store.models import Category, Product
+from store.serializers import ProductSerializer
+
+
+def _legacy_image_url(field_name):
+    def get_url(self, obj):
+        image = getattr(obj, field_name)
+        if image:
+            request = self.context.get('request')
+            if request:
+                return request.build_absolute_uri(image.url)
+            if image.url.startswith('http'):
+                return image.url
+            if getattr(settings, 'AWS_STORAGE_BUCKET_NAME', None):
+                return f'https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com{image.url}'
+            return image.url
+        return None
+    return get_url
+
+
+class LegacyProductSerializer(ProductSerializer):
+    """The pre-resolver serializer, kept here only as the benchmark baseline."""
+
+    image_url = serializers.SerializerMethodField()
+    image2_url = serializers.SerializerMethodField()
+    image3_url = serializers.SerializerMethodField()
+    image4_url = serializers.SerializerMethodField()
+
+    get_image_url = _legacy_image_url('image')
+    get_image2_url = _legacy_image_url('image2')
+    get_image3_url = _legacy_image_url('image3')
+    get_image4_url = _legacy_image_url('image4')
+
+
+S3_SETTINGS = dict(
+    AWS_S3_CUSTOM_DOMAIN='media.pokebin.app',
+    AWS_STORAGE_BUCKET_NAME='pokebin-media',
+    AWS_ACCESS_KEY_ID='bench',
+    AWS_SECRET_ACCESS_KEY='bench',
+    AWS_QUERYSTRING_AUTH=False,
+    STORAGES={
+        'default': {'BACKEND': 'storages.backends.s3.S3Storage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    },
+)
+
+
+class Command(BaseCommand):
+    help = 'Time ProductSerializer image-URL resolution against the legacy implementation.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=settings.REST_FRAMEWORK['PAGE_SIZE'])
+        parser.add_argument('--rounds', type=int, default=500)
+
+    def handle(self, *args, **options):
+        products = self._products(options['page_size'])
+        request = RequestFactory().get('/api/products/', HTTP_HOST='pokebin.app')
+
+        self.stdout.write(
+            f'{options["page_size"]} products/page, {options["rounds"]} rounds '
+            '(ms per page, best of 3)'
+        )
+        self.stdout.write(f'{"storage":<24}{"legacy":>10}{"current":>10}{"speedup":>10}')
+        for label, overrides in (('filesystem', {}), ('s3 + custom domain', S3_SETTINGS)):
+            with override_settings(**overrides):
+                legacy = self._time(LegacyProductSerializer, products, request, options['rounds'])
+                current = self._time(ProductSerializer, products, request, options['rounds'])
+            self.stdout.write(
+                f'{label:<24}{legacy:>10.3f}{current:>10.3f}{legacy / current:>9.1f}x'
+            )
+
+    @staticmethod
+    def _products(count):
+        category = Category(id=1, name='Cards', slug='cards')
+        return [
+            Product(
+                id=n,
+                category=category,
+                title=f'Charizard EX #{n}',
+                slug=f'charizard-ex-{n}',
+                price=Decimal('149.99'),
+                stock=1,
+                image=f'images/ebay-sku-{n}-0.jpg',
+                image2=f'images/ebay-sku-{n}-1.jpg',
+                image3=f'images/ebay-sku-{n}-2.jpg',
+                image4=f'images/ebay-sku-{n}-3.jpg',
+            )
+            for n in range(count)
+        ]
+
+    @staticmethod
+    def _time(serializer_class, products, request, rounds):
+        best = float('inf')
+        for _ in range(3):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                serializer_class(products, many=True, context={'request': request}).data
+            best = min(best, (time.perf_counter() - start) / rounds)
+        return best * 1000
@@ -0,0 +1,31 @@
+"""Rebuild the product full-text search index from scratch.
+
+The index is maintained on every Product save/delete; run this after bulk
+changes that bypass signals (raw SQL, `QuerySet.update()` on title/brand/
+description, restoring a dump) or if the index ever looks out of step.
+
+    python manage.py rebuild_search_index
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from store import search
+from store.models import CatalogVersion
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product full-text search index.'
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write(self.style.WARNING(
+                f'No search index on this database ({connection.vendor}); '
+                'run migrations first. Search falls back to icontains.'
+            ))
+            return
+        with transaction.atomic():
+            count = search.rebuild_index()
+            # Search results may have changed; drop cached catalog responses.
+            CatalogVersion.bump()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} products.'))
@@ -0,0 +1,53 @@
+from django.db import migrations
+
+# Must match store.search._POSTGRES_DOCUMENT.
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(brand, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE store_product_search ('
+            ' product_id bigint PRIMARY KEY REFERENCES store_product (id)'
+            ' ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,'
+            ' document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            'CREATE INDEX store_product_search_document_idx '
+            'ON store_product_search USING gin (document)'
+        )
+        schema_editor.execute(
+            'INSERT INTO store_product_search (product_id, document) '
+            f'SELECT id, {POSTGRES_DOCUMENT} FROM store_product'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE store_product_search USING fts5('
+            "title, brand, description, tokenize = 'porter unicode61')"
+        )
+        schema_editor.execute(
+            'INSERT INTO store_product_search (rowid, title, brand, description) '
+            'SELECT id, title, brand, description FROM store_product'
+        )
+    # Other backends: no index table; store.search falls back to icontains.
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        schema_editor.execute('DROP TABLE IF EXISTS store_product_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_product_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
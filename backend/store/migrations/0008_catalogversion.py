@@ -0,0 +1,28 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:14
+
+from django.db import migrations, models
+
+
+def create_singleton(apps, schema_editor):
+    apps.get_model('store', 'CatalogVersion').objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_product_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'catalog version',
+            },
+        ),
+        migrations.RunPython(create_singleton, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:17
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def dedupe_slugs(apps, schema_editor):
+    # Older rows (hand-entered in the admin) may share a slug; keep the oldest
+    # product on it and suffix the rest with their pk so the constraint applies.
+    Product = apps.get_model('store', 'Product')
+    duplicated = (
+        Product.objects.values('slug').annotate(n=Count('id')).filter(n__gt=1).values_list('slug', flat=True)
+    )
+    taken = set(Product.objects.values_list('slug', flat=True))
+    for slug in list(duplicated):
+        for product in Product.objects.filter(slug=slug).order_by('id')[1:]:
+            # The suffixed slug may be in use already; count on until one is free.
+            base = f'{slug[:240]}-{product.pk}'
+            candidate, n = base, 2
+            while candidate in taken:
+                candidate = f'{base[:248]}-{n}'
+                n += 1
+            taken.add(candidate)
+            product.slug = candidate
+            product.save(update_fields=['slug'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0009_product_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='product',
+            name='slug',
+            field=models.SlugField(max_length=255, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('stock__gt', 0)), fields=['id'], name='product_instock_pk_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('stock__gt', 0)), fields=['category', 'price', 'id'], name='product_instock_cat_price_idx'),
+        ),
+    ]
@@ -1,7 +1,17 @@
-from django.db import models
+from django.db import models, transaction
+
+from django.db.models import F
+
+from django.db.models.signals import post_delete, post_save
+
+from django.dispatch import Signal, receiver
 
 from django.urls import reverse
 
+from django.utils import timezone
+
+from . import search
+
 # Create your models here.
 
 class Category(models.Model):
@@ -37,7 +47,7 @@ class Product(models.Model):
     
     description = models.TextField(blank=True)
     
-    slug = models.SlugField(max_length=255)
+    slug = models.SlugField(max_length=255, unique=True)
     
     price = models.DecimalField(max_digits=7, decimal_places=2)
     
@@ -55,9 +65,25 @@ class Product(models.Model):
 
     ebay_listing_id = models.CharField(max_length=64, unique=True, null=True, blank=True, db_index=True)
 
+    updated_at = models.DateTimeField(auto_now=True)
+
     class Meta:
     
         verbose_name_plural = 'products'
+
+        # Keyset pagination walks the storefront (in-stock rows only) by
+        # (price, id) and (title, id); these let each page seek instead of scan.
+        # The default listing (by pk) and category pages (by price) get the
+        # same treatment.
+        indexes = [
+            models.Index(fields=['price', 'id'], condition=models.Q(stock__gt=0), name='product_instock_price_idx'),
+            models.Index(fields=['title', 'id'], condition=models.Q(stock__gt=0), name='product_instock_title_idx'),
+            models.Index(fields=['id'], condition=models.Q(stock__gt=0), name='product_instock_pk_idx'),
+            models.Index(
+                fields=['category', 'price', 'id'], condition=models.Q(stock__gt=0),
+                name='product_instock_cat_price_idx',
+            ),
+        ]
         
     def __str__(self):
                 
@@ -67,4 +93,84 @@ class Product(models.Model):
     def get_absolute_url(self):
         
         return reverse('product-info', args=[self.slug])
-    
\ No newline at end of file
+
+
+# Sent (after commit) whenever the catalog version is bumped, so per-process
+# caches such as `store.cache.cached_categories` can drop their copy at once.
+catalog_changed = Signal()
+
+
+class CatalogVersion(models.Model):
+    """Singleton counter bumped on every catalog change.
+
+    Cached catalog API responses are keyed by it (see `store.cache`), so one
+    UPDATE invalidates all of them at once. It lives in the database rather
+    than the cache so every web worker and the sync worker agree on it.
+    """
+
+    version = models.PositiveBigIntegerField(default=0)
+
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+
+        verbose_name = 'catalog version'
+
+    def __str__(self):
+
+        return f'Catalog v{self.version}'
+
+    @classmethod
+    def current(cls):
+
+        return cls.state()[0]
+
+    @classmethod
+    def state(cls):
+
+        # (version, updated_at) in one query; the pair backs both the cache
+        # keys and the ETag / Last-Modified headers of the catalog API.
+        row = cls.objects.filter(pk=1).values_list('version', 'updated_at').first()
+        return row or (0, None)
+
+    @classmethod
+    def bump(cls):
+
+        # The UPDATE locks the one row every catalog write shares, so it waits
+        # for the surrounding transaction to commit: a checkout or bulk save
+        # must not hold that lock (and serialize all the others) until then.
+        # Outside a transaction it runs at once.
+        transaction.on_commit(cls._bump_now)
+
+    @classmethod
+    def _bump_now(cls):
+
+        now = timezone.now()
+        if not cls.objects.filter(pk=1).update(version=F('version') + 1, updated_at=now):
+            cls.objects.get_or_create(pk=1, defaults={'version': 1, 'updated_at': now})
+        catalog_changed.send(sender=cls)
+
+
+# keep the full-text search index in step with the catalog (this also covers
+# products created or updated by the eBay sync)
+@receiver(post_save, sender=Product)
+def index_product_for_search(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_search(sender, instance, **kwargs):
+    search.remove_products([instance.pk])
+
+
+# any product or category change invalidates the cached catalog responses
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_catalog_version(sender, raw=False, **kwargs):
+    if raw:
+        return
+    CatalogVersion.bump()
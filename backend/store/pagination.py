@@ -0,0 +1,178 @@
+"""Keyset (cursor) pagination for the product catalog.
+
+The default `PageNumberPagination` runs a `COUNT(*)` and an `OFFSET` scan on
+every page, both of which get slower the deeper a client scrolls. Keyset
+pagination instead remembers the last row it returned — its ordering value
+plus the pk as a tiebreak — and asks for the rows strictly after it, which
+the `(field, id)` indexes on `Product` answer in constant time per page.
+
+Opt in with `?pagination=cursor`; the `next`/`previous` links it returns carry
+an opaque `cursor` param and keep the rest of the query string. A search
+ranked by relevance has no keyset to follow, so it keeps page numbers even
+when cursor mode is asked for; with an explicit `?ordering=` it can use cursors.
+"""
+
+import base64
+import json
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .filters import ProductSearchFilter
+
+# Orderings the keyset can follow, each backed by an `(field, id)` index.
+KEYSET_FIELDS = ('pk', 'price', 'title')
+
+
+def wants_cursor_pagination(request) -> bool:
+    params = request.query_params
+    if ProductSearchFilter.ranks_by_relevance(request):
+        # Rank isn't a column; keyset order would replace it with pk order.
+        return False
+    return params.get(ProductCursorPagination.mode_query_param) == 'cursor' or (
+        ProductCursorPagination.cursor_query_param in params
+    )
+
+
+class ProductCursorPagination(BasePagination):
+    """Keyset pagination keyed on the active ordering with a pk tiebreak.
+
+    Only the first `?ordering=` term is honoured; `pk` always breaks ties in
+    the same direction so every row has a unique, stable position.
+    """
+
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    page_size = api_settings.PAGE_SIZE
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.field, self.descending = self._get_ordering(request, queryset, view)
+        cursor = self._decode_cursor(request)
+        reverse = bool(cursor and cursor['r'])
+
+        # Walking backwards flips the sort; the page is re-reversed below.
+        descending = self.descending != reverse
+        queryset = queryset.order_by(*self._order_by(descending))
+        if cursor:
+            queryset = queryset.filter(self._after(cursor['v'], cursor['pk'], descending))
+
+        # One extra row tells us whether another page exists without a COUNT.
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if not reverse else bool(cursor)
+        self.has_previous = bool(cursor) if not reverse else has_more
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self._link(self.page[0], reverse=True)
+
+    # -- Internals -------------------------------------------------------
+
+    def _get_ordering(self, request, queryset, view):
+        ordering = OrderingFilter().get_ordering(request, queryset, view) or ['pk']
+        term = ordering[0]
+        descending = term.startswith('-')
+        field = term.lstrip('-')
+        if field in ('id', 'pk') or field not in KEYSET_FIELDS:
+            field = 'pk'
+        return field, descending
+
+    def _order_by(self, descending):
+        prefix = '-' if descending else ''
+        if self.field == 'pk':
+            return [f'{prefix}pk']
+        return [f'{prefix}{self.field}', f'{prefix}pk']
+
+    def _after(self, value, pk, descending):
+        op = 'lt' if descending else 'gt'
+        if self.field == 'pk':
+            return Q(**{f'pk__{op}': pk})
+        return Q(**{f'{self.field}__{op}': value}) | Q(**{self.field: value, f'pk__{op}': pk})
+
+    def _link(self, row, reverse):
+        value = getattr(row, self.field)
+        position = {
+            'o': self._ordering_key(),
+            'v': None if self.field == 'pk' else str(value),
+            'pk': row.pk,
+            'r': reverse,
+        }
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(position, separators=(',', ':')).encode('utf-8')
+        ).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            cursor = {
+                'o': position['o'],
+                'v': self._position_value(position['v']),
+                'pk': int(position['pk']),
+                'r': bool(position['r']),
+            }
+        except (TypeError, ValueError, KeyError, UnicodeError, InvalidOperation):
+            raise NotFound(self.invalid_cursor_message)
+        # A cursor minted under a different ordering points at the wrong row.
+        if cursor['o'] != self._ordering_key():
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def _position_value(self, value):
+        """A cursor's ordering value as the active field's type; raises if it can't be."""
+        if self.field == 'pk':
+            return None
+        if not isinstance(value, str):
+            raise TypeError(value)
+        if self.field == 'price':
+            value = Decimal(value)
+            if not value.is_finite():
+                raise ValueError(value)
+        return value
+
+    def _ordering_key(self):
+        return f'{"-" if self.descending else ""}{self.field}'
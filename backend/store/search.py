@@ -0,0 +1,177 @@
+"""Full-text search over the product catalog.
+
+`SearchFilter`'s three `icontains` scans read every in-stock row (including
+the `description` TextField) on each search. Instead we keep a search index
+next to `store_product` and query that:
+
+- PostgreSQL: `store_product_search(product_id, document tsvector)` with a GIN
+  index; title, brand and description are weighted A, B and C.
+- SQLite (local dev): an FTS5 virtual table keyed by the product's rowid.
+
+The index is kept current by the `Product` save/delete signals (which also
+covers the eBay sync's upserts) and rebuilt wholesale with
+`manage.py rebuild_search_index`. On any other backend, or before the
+migration has run, `search_products` falls back to the old `icontains`
+behaviour so search keeps working.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'store_product_search'
+PRODUCT_TABLE = 'store_product'
+FALLBACK_FIELDS = ('title', 'description', 'brand')
+
+# The weighted document each product is indexed as on PostgreSQL (migration
+# 0007 keeps its own copy for the initial backfill).
+_POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(brand, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+# Letters and digits only: no query-syntax characters reach the index.
+_TOKEN_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+
+def is_supported() -> bool:
+    """True when this database has a search index table to query.
+
+    A positive answer is remembered on the connection so saves don't pay an
+    introspection query each time.
+    """
+    if getattr(connection, '_product_search_ready', False):
+        return True
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        return False
+    ready = SEARCH_TABLE in connection.introspection.table_names()
+    if ready:
+        connection._product_search_ready = True
+    return ready
+
+
+def search_products(queryset, query: str, *, rank_order: bool = True):
+    """Filter `queryset` to products matching `query`.
+
+    Every whitespace-separated term must match (as a prefix, like the old
+    `icontains` did). With `rank_order`, results are sorted best match first
+    and carry a `search_rank` annotation.
+    """
+    terms = _TOKEN_RE.findall(query or '')
+    if not terms:
+        return queryset
+    if not is_supported():
+        return _fallback_search(queryset, terms)
+
+    if connection.vendor == 'postgresql':
+        match_sql, match_params = _postgres_match(terms)
+    else:
+        match_sql, match_params = _sqlite_match(terms)
+
+    queryset = queryset.filter(pk__in=RawSQL(match_sql['ids'], match_params))
+    if rank_order:
+        queryset = queryset.annotate(
+            search_rank=RawSQL(match_sql['rank'], match_params),
+        ).order_by(F('search_rank').desc(), 'pk')
+    return queryset
+
+
+def index_products(product_ids) -> None:
+    """(Re)index the given products from their current row values."""
+    product_ids = [int(pk) for pk in product_ids]
+    if not product_ids or not is_supported():
+        return
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (product_id, document) '
+                f'SELECT id, {_POSTGRES_DOCUMENT} FROM {PRODUCT_TABLE} '
+                f'WHERE id IN ({placeholders}) '
+                'ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document',
+                product_ids,
+            )
+        else:
+            # FTS5 has no upsert; replace the rows outright.
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})', product_ids)
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, title, brand, description) '
+                f'SELECT id, title, brand, description FROM {PRODUCT_TABLE} '
+                f'WHERE id IN ({placeholders})',
+                product_ids,
+            )
+
+
+def remove_products(product_ids) -> None:
+    product_ids = [int(pk) for pk in product_ids]
+    if not product_ids or not is_supported():
+        return
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    key = 'product_id' if connection.vendor == 'postgresql' else 'rowid'
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE {key} IN ({placeholders})', product_ids)
+
+
+def rebuild_index() -> int:
+    """Re-create every index row from `store_product`. Returns the row count."""
+    if not is_supported():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (product_id, document) '
+                f'SELECT id, {_POSTGRES_DOCUMENT} FROM {PRODUCT_TABLE}'
+            )
+        else:
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, title, brand, description) '
+                f'SELECT id, title, brand, description FROM {PRODUCT_TABLE}'
+            )
+        return cursor.rowcount
+
+
+# -- Backend-specific queries ---------------------------------------------
+
+def _postgres_match(terms):
+    # Prefix-match every term, all of them required.
+    tsquery = ' & '.join(f'{term}:*' for term in terms)
+    sql = {
+        'ids': (
+            f'SELECT product_id FROM {SEARCH_TABLE} '
+            "WHERE document @@ to_tsquery('english', %s)"
+        ),
+        'rank': (
+            f"SELECT ts_rank_cd(document, to_tsquery('english', %s)) FROM {SEARCH_TABLE} "
+            f'WHERE product_id = {PRODUCT_TABLE}.id'
+        ),
+    }
+    return sql, [tsquery]
+
+
+def _sqlite_match(terms):
+    # Quoting each term stops words like AND/OR/NEAR acting as FTS5
+    # operators; the trailing * makes it a prefix match.
+    match = ' '.join(f'"{term}"*' for term in terms)
+    sql = {
+        'ids': f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+        # bm25 is "lower is better"; negate it so rank sorts like Postgres'.
+        # Column weights mirror the A/B/C weights used on Postgres.
+        'rank': (
+            f'SELECT -bm25({SEARCH_TABLE}, 10.0, 4.0, 1.0) FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s AND rowid = {PRODUCT_TABLE}.id'
+        ),
+    }
+    return sql, [match]
+
+
+def _fallback_search(queryset, terms):
+    for term in terms:
+        condition = Q()
+        for field in FALLBACK_FIELDS:
+            condition |= Q(**{f'{field}__icontains': term})
+        queryset = queryset.filter(condition)
+    return queryset
@@ -1,4 +1,9 @@
+from django.conf import settings
+from django.utils.encoding import filepath_to_uri
+from django.utils.functional import cached_property
 from rest_framework import serializers
+from storages.utils import clean_name
+
 from .models import Category, Product
 
 
@@ -8,6 +13,59 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug']
 
 
+class CategoryWithCountSerializer(CategorySerializer):
+    """Category plus its number of in-stock products (see `with_in_stock_counts`)."""
+
+    in_stock_count = serializers.IntegerField(read_only=True)
+
+    class Meta(CategorySerializer.Meta):
+        fields = CategorySerializer.Meta.fields + ['in_stock_count']
+
+
+class ImageURLResolver:
+    """Turns stored image names into absolute URLs, cheaply and in bulk.
+
+    Built once per serializer, so the settings lookups and the request's
+    scheme/host happen once per response rather than once per image. When
+    media lives behind `AWS_S3_CUSTOM_DOMAIN` (R2 or S3) the URL is plain
+    string formatting — exactly what `S3Storage.url()` would return — with no
+    storage-backend call at all.
+    """
+
+    def __init__(self, request=None):
+        domain = getattr(settings, 'AWS_S3_CUSTOM_DOMAIN', None)
+        if domain:
+            protocol = getattr(settings, 'AWS_S3_URL_PROTOCOL', 'https:')
+            location = (getattr(settings, 'AWS_LOCATION', '') or '').strip('/')
+            self.public_base = f'{protocol}//{domain}/' + (f'{location}/' if location else '')
+        else:
+            self.public_base = None
+        # build_absolute_uri('/') minus the slash: every relative storage URL
+        # starts with '/', so prefixing is all build_absolute_uri would do.
+        self.host_prefix = request.build_absolute_uri('/')[:-1] if request else ''
+
+    def url(self, field_file):
+        if not field_file:
+            return None
+        if self.public_base is not None:
+            return self.public_base + filepath_to_uri(clean_name(field_file.name))
+        url = field_file.url
+        if url.startswith('/'):
+            return self.host_prefix + url
+        return url
+
+
+class ImageURLField(serializers.Field):
+    """Read-only absolute URL for one of Product's ImageFields."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return self.parent.image_url_resolver.url(value)
+
+
 class ProductSerializer(serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
@@ -16,72 +74,21 @@ class ProductSerializer(serializers.ModelSerializer):
         write_only=True,
         required=False
     )
-    image_url = serializers.SerializerMethodField()
-    image2_url = serializers.SerializerMethodField()
-    image3_url = serializers.SerializerMethodField()
-    image4_url = serializers.SerializerMethodField()
+    image_url = ImageURLField(source='image')
+    image2_url = ImageURLField(source='image2')
+    image3_url = ImageURLField(source='image3')
+    image4_url = ImageURLField(source='image4')
 
     class Meta:
         model = Product
         fields = [
             'id', 'title', 'brand', 'description', 'slug', 'price',
             'category', 'category_id', 'stock', 'units_sold',
-            'image_url', 'image2_url', 'image3_url', 'image4_url'
+            'image_url', 'image2_url', 'image3_url', 'image4_url', 'updated_at'
         ]
 
-    def get_image_url(self, obj):
-        if obj.image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image.url)
-            # Fallback: use S3 URL if available, otherwise return relative path
-            # In production with S3, image.url will already be a full URL
-            if obj.image.url.startswith('http'):
-                return obj.image.url
-            # For local development fallback only
-            from django.conf import settings
-            if hasattr(settings, 'AWS_STORAGE_BUCKET_NAME') and settings.AWS_STORAGE_BUCKET_NAME:
-                # S3 is configured, return the S3 URL
-                return obj.image.url if obj.image.url.startswith('http') else f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com{obj.image.url}"
-            return obj.image.url
-        return None
-
-    def get_image2_url(self, obj):
-        if obj.image2:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image2.url)
-            if obj.image2.url.startswith('http'):
-                return obj.image2.url
-            from django.conf import settings
-            if hasattr(settings, 'AWS_STORAGE_BUCKET_NAME') and settings.AWS_STORAGE_BUCKET_NAME:
-                return obj.image2.url if obj.image2.url.startswith('http') else f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com{obj.image2.url}"
-            return obj.image2.url
-        return None
-
-    def get_image3_url(self, obj):
-        if obj.image3:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image3.url)
-            if obj.image3.url.startswith('http'):
-                return obj.image3.url
-            from django.conf import settings
-            if hasattr(settings, 'AWS_STORAGE_BUCKET_NAME') and settings.AWS_STORAGE_BUCKET_NAME:
-                return obj.image3.url if obj.image3.url.startswith('http') else f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com{obj.image3.url}"
-            return obj.image3.url
-        return None
-
-    def get_image4_url(self, obj):
-        if obj.image4:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image4.url)
-            if obj.image4.url.startswith('http'):
-                return obj.image4.url
-            from django.conf import settings
-            if hasattr(settings, 'AWS_STORAGE_BUCKET_NAME') and settings.AWS_STORAGE_BUCKET_NAME:
-                return obj.image4.url if obj.image4.url.startswith('http') else f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com{obj.image4.url}"
-            return obj.image4.url
-        return None
-
+    @cached_property
+    def image_url_resolver(self):
+        # With many=True this serializer is the shared child of the list
+        # serializer, so one resolver serves every product on the page.
+        return ImageURLResolver(self.context.get('request'))
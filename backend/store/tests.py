@@ -1,3 +1,553 @@
-from django.test import TestCase
+"""Tests for the catalog API (`store.api_views`, `store.serializers`)."""
 
-# Create your tests here.
+import base64
+import json
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import F
+from django.http import HttpResponse
+from django.db.models.fields.files import FieldFile
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .cache import CATEGORY_RECHECK_SECONDS, cached_categories, invalidate_cached_categories
+from .models import CatalogVersion, Category, Product
+from .serializers import ProductSerializer
+from . import views
+from .views import categories
+
+
+def _clear_caches():
+    # Both caches outlive a test's rolled-back transaction.
+    cache.clear()
+    invalidate_cached_categories()
+
+
+def _make_products(category, count):
+    return [
+        Product.objects.create(
+            category=category,
+            title=f'Card {n:03d}',
+            slug=f'card-{n:03d}',
+            price=Decimal('5.00') + n % 4,
+            image='images/card.jpg',
+            stock=1,
+        )
+        for n in range(count)
+    ]
+
+
+class ProductCursorPaginationTests(TestCase):
+    def setUp(self):
+        _clear_caches()
+        self.url = reverse('product-list')
+        self.category = Category.objects.create(name='Cards', slug='cards')
+        # Many rows share a price, so the pk tiebreak decides page boundaries.
+        self.products = _make_products(self.category, 40)
+
+    def _walk(self, params):
+        slugs, url = [], None
+        response = self.client.get(self.url, {**params, 'pagination': 'cursor'})
+        while True:
+            body = response.json()
+            slugs.extend(p['slug'] for p in body['results'])
+            url = body['next']
+            if not url:
+                return slugs
+            response = self.client.get(url)
+
+    def test_walks_every_product_once_in_price_order(self):
+        slugs = self._walk({'ordering': 'price'})
+
+        expected = [
+            p.slug for p in sorted(self.products, key=lambda p: (p.price, p.pk))
+        ]
+        self.assertEqual(slugs, expected)
+
+    def test_walks_descending_title_order(self):
+        slugs = self._walk({'ordering': '-title'})
+        self.assertEqual(slugs, sorted((p.slug for p in self.products), reverse=True))
+
+    def test_defaults_to_pk_order(self):
+        slugs = self._walk({})
+        self.assertEqual(slugs, [p.slug for p in self.products])
+
+    def test_previous_link_returns_the_prior_page(self):
+        first = self.client.get(self.url, {'pagination': 'cursor', 'ordering': 'price'}).json()
+        second = self.client.get(first['next']).json()
+        back = self.client.get(second['previous']).json()
+
+        self.assertEqual([p['slug'] for p in back['results']], [p['slug'] for p in first['results']])
+        self.assertIsNone(first['previous'])
+
+    def test_page_does_not_count_the_catalog(self):
+        # The catalog-version lookup for the response cache, then the page.
+        with self.assertNumQueries(2):
+            body = self.client.get(self.url, {'pagination': 'cursor'}).json()
+        self.assertNotIn('count', body)
+        self.assertEqual(len(body['results']), 15)
+
+    def test_out_of_stock_products_are_excluded(self):
+        Product.objects.filter(pk__in=[p.pk for p in self.products[:10]]).update(stock=0)
+        self.assertEqual(len(self._walk({})), 30)
+
+    def test_cursor_from_a_different_ordering_is_rejected(self):
+        first = self.client.get(self.url, {'pagination': 'cursor', 'ordering': 'price'}).json()
+        response = self.client.get(first['next'].replace('ordering=price', 'ordering=title'))
+        self.assertEqual(response.status_code, 404)
+
+    def test_garbage_cursor_is_rejected(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor_values_are_rejected_not_500(self):
+        for value in (None, 'cheap', 'NaN', 5):
+            position = {'o': 'price', 'v': value, 'pk': 1, 'r': False}
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+            response = self.client.get(self.url, {'ordering': 'price', 'cursor': cursor})
+
+            self.assertEqual(response.status_code, 404, value)
+            self.assertEqual(response.json()['detail'], 'Invalid cursor')
+
+    def test_page_number_pagination_is_still_the_default(self):
+        body = self.client.get(self.url).json()
+        self.assertEqual(body['count'], 40)
+        self.assertEqual(len(body['results']), 15)
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        _clear_caches()
+        self.url = reverse('product-list')
+        self.category = Category.objects.create(name='Cards', slug='cards')
+
+    def _product(self, title, description='', brand='Pokebin', price='10.00'):
+        return Product.objects.create(
+            category=self.category,
+            title=title,
+            slug=title.lower().replace(' ', '-'),
+            description=description,
+            brand=brand,
+            price=Decimal(price),
+            image='images/card.jpg',
+            stock=1,
+        )
+
+    def _search(self, query, **params):
+        body = self.client.get(self.url, {'search': query, **params}).json()
+        return [p['title'] for p in body['results']]
+
+    def test_matches_word_prefixes_across_fields(self):
+        self._product('Charizard EX Holo')
+        self._product('Pikachu Plush', description='Soft charizard-themed stitching')
+        self._product('Pokeball Keychain')
+
+        self.assertEqual(set(self._search('chari')), {'Charizard EX Holo', 'Pikachu Plush'})
+        self.assertEqual(self._search('keychain pokeball'), ['Pokeball Keychain'])
+        self.assertEqual(self._search('mewtwo'), [])
+
+    def test_title_matches_rank_above_description_matches(self):
+        self._product('Booster Box', description='Might contain a Charizard')
+        self._product('Charizard Slab')
+
+        self.assertEqual(self._search('charizard'), ['Charizard Slab', 'Booster Box'])
+
+    def test_explicit_ordering_overrides_rank(self):
+        self._product('Charizard Slab', price='90.00')
+        self._product('Booster Box', description='Might contain a Charizard', price='5.00')
+
+        self.assertEqual(self._search('charizard', ordering='price'), ['Booster Box', 'Charizard Slab'])
+
+    def test_ranked_search_keeps_page_numbers_in_cursor_mode(self):
+        self._product('Booster Box', description='Might contain a Charizard')
+        self._product('Charizard Slab')
+
+        body = self.client.get(self.url, {'search': 'charizard', 'pagination': 'cursor'}).json()
+
+        self.assertEqual(body['count'], 2)
+        self.assertEqual([p['title'] for p in body['results']], ['Charizard Slab', 'Booster Box'])
+
+    def test_ordered_search_can_use_cursors(self):
+        self._product('Charizard Slab', price='90.00')
+        self._product('Booster Box', description='Might contain a Charizard', price='5.00')
+
+        body = self.client.get(
+            self.url, {'search': 'charizard', 'ordering': 'price', 'pagination': 'cursor'},
+        ).json()
+
+        self.assertNotIn('count', body)
+        self.assertEqual([p['title'] for p in body['results']], ['Booster Box', 'Charizard Slab'])
+
+    def test_index_follows_saves_and_deletes(self):
+        product = self._product('Blastoise Slab')
+        self.assertEqual(self._search('blastoise'), ['Blastoise Slab'])
+        with self.captureOnCommitCallbacks(execute=True):
+            product.title = 'Venusaur Slab'
+            product.save()
+
+        self.assertEqual(self._search('blastoise'), [])
+        self.assertEqual(self._search('venusaur'), ['Venusaur Slab'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertEqual(self._search('venusaur'), [])
+
+    def test_query_syntax_characters_are_ignored(self):
+        self._product('Charizard EX Holo')
+        self.assertEqual(self._search('"charizard" (ex*:'), ['Charizard EX Holo'])
+
+    def test_rebuild_command_reindexes_rows_changed_behind_the_orm(self):
+        product = self._product('Gengar Slab')
+        Product.objects.filter(pk=product.pk).update(title='Haunter Slab')
+        self.assertEqual(self._search('haunter'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rebuild_search_index', stdout=StringIO())
+
+        self.assertEqual(self._search('haunter'), ['Haunter Slab'])
+
+
+class ProductSerializerImageURLTests(TestCase):
+    def setUp(self):
+        self.product = Product(
+            title='Charizard', slug='charizard', price=Decimal('1.00'),
+            image='images/charizard front.jpg', image2='images/back.jpg',
+        )
+        self.request = RequestFactory().get('/api/products/', HTTP_HOST='pokebin.app')
+
+    def _serialize(self, request=None):
+        return ProductSerializer(self.product, context={'request': request}).data
+
+    def test_local_storage_urls_are_absolute_to_the_request_host(self):
+        data = self._serialize(self.request)
+
+        self.assertEqual(data['image_url'], 'http://pokebin.app/media/images/charizard%20front.jpg')
+        self.assertEqual(data['image2_url'], 'http://pokebin.app/media/images/back.jpg')
+        self.assertIsNone(data['image3_url'])
+        self.assertIsNone(data['image4_url'])
+
+    def test_without_request_urls_stay_relative(self):
+        self.assertEqual(self._serialize()['image_url'], '/media/images/charizard%20front.jpg')
+
+    @override_settings(AWS_S3_CUSTOM_DOMAIN='media.pokebin.app')
+    def test_custom_domain_fast_path_skips_the_storage_backend(self):
+        with mock.patch.object(FieldFile, 'url', new_callable=mock.PropertyMock) as storage_url:
+            data = self._serialize(self.request)
+
+        storage_url.assert_not_called()
+        self.assertEqual(data['image_url'], 'https://media.pokebin.app/images/charizard%20front.jpg')
+        self.assertEqual(data['image2_url'], 'https://media.pokebin.app/images/back.jpg')
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        _clear_caches()
+        self.category = Category.objects.create(name='Cards', slug='cards')
+        self.products = _make_products(self.category, 3)
+
+    def test_repeat_anonymous_request_is_served_from_cache(self):
+        first = self.client.get(reverse('product-list'), {'ordering': 'price'})
+        # Only the catalog version lookup remains.
+        with self.assertNumQueries(1):
+            second = self.client.get(reverse('product-list'), {'ordering': 'price'})
+        self.assertEqual(second.json(), first.json())
+
+    def test_detail_and_category_endpoints_are_cached(self):
+        detail = reverse('product-detail', args=[self.products[0].slug])
+        for url in (detail, reverse('category-list')):
+            self.client.get(url)
+            with self.assertNumQueries(1):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_query_params_are_normalized_into_the_key(self):
+        self.client.get(reverse('product-list'), {'ordering': 'price', 'page': '1'})
+        with self.assertNumQueries(1):
+            self.client.get(reverse('product-list') + '?page=1&ordering=price')
+        with self.assertNumQueries(3):
+            self.client.get(reverse('product-list'), {'ordering': '-price'})
+
+    def test_product_save_invalidates_cached_pages(self):
+        url = reverse('product-list')
+        self.client.get(url)
+        product = self.products[0]
+        product.title = 'Renamed Card'
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+        titles = [p['title'] for p in self.client.get(url).json()['results']]
+        self.assertIn('Renamed Card', titles)
+
+    def test_category_delete_invalidates_cached_pages(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            plush = Category.objects.create(name='Plush', slug='plush')
+        self.client.get(reverse('category-list'))
+        before = CatalogVersion.current()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            plush.delete()
+
+        self.assertGreater(CatalogVersion.current(), before)
+        names = [c['name'] for c in self.client.get(reverse('category-list')).json()['results']]
+        self.assertEqual(names, ['Cards'])
+
+    def test_catalog_version_moves_only_when_the_change_commits(self):
+        before = CatalogVersion.current()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Category.objects.create(name='Plush', slug='plush')
+            # Nothing locks the version row until the transaction commits.
+            self.assertEqual(CatalogVersion.current(), before)
+
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual(CatalogVersion.current(), before + 1)
+
+    def test_missing_product_is_not_cached(self):
+        url = reverse('product-detail', args=['missing'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        Product.objects.create(
+            category=self.category, title='Late', slug='missing', price=Decimal('1.00'),
+            image='images/card.jpg', stock=1,
+        )
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        user = User.objects.create_user('ash', password='pikachu123')
+        self.client.force_login(user)
+        url = reverse('product-list')
+        self.client.get(url)
+        # Session, user, catalog version (for the ETag), count, page.
+        with self.assertNumQueries(5):
+            self.client.get(url)
+
+
+class CatalogConditionalGetTests(TestCase):
+    def setUp(self):
+        _clear_caches()
+        self.category = Category.objects.create(name='Cards', slug='cards')
+        self.products = _make_products(self.category, 3)
+        self.url = reverse('product-list')
+
+    def test_responses_carry_validators(self):
+        response = self.client.get(self.url)
+
+        self.assertTrue(response['ETag'].startswith(f'"{CatalogVersion.current()}-'))
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_matching_etag_gets_304_without_serializing(self):
+        etag = self.client.get(self.url)['ETag']
+        _clear_caches()
+
+        with mock.patch.object(ProductSerializer, 'to_representation') as serialize:
+            with self.assertNumQueries(1):
+                response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        serialize.assert_not_called()
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_etag_differs_per_endpoint_and_query(self):
+        etags = {
+            self.client.get(self.url)['ETag'],
+            self.client.get(self.url, {'ordering': 'price'})['ETag'],
+            self.client.get(reverse('product-detail', args=[self.products[0].slug]))['ETag'],
+            self.client.get(reverse('category-list'))['ETag'],
+        }
+        self.assertEqual(len(etags), 4)
+
+    def test_catalog_change_invalidates_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        product = self.products[0]
+        product.price = Decimal('99.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.url)['Last-Modified']
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_authenticated_requests_are_conditional_too(self):
+        self.client.force_login(User.objects.create_user('ash', password='pikachu123'))
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_product_updated_at_is_exposed_and_maintained(self):
+        product = self.products[0]
+        before = product.updated_at
+        product.title = 'Renamed'
+        product.save()
+
+        self.assertGreater(product.updated_at, before)
+        body = self.client.get(reverse('product-detail', args=[product.slug])).json()
+        self.assertIn('updated_at', body)
+
+
+class ProductSlugTests(TestCase):
+    def test_slug_is_unique(self):
+        category = Category.objects.create(name='Cards', slug='cards')
+        _make_products(category, 1)
+        with self.assertRaises(IntegrityError):
+            _make_products(category, 1)
+
+
+class CachedCategoriesTests(TestCase):
+    def setUp(self):
+        _clear_caches()
+        self.cards = Category.objects.create(name='Cards', slug='cards')
+        self.plush = Category.objects.create(name='Plush', slug='plush')
+        _make_products(self.cards, 3)
+        Product.objects.filter(slug='card-000').update(stock=0)
+
+    def test_lists_categories_with_in_stock_counts(self):
+        body = self.client.get(reverse('category-list')).json()
+
+        counts = {c['slug']: c['in_stock_count'] for c in body['results']}
+        self.assertEqual(counts, {'cards': 2, 'plush': 0})
+
+    def test_templates_and_api_share_one_query(self):
+        self.client.get(reverse('category-list'))
+        cache.clear()
+        # Only the version lookup for the ETag; the list itself is in memory.
+        with self.assertNumQueries(1):
+            self.client.get(reverse('category-list'))
+
+        request = RequestFactory().get('/')
+        with self.assertNumQueries(0):
+            names = [c.name for c in categories(request)['all_categories']]
+        self.assertEqual(names, ['Cards', 'Plush'])
+
+    def test_menu_keeps_creation_order(self):
+        _clear_caches()
+        Category.objects.create(name='Binders', slug='binders')
+
+        names = [c.name for c in categories(RequestFactory().get('/'))['all_categories']]
+
+        self.assertEqual(names, ['Cards', 'Plush', 'Binders'])
+
+    def test_context_processor_is_lazy(self):
+        _clear_caches()
+        with self.assertNumQueries(0):
+            categories(RequestFactory().get('/'))
+
+    def test_catalog_change_refreshes_the_list(self):
+        self.client.get(reverse('category-list'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(
+                category=self.plush, title='Pikachu Plush', slug='pikachu-plush',
+                price=Decimal('20.00'), image='images/plush.jpg', stock=2,
+            )
+
+        counts = {c.slug: c.in_stock_count for c in cached_categories()}
+        self.assertEqual(counts['plush'], 1)
+
+    def test_change_from_another_process_is_seen_after_the_recheck_window(self):
+        cached_categories()
+        # Simulate another worker: the version moves but no signal arrives here.
+        CatalogVersion.objects.filter(pk=1).update(version=F('version') + 1)
+        Category.objects.filter(pk=self.plush.pk).update(name='Sealed')
+
+        self.assertIn('Plush', [c.name for c in cached_categories()])
+        with mock.patch('store.cache.time.monotonic', return_value=time.monotonic() + CATEGORY_RECHECK_SECONDS):
+            self.assertIn('Sealed', [c.name for c in cached_categories()])
+
+
+class StorefrontViewTests(TestCase):
+    # `/` is taken by the API router's root view, so the view is called
+    # directly with `render` stubbed to capture its context.
+    def setUp(self):
+        _clear_caches()
+        self.category = Category.objects.create(name='Cards', slug='cards')
+        self.products = _make_products(self.category, 20)
+        Product.objects.filter(slug='card-019').update(stock=0)
+
+    def _context(self, **params):
+        with mock.patch('store.views.render', return_value=HttpResponse()) as render:
+            views.store(RequestFactory().get('/', params))
+        return render.call_args.args[2]
+
+    def test_page_and_stats(self):
+        context = self._context(sort='price_desc', page=2)
+
+        page = context['products']
+        self.assertEqual((page.number, page.paginator.num_pages), (2, 4))
+        self.assertEqual(len(page.object_list), 6)
+        prices = [p.price for p in page.object_list]
+        self.assertEqual(prices, sorted(prices, reverse=True))
+        self.assertEqual(context['catalog_stats'], {
+            'count': 19, 'min_price': Decimal('5.00'), 'max_price': Decimal('8.00'),
+        })
+        self.assertNotIn('all_products', context)
+
+    def test_one_aggregate_and_one_page_query(self):
+        # Version lookup, aggregate, page rows.
+        with self.assertNumQueries(3):
+            self._context()
+
+    def test_warm_page_costs_only_the_version_lookup(self):
+        self._context(page=3)
+        with self.assertNumQueries(1):
+            context = self._context(page=3)
+        self.assertEqual(len(context['products'].object_list), 6)
+
+    def test_catalog_change_refreshes_pages_and_stats(self):
+        self._context()
+        product = self.products[0]
+        product.price = Decimal('1.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+        context = self._context(sort='price_asc')
+        self.assertEqual(context['catalog_stats']['min_price'], Decimal('1.00'))
+        self.assertEqual(context['products'].object_list[0], product)
+
+
+class SlugDedupeMigrationTests(TransactionTestCase):
+    # Runs 0010 for real against rows that still share slugs.
+    before = [('store', '0009_product_updated_at')]
+    after = [('store', '0010_product_slug_unique_listing_indexes')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        self.addCleanup(self._migrate_to_latest)
+        apps = executor.loader.project_state(self.before).apps
+        self.Product = apps.get_model('store', 'Product')
+        self.category = apps.get_model('store', 'Category').objects.create(name='Cards', slug='cards')
+
+    @staticmethod
+    def _migrate_to_latest():
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def _product(self, slug):
+        return self.Product.objects.create(
+            category=self.category, title=slug, slug=slug, price=Decimal('1.00'), image='images/card.jpg',
+        )
+
+    def test_renamed_duplicates_skip_slugs_already_in_use(self):
+        first, second = self._product('pikachu'), self._product('pikachu')
+        # Hand-entered earlier: exactly the slug the rename would pick first.
+        taken = self._product(f'pikachu-{second.pk}')
+
+        MigrationExecutor(connection).migrate(self.after)
+
+        slugs = dict(Product.objects.values_list('pk', 'slug'))
+        self.assertEqual(slugs[first.pk], 'pikachu')
+        self.assertEqual(slugs[taken.pk], f'pikachu-{second.pk}')
+        self.assertEqual(slugs[second.pk], f'pikachu-{second.pk}-2')
@@ -1,40 +1,43 @@
 from django.shortcuts import render, get_object_or_404
 from django.contrib import messages
-from django.core.paginator import Paginator
+from django.utils.functional import SimpleLazyObject
 
 from . models import Category, Product
+from .cache import cached_categories, storefront_page
 
 
 
 # Create your views here.
 
+STORE_PAGE_SIZE = 6
+
+# ?sort= values for the storefront; pk breaks price ties so pages are stable
+STORE_ORDERINGS = {
+    'price_asc': ('price', 'pk'),
+    'price_desc': ('-price', '-pk'),
+    'default': ('pk',),
+}
+
+
 def store(request):
     
-    all_products = Product.objects.filter(stock__gt=0).values()
-    
     # Get sort parameter from request
     sort_by = request.GET.get('sort', 'default')
     
-    # Apply sorting based on parameter
-    if sort_by == 'price_asc':
-        queryset = Product.objects.all().filter(stock__gt=0).order_by('price')
-    elif sort_by == 'price_desc':
-        queryset = Product.objects.all().filter(stock__gt=0).order_by('-price')
-    else:
-        queryset = Product.objects.all().filter(stock__gt=0).order_by('pk')
+    ordering = STORE_ORDERINGS.get(sort_by, STORE_ORDERINGS['default'])
     
-    p = Paginator(queryset, 6)
-    page = request.GET.get('page')
-    products = p.get_page(page)
+    products, catalog_stats = storefront_page(ordering, request.GET.get('page'), STORE_PAGE_SIZE)
     
-    context = { 'all_products': all_products, 'products': products, 'current_sort': sort_by }
+    context = { 'products': products, 'catalog_stats': catalog_stats, 'current_sort': sort_by }
     
     return render(request, 'store/store.html', context)
 
 
 def categories(request):
     
-    all_categories = Category.objects.all()
+    # runs for every template render (cart, account pages, emails), so the
+    # list comes from the in-process cache and only when a template uses it
+    all_categories = SimpleLazyObject(cached_categories)
     
     return {'all_categories': all_categories}
 
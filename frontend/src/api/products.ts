@@ -1,5 +1,5 @@
 import axios from '@/config/axios'
-import type { Paginated, Product, ProductsQueryParams } from '@/types/api'
+import type { CursorPage, Paginated, Product, ProductsQueryParams } from '@/types/api'
 
 export const fetchProducts = async (
   params: ProductsQueryParams = {},
@@ -13,6 +13,19 @@ export const fetchProducts = async (
   return data
 }
 
+export const fetchProductsCursor = async (
+  params: Omit<ProductsQueryParams, 'page'> = {},
+  cursorUrl: string | null = null,
+): Promise<CursorPage<Product>> => {
+  // The `next` link already carries the filters, ordering and cursor.
+  const { data } = cursorUrl
+    ? await axios.get<CursorPage<Product>>(cursorUrl)
+    : await axios.get<CursorPage<Product>>('/api/products/', {
+        params: { ...params, pagination: 'cursor' },
+      })
+  return data
+}
+
 export const fetchProductBySlug = async (slug: string): Promise<Product> => {
   const { data } = await axios.get<Product>(`/api/products/${slug}/`)
   return data
@@ -1,10 +1,12 @@
-import { keepPreviousData, useQuery } from '@tanstack/react-query'
-import { fetchProducts } from '@/api/products'
+import { keepPreviousData, useInfiniteQuery, useQuery } from '@tanstack/react-query'
+import { fetchProducts, fetchProductsCursor } from '@/api/products'
 import type { ProductsQueryParams } from '@/types/api'
 
 export const productsKeys = {
   all: ['products'] as const,
   list: (params: ProductsQueryParams) => [...productsKeys.all, 'list', params] as const,
+  infinite: (params: Omit<ProductsQueryParams, 'page'>) =>
+    [...productsKeys.all, 'infinite', params] as const,
   bySlug: (slug: string) => [...productsKeys.all, 'detail', slug] as const,
 }
 
@@ -14,3 +16,13 @@ export const useProductsQuery = (params: ProductsQueryParams) =>
     queryFn: () => fetchProducts(params),
     placeholderData: keepPreviousData,
   })
+
+// Infinite scroll over keyset pages: each page costs the same however deep
+// the user scrolls, unlike page-number pagination's COUNT + OFFSET.
+export const useInfiniteProductsQuery = (params: Omit<ProductsQueryParams, 'page'>) =>
+  useInfiniteQuery({
+    queryKey: productsKeys.infinite(params),
+    queryFn: ({ pageParam }) => fetchProductsCursor(params, pageParam),
+    initialPageParam: null as string | null,
+    getNextPageParam: (lastPage) => lastPage.next,
+  })
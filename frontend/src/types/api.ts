@@ -2,6 +2,8 @@ export interface Category {
   id: number
   name: string
   slug: string
+  // Only on /api/categories/ responses, not on a product's nested category.
+  in_stock_count?: number
 }
 
 export interface Product {
@@ -18,6 +20,7 @@ export interface Product {
   image2_url: string | null
   image3_url: string | null
   image4_url: string | null
+  updated_at: string
 }
 
 export interface Paginated<T> {
@@ -27,6 +30,14 @@ export interface Paginated<T> {
   results: T[]
 }
 
+// Keyset pagination (`?pagination=cursor`): no total count, and `next` /
+// `previous` are opaque links rather than page numbers.
+export interface CursorPage<T> {
+  next: string | null
+  previous: string | null
+  results: T[]
+}
+
 export type ProductOrdering = 'price' | '-price' | 'title' | '-title'
 
 export interface ProductsQueryParams {